@@ -3,7 +3,8 @@ from fastapi import APIRouter
 from api.v1.endpoints import (
     login, employees, departments, positions,
     payroll, reports, users, notifications,
-    shareholders, leave_requests, system # <-- Import mới
+    shareholders, leave_requests, system, # <-- Import mới
+    report_jobs
 )
 
 api_router = APIRouter()
@@ -14,6 +15,7 @@ api_router.include_router(employees.router, prefix="/employees", tags=["Employee
 api_router.include_router(departments.router, prefix="/departments", tags=["Departments"])
 api_router.include_router(positions.router, prefix="/positions", tags=["Positions"])
 api_router.include_router(payroll.router, prefix="/payroll", tags=["Payroll"])
+api_router.include_router(report_jobs.router, prefix="/reports/jobs", tags=["Report Jobs"])
 api_router.include_router(reports.router, prefix="/reports", tags=["Reports"])
 api_router.include_router(shareholders.router, prefix="/shareholders", tags=["Shareholders"])
 api_router.include_router(leave_requests.router, prefix="/leave-requests", tags=["Leave Requests"])
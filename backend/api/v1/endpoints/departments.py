@@ -1,21 +1,31 @@
 # backend/api/v1/endpoints/departments.py
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from sqlalchemy.orm import Session
 from typing import List
 import schemas
 from crud import crud_hr
 from database import get_db_sqlserver, get_db_mysql
 from auth.auth import get_current_active_hr_manager, get_current_user
+from services import reference_cache
+from core import http_cache
 
 router = APIRouter()
 
-# Xem danh sách (Ai cũng xem được để hiển thị filter)
+REFERENCE_CACHE_CONTROL = "private, no-cache"
+
+# Xem danh sách (Ai cũng xem được để hiển thị filter) - đọc từ cache tham chiếu, hỗ trợ ETag/304
 @router.get("/", response_model=List[schemas.Department])
 def read_departments(
+    request: Request,
+    response: Response,
     db_hr: Session = Depends(get_db_sqlserver),
     current_user: schemas.User = Depends(get_current_user)
 ):
-    return crud_hr.get_departments(db_hr)
+    departments, etag = reference_cache.get_departments(db_hr)
+    if http_cache.etag_matches(request, etag):
+        return http_cache.not_modified(etag, REFERENCE_CACHE_CONTROL)
+    http_cache.set_cache_headers(response, etag, REFERENCE_CACHE_CONTROL)
+    return departments
 
 # Thêm mới: Chỉ HR/Admin
 @router.post("/", response_model=schemas.Department, status_code=status.HTTP_201_CREATED)
@@ -1,12 +1,16 @@
 # backend/api/v1/endpoints/employees.py
-from fastapi import APIRouter, Depends, HTTPException, status as http_status, BackgroundTasks
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, status as http_status, BackgroundTasks, Query, UploadFile, File
+from sqlalchemy.orm import Session, joinedload
 from typing import List, Optional
 
 import schemas
+import models
 from crud import crud_employee, crud_payroll, crud_user, crud_system
 from database import get_db_sqlserver, get_db_mysql, get_db_auth
 from auth.auth import get_current_user
+from core import pagination
+from core.responses import LeanJSONResponse
+from services import employee_import, fanout
 
 router = APIRouter()
 
@@ -29,7 +33,35 @@ def read_employees(
     if current_user.role not in allowed_roles:
         raise HTTPException(status_code=http_status.HTTP_403_FORBIDDEN, detail="Không đủ quyền truy cập.")
 
-    return crud_employee.get_employees(db_hr, db_auth, skip, limit, search, department_id, position_id, status)
+    return LeanJSONResponse(
+        crud_employee.get_employees(db_hr, db_auth, skip, limit, search, department_id, position_id, status)
+    )
+
+# 1b. PHÂN TRANG KEYSET (cuộn vô hạn): chi phí trang sau = trang đầu
+# Lưu ý: phải khai báo TRƯỚC "/{employee_id}"
+@router.get("/page", response_model=schemas.EmployeePage)
+def read_employees_page(
+    limit: int = Query(100, ge=1, le=500),
+    after: Optional[str] = None,
+    sort: str = Query("id", description="id, name, hire_date (thêm '-' để giảm dần)"),
+    include_total: bool = False,
+    search: Optional[str] = None,
+    department_id: Optional[int] = None, position_id: Optional[int] = None, status: Optional[str] = None,
+    db_hr: Session = Depends(get_db_sqlserver), db_auth: Session = Depends(get_db_auth),
+    current_user: schemas.User = Depends(get_current_user)
+):
+    allowed_roles = ["Admin", "HR Manager", "Payroll Manager", "ADMIN"]
+    if current_user.role not in allowed_roles:
+        raise HTTPException(status_code=http_status.HTTP_403_FORBIDDEN, detail="Không đủ quyền truy cập.")
+    if sort not in crud_employee.EMPLOYEE_SORTS:
+        raise HTTPException(status_code=400, detail=f"sort hợp lệ: {', '.join(crud_employee.EMPLOYEE_SORTS)}")
+
+    try:
+        return crud_employee.get_employees_page(
+            db_hr, db_auth, limit, after, sort, include_total, search, department_id, position_id, status
+        )
+    except pagination.InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 # 2. THÊM MỚI NHÂN VIÊN (Giữ nguyên)
 @router.post("/", response_model=schemas.Employee, status_code=http_status.HTTP_201_CREATED)
@@ -50,19 +82,113 @@ def create_employee(
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+# 2b. NHẬP HÀNG LOẠT (CSV/JSON) - xem services/employee_import.py
+@router.post("/import", response_model=schemas.EmployeeImportResult)
+def import_employees(
+    background_tasks: BackgroundTasks,
+    file: UploadFile = File(...),
+    dry_run: bool = False,
+    default_password: Optional[str] = None,
+    db_hr: Session = Depends(get_db_sqlserver), db_payroll: Session = Depends(get_db_mysql),
+    db_auth: Session = Depends(get_db_auth), current_user: schemas.User = Depends(get_current_user)
+):
+    if current_user.role not in ["Admin", "HR Manager", "ADMIN"]:
+        raise HTTPException(status_code=http_status.HTTP_403_FORBIDDEN, detail="Chỉ HR Manager/Admin mới được nhập nhân viên.")
+
+    try:
+        rows = employee_import.parse_file(file.file.read(), file.filename or "")
+    except (ValueError, UnicodeDecodeError) as e:
+        raise HTTPException(status_code=400, detail=f"File không hợp lệ: {e}")
+
+    report = employee_import.import_employees(db_hr, db_payroll, db_auth, rows, dry_run, default_password)
+    if report["created"]:
+        background_tasks.add_task(
+            bg_audit_log, db_auth, current_user.email, "IMPORT_EMPLOYEES", file.filename or "upload",
+            f"Nhập {report['created']}/{report['total_rows']} nhân viên, {report['failed']} lỗi"
+        )
+    return report
+
+# 2c. ĐIỀU CHUYỂN HÀNG LOẠT (tái cơ cấu phòng ban / chức vụ)
+@router.post("/bulk-transfer", response_model=schemas.EmployeeBulkTransferResult)
+def bulk_transfer_employees(
+    transfer: schemas.EmployeeBulkTransfer, background_tasks: BackgroundTasks,
+    db_hr: Session = Depends(get_db_sqlserver), db_payroll: Session = Depends(get_db_mysql),
+    db_auth: Session = Depends(get_db_auth), current_user: schemas.User = Depends(get_current_user)
+):
+    if current_user.role not in ["Admin", "HR Manager", "ADMIN"]:
+        raise HTTPException(status_code=http_status.HTTP_403_FORBIDDEN, detail="Bạn không có quyền chỉnh sửa.")
+    if not transfer.employee_ids:
+        raise HTTPException(status_code=400, detail="Danh sách nhân viên trống")
+    if len(transfer.employee_ids) > crud_employee.BULK_TRANSFER_MAX:
+        raise HTTPException(status_code=400, detail=f"Tối đa {crud_employee.BULK_TRANSFER_MAX} nhân viên mỗi lần")
+
+    try:
+        result = crud_employee.bulk_transfer_employees(
+            db_hr, db_payroll, db_auth, transfer.employee_ids, transfer.DepartmentID, transfer.PositionID
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if result["updated"]:
+        changes = []
+        if transfer.DepartmentID is not None: changes.append(f"Phòng ban -> {transfer.DepartmentID}")
+        if transfer.PositionID is not None: changes.append(f"Chức vụ -> {transfer.PositionID}")
+        # 1 dòng audit cho cả đợt điều chuyển
+        background_tasks.add_task(
+            bg_audit_log, db_auth, current_user.email, "BULK_TRANSFER", f"{result['updated']} nhân viên",
+            f"{', '.join(changes)}; {result['roles_changed']} đổi quyền; IDs: "
+            f"{', '.join(str(i) for i in transfer.employee_ids)}"[:255]
+        )
+    return result
+
+# 2d. XÓA HÀNG LOẠT: kiểm tra ràng buộc theo lô, trả về lý do chặn theo từng ID
+@router.post("/bulk-delete", response_model=schemas.EmployeeBulkDeleteResult)
+def bulk_delete_employees(
+    request: schemas.EmployeeBulkDelete, background_tasks: BackgroundTasks,
+    db_hr: Session = Depends(get_db_sqlserver), db_payroll: Session = Depends(get_db_mysql),
+    db_auth: Session = Depends(get_db_auth), current_user: schemas.User = Depends(get_current_user)
+):
+    if current_user.role not in ["Admin", "HR Manager", "ADMIN"]:
+        raise HTTPException(status_code=http_status.HTTP_403_FORBIDDEN, detail="Không đủ quyền xóa.")
+    if not request.employee_ids:
+        raise HTTPException(status_code=400, detail="Danh sách nhân viên trống")
+    if len(request.employee_ids) > crud_employee.BULK_DELETE_MAX:
+        raise HTTPException(status_code=400, detail=f"Tối đa {crud_employee.BULK_DELETE_MAX} nhân viên mỗi lần")
+
+    result = crud_employee.bulk_delete_employees(db_hr, db_payroll, db_auth, request.employee_ids)
+    if result["deleted"]:
+        background_tasks.add_task(
+            bg_audit_log, db_auth, current_user.email, "BULK_DELETE_EMPLOYEE", f"{len(result['deleted'])} nhân viên",
+            f"Xóa hồ sơ; {len(result['blocked'])} bị chặn; IDs: {', '.join(str(i) for i in result['deleted'])}"[:255]
+        )
+    return result
+
 # 3. XEM CHI TIẾT HỒ SƠ (Bảo mật quyền riêng tư)
+PROFILE_SECTIONS = ("salaries", "attendances", "account")
+
+def _load_profile(db_hr: Session, employee_id: int):
+    """Nguồn HR: chuyển sang schema ngay trong session (worker đóng session khi xong)."""
+    db_employee_hr = db_hr.query(models.EmployeeHR).options(
+        joinedload(models.EmployeeHR.department),
+        joinedload(models.EmployeeHR.position)
+    ).filter(models.EmployeeHR.EmployeeID == employee_id).first()
+    return schemas.EmployeeFullProfile.from_orm(db_employee_hr) if db_employee_hr else None
+
 @router.get("/{employee_id}", response_model=schemas.EmployeeFullProfile)
 def read_employee_profile(
     employee_id: int,
+    include: Optional[str] = Query(None, description="salaries,attendances,account (mặc định: tất cả)"),
+    salary_limit: Optional[int] = Query(None, ge=1, le=500),
+    salary_cursor: Optional[str] = None,
+    attendance_limit: Optional[int] = Query(None, ge=1, le=500),
+    attendance_cursor: Optional[str] = None,
     db_hr: Session = Depends(get_db_sqlserver),
     db_payroll: Session = Depends(get_db_mysql),
     db_auth: Session = Depends(get_db_auth),
     current_user: schemas.User = Depends(get_current_user)
 ):
-    db_employee_hr = crud_employee.get_employee_by_id(db_hr, employee_id)
-    if not db_employee_hr:
-        raise HTTPException(status_code=404, detail="Không tìm thấy nhân viên")
-
     # [Yêu cầu 3] Quyền riêng tư: Chỉ xem thông tin của chính mình
     if current_user.role == "Employee" and current_user.employee_id_link != employee_id:
         raise HTTPException(
@@ -75,17 +201,43 @@ def read_employee_profile(
     if current_user.role != "Employee" and current_user.role not in manager_roles:
          raise HTTPException(status_code=http_status.HTTP_403_FORBIDDEN, detail="Không đủ quyền truy cập.")
 
+    sections = set(PROFILE_SECTIONS) if include is None else {s.strip() for s in include.split(",") if s.strip()}
+    if not sections <= set(PROFILE_SECTIONS):
+        raise HTTPException(status_code=400, detail=f"include hợp lệ: {', '.join(PROFILE_SECTIONS)}")
+    try:
+        salary_after = crud_payroll.decode_history_cursor(salary_cursor, crud_payroll.SALARY_CURSOR) if salary_cursor else None
+        attendance_after = crud_payroll.decode_history_cursor(attendance_cursor, crud_payroll.ATTENDANCE_CURSOR) if attendance_cursor else None
+    except pagination.InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # Tải song song 3 nguồn (HR / Payroll / Auth) - xem services/fanout.py
+    groups = {"profile": ("hr", lambda db: _load_profile(db, employee_id), None)}
+    if "salaries" in sections:
+        groups["salaries"] = ("payroll", lambda db: crud_payroll.get_salary_page(db, employee_id, salary_limit, salary_after), ([], None))
+    if "attendances" in sections:
+        groups["attendances"] = ("payroll", lambda db: crud_payroll.get_attendance_page(db, employee_id, attendance_limit, attendance_after), ([], None))
+    if "account" in sections:
+        groups["account"] = ("auth", lambda db: crud_user.get_user_by_employee_id(db, employee_id), None)
+    results, failed = fanout.run_groups(groups, sessions={"hr": db_hr, "payroll": db_payroll, "auth": db_auth})
+
+    if "profile" in failed:
+        raise HTTPException(status_code=503, detail="Không tải được hồ sơ nhân sự, vui lòng thử lại")
+    profile_data = results["profile"]
+    if not profile_data:
+        raise HTTPException(status_code=404, detail="Không tìm thấy nhân viên")
+
     # [Yêu cầu 1] Lấy dữ liệu lương chi tiết từ Payroll
-    salaries = crud_payroll.get_salary_history(db_payroll, employee_id)
-    attendances = crud_payroll.get_attendance_data(db_payroll, employee_id)
-    auth_user = crud_user.get_user_by_email(db_auth, email=db_employee_hr.Email)
-
-    profile_data = schemas.EmployeeFullProfile.from_orm(db_employee_hr)
-    profile_data.salaries = salaries
-    profile_data.attendances = attendances
-    if auth_user:
-        profile_data.role = auth_user.role
-        profile_data.auth_user_id = auth_user.id
+    if "salaries" in sections:
+        profile_data.salaries, profile_data.salaries_next_cursor = results["salaries"]
+    if "attendances" in sections:
+        profile_data.attendances, profile_data.attendances_next_cursor = results["attendances"]
+    if "account" in sections and "account" not in failed:
+        # Tài khoản cũ có thể chưa gắn employee_id_link -> tìm theo email như trước
+        auth_user = results["account"] or crud_user.get_user_by_email(db_auth, email=profile_data.Email)
+        if auth_user:
+            profile_data.role = auth_user.role
+            profile_data.auth_user_id = auth_user.id
+    profile_data.degraded_sources = failed
 
     return profile_data
 
@@ -0,0 +1,64 @@
+# backend/api/v1/endpoints/report_jobs.py
+import os
+from typing import List
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import FileResponse
+from sqlalchemy.orm import Session
+from database import get_db_auth
+from auth.auth import get_current_active_payroll_manager
+import schemas
+from services import report_jobs
+
+router = APIRouter()
+
+
+def _get_owned_job(db_auth: Session, job_id: str, current_user: schemas.User):
+    job = report_jobs.get_job(db_auth, job_id)
+    # Chỉ người tạo hoặc Admin được xem job (trả 404 để không lộ id của người khác)
+    if not job or (job.created_by != current_user.email and current_user.role != "Admin"):
+        raise HTTPException(status_code=404, detail="Không tìm thấy job báo cáo")
+    return job
+
+
+# Tạo job báo cáo chạy nền, trả về ngay (202) kèm id để theo dõi
+@router.post("/", response_model=schemas.ReportJob, status_code=202)
+def create_report_job(
+    job_in: schemas.ReportJobCreate,
+    db_auth: Session = Depends(get_db_auth),
+    current_user: schemas.User = Depends(get_current_active_payroll_manager)
+):
+    try:
+        return report_jobs.submit(db_auth, job_in.kind, job_in.params, current_user.email)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/", response_model=List[schemas.ReportJob])
+def read_my_report_jobs(
+    db_auth: Session = Depends(get_db_auth),
+    current_user: schemas.User = Depends(get_current_active_payroll_manager)
+):
+    return report_jobs.get_jobs_for_user(db_auth, current_user.email)
+
+
+@router.get("/{job_id}", response_model=schemas.ReportJob)
+def read_report_job(
+    job_id: str,
+    db_auth: Session = Depends(get_db_auth),
+    current_user: schemas.User = Depends(get_current_active_payroll_manager)
+):
+    return _get_owned_job(db_auth, job_id, current_user)
+
+
+@router.get("/{job_id}/download")
+def download_report_job(
+    job_id: str,
+    db_auth: Session = Depends(get_db_auth),
+    current_user: schemas.User = Depends(get_current_active_payroll_manager)
+):
+    job = _get_owned_job(db_auth, job_id, current_user)
+    if job.status != "succeeded":
+        raise HTTPException(status_code=409, detail=f"Job chưa có kết quả (trạng thái: {job.status})")
+    if not job.result_path or not os.path.exists(job.result_path):
+        raise HTTPException(status_code=410, detail="Kết quả báo cáo đã hết hạn hoặc bị xóa")
+    return FileResponse(job.result_path, media_type=job.result_media_type, filename=job.result_filename)
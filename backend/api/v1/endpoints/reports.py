@@ -1,20 +1,26 @@
 # backend/api/v1/endpoints/reports.py
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import func, desc, extract, and_
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, Query
+from fastapi.responses import StreamingResponse
+from typing import Optional
+from sqlalchemy.orm import Session
+from sqlalchemy import func, desc, and_
 from datetime import date, timedelta
-from database import get_db_sqlserver, get_db_mysql, get_db_auth
-from auth.auth import get_current_user
+from database import get_db_sqlserver, get_db_mysql, get_db_auth, SessionLocalSQLServer, SessionLocalMySQL
+from auth.auth import get_current_user, get_current_active_payroll_manager
 import models
 import schemas
 import logging
+from services import (
+    dashboard_snapshot, fanout, my_dashboard_cache, payroll_export, dividend_ledger, reference_cache
+)
+from core import date_keys, http_cache
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-# ... (Giữ nguyên API get_dashboard_summary cũ cho Admin/Manager) ...
+# API Dashboard cho Admin/Manager: đọc snapshot dựng sẵn (services/dashboard_snapshot.py)
 @router.get("/dashboard-summary")
 def get_dashboard_summary(
     db_hr: Session = Depends(get_db_sqlserver),
@@ -22,87 +28,17 @@ def get_dashboard_summary(
     db_auth: Session = Depends(get_db_auth),
     current_user: schemas.User = Depends(get_current_user)
 ):
-    # ... (Code cũ giữ nguyên) ...
-    try:
-        total_employees = db_hr.query(func.count(models.EmployeeHR.EmployeeID)).scalar() or 0
-        shareholder_count = db_auth.query(models.Shareholder).filter(models.Shareholder.status == "Active").count()
-
-        dept_dist = db_hr.query(
-            models.DepartmentHR.DepartmentName, func.count(models.EmployeeHR.EmployeeID)
-        ).select_from(models.EmployeeHR).join(
-            models.DepartmentHR, models.EmployeeHR.DepartmentID == models.DepartmentHR.DepartmentID
-        ).group_by(models.DepartmentHR.DepartmentName).all()
-        dept_data = [{"name": d[0], "value": d[1]} for d in dept_dist]
-
-        status_dist = db_hr.query(
-            models.EmployeeHR.Status, func.count(models.EmployeeHR.EmployeeID)
-        ).group_by(models.EmployeeHR.Status).all()
-        status_data = [{"name": s[0] or "Unknown", "value": s[1]} for s in status_dist]
-
-        latest_salary_month = db_payroll.query(func.max(models.Salary.SalaryMonth)).scalar()
-        total_salary = 0
-        total_base = 0 
-        total_bonus = 0 
-        salary_by_dept = [] 
-        salary_trend_data = []
-        
-        if latest_salary_month:
-            totals = db_payroll.query(
-                func.sum(models.Salary.NetSalary),
-                func.sum(models.Salary.BaseSalary),
-                func.sum(models.Salary.Bonus)
-            ).filter(models.Salary.SalaryMonth == latest_salary_month).first()
-            
-            total_salary = totals[0] or 0
-            total_base = totals[1] or 0
-            total_bonus = totals[2] or 0
-            
-            dist_query = db_payroll.query(
-                models.DepartmentPayroll.DepartmentName, 
-                func.avg(models.Salary.NetSalary) # Sửa thành AVG
-            ).select_from(models.Salary)\
-             .join(models.EmployeePayroll, models.Salary.EmployeeID == models.EmployeePayroll.EmployeeID)\
-             .join(models.DepartmentPayroll, models.EmployeePayroll.DepartmentID == models.DepartmentPayroll.DepartmentID)\
-             .filter(models.Salary.SalaryMonth == latest_salary_month)\
-             .group_by(models.DepartmentPayroll.DepartmentName).all()
-            
-            salary_by_dept = [{"name": a[0], "value": int(a[1]) if a[1] else 0} for a in dist_query]
-
-            trend_query = db_payroll.query(
-                models.Salary.SalaryMonth, func.sum(models.Salary.NetSalary)
-            ).group_by(models.Salary.SalaryMonth)\
-             .order_by(models.Salary.SalaryMonth.desc())\
-             .limit(6).all()
-            salary_trend_data = [{"name": str(t[0]), "value": float(t[1])} for t in reversed(trend_query)]
-
-        total_dividends = db_hr.query(func.sum(models.Dividend.DividendAmount)).scalar() or 0
-
-        return {
-            "hr_metrics": {
-                "total_employees": total_employees,
-                "shareholder_count": shareholder_count,
-                "department_distribution": dept_data,
-                "status_distribution": status_data
-            },
-            "payroll_metrics": {
-                "current_month": latest_salary_month,
-                "total_salary_budget": float(total_salary),
-                "total_base_salary": float(total_base), 
-                "total_bonus": float(total_bonus),       
-                "salary_by_dept": salary_by_dept,
-                "salary_trend": salary_trend_data
-            },
-            "financial_metrics": {
-                "total_dividends": float(total_dividends)
-            }
-        }
-    except Exception as e:
-        logger.error(f"Dashboard Data Error: {e}")
-        return {
-             "hr_metrics": {"total_employees": 0, "shareholder_count": 0, "department_distribution": [], "status_distribution": []},
-             "payroll_metrics": {"current_month": None, "total_salary_budget": 0, "total_base_salary": 0, "total_bonus": 0, "salary_by_dept": [], "salary_trend": []},
-             "financial_metrics": {"total_dividends": 0}
-        }
+    snapshot = dashboard_snapshot.get_snapshot(db_auth)
+    if snapshot is None:
+        # Lần đầu (chưa có snapshot): dựng ngay trong request
+        snapshot = dashboard_snapshot.rebuild_snapshot(db_hr, db_payroll, db_auth)
+    if snapshot is None:
+        return dashboard_snapshot.empty_dashboard_summary()
+
+    return {
+        **snapshot["payload"],
+        "snapshot": {"version": snapshot["version"], "built_at": snapshot["built_at"]}
+    }
 
 # ... (Giữ nguyên API dividend_summary) ...
 @router.get("/dividend_summary")
@@ -112,18 +48,15 @@ def get_dividend_report(
     current_user: schemas.User = Depends(get_current_user)
 ):
     try:
-        total_dividends = db_hr.query(func.sum(models.Dividend.DividendAmount)).scalar() or 0
+        # Đọc từ sổ tổng hợp DividendLedger (nhóm theo EmployeeID, không theo FullName)
+        total_dividends = dividend_ledger.total_paid(db_hr)
         shareholder_count = db_auth.query(models.Shareholder).count()
 
-        top_shareholders = db_hr.query(
-            models.EmployeeHR.FullName,
-            func.sum(models.Dividend.DividendAmount).label("total")
-        ).join(models.Dividend, models.EmployeeHR.EmployeeID == models.Dividend.EmployeeID)\
-         .group_by(models.EmployeeHR.FullName)\
-         .order_by(func.sum(models.Dividend.DividendAmount).desc())\
-         .limit(5).all()
-
-        top_list = [{"name": name, "total": float(amount)} for name, amount in top_shareholders]
+        top_shareholders = dividend_ledger.top_recipients(db_hr, limit=5)
+        top_list = [
+            {"employee_id": emp_id, "name": name or f"NV {emp_id}", "total": float(amount)}
+            for emp_id, name, amount in top_shareholders
+        ]
 
         if not top_list:
             top_shares = db_auth.query(models.Shareholder).order_by(desc(models.Shareholder.shares)).limit(5).all()
@@ -143,75 +76,125 @@ def get_dividend_report(
         "top_shareholders": top_list
     }
 
+# --- Các nhóm truy vấn cho Dashboard cá nhân (mỗi nhóm chỉ chạm 1 CSDL) ---
+def _my_hr_section(db_hr: Session, emp_id: int, today: date) -> dict:
+    """Nguồn: HUMAN_2025 - Thông tin cá nhân, chức vụ, sinh nhật."""
+    emp_info = db_hr.query(
+        models.EmployeeHR.FullName, models.EmployeeHR.PositionID, models.EmployeeHR.DateOfBirth
+    ).filter(models.EmployeeHR.EmployeeID == emp_id).first()
+
+    if not emp_info:
+        return {"full_name": None, "position": "N/A", "is_birthday": False}
+
+    return {
+        "full_name": emp_info.FullName,
+        # Tên chức vụ tra từ cache tham chiếu (không JOIN bảng Positions)
+        "position": reference_cache.position_name(emp_info.PositionID, db_hr, default="N/A"),
+        "is_birthday": bool(
+            emp_info.DateOfBirth
+            and emp_info.DateOfBirth.month == today.month
+            and emp_info.DateOfBirth.day == today.day
+        )
+    }
+
+def _my_payroll_section(db_payroll: Session, emp_id: int, today: date) -> dict:
+    """Nguồn: PAYROLL - Chấm công tháng này, phép năm, lương gần nhất."""
+    # Lấy bản ghi chấm công tháng này
+    attendance_curr = db_payroll.query(models.Attendance).filter(
+        models.Attendance.EmployeeID == emp_id,
+        date_keys.in_month(models.Attendance.AttendanceMonth, today.year, today.month)
+    ).first()
+
+    # Tính tổng LeaveDays trong năm
+    total_leave_used = db_payroll.query(func.sum(models.Attendance.LeaveDays)).filter(
+        models.Attendance.EmployeeID == emp_id,
+        date_keys.in_year(models.Attendance.AttendanceMonth, today.year)
+    ).scalar() or 0
+
+    # Lương gần nhất (Logic đơn giản: bản ghi mới nhất)
+    salary_prev = db_payroll.query(models.Salary).filter(
+        models.Salary.EmployeeID == emp_id
+    ).order_by(models.Salary.SalaryMonth.desc()).first()
+
+    return {
+        "work_days": attendance_curr.WorkDays if attendance_curr else 0,
+        "absent_days": attendance_curr.AbsentDays if attendance_curr else 0,
+        "leave_used": int(total_leave_used),
+        "net_salary": float(salary_prev.NetSalary) if salary_prev else 0,
+        "salary_month": str(salary_prev.SalaryMonth) if salary_prev else "N/A"
+    }
+
+MY_DASHBOARD_CACHE_CONTROL = "private, no-cache"
+
 # [NEW] API Dashboard dành riêng cho Employee
 @router.get("/my-dashboard-summary")
 def get_my_dashboard_summary(
+    request: Request,
+    response: Response,
     db_hr: Session = Depends(get_db_sqlserver),
     db_payroll: Session = Depends(get_db_mysql),
     current_user: schemas.User = Depends(get_current_user)
 ):
     """
     API tổng hợp dữ liệu cho Dashboard cá nhân của nhân viên.
-    Nguồn: HUMAN_2025 (Info) + PAYROLL (Attendance, Salary).
+    Nguồn: HUMAN_2025 (Info) + PAYROLL (Attendance, Salary), truy vấn song song.
+    Payload được cache theo nhân viên kèm ETag: client gửi If-None-Match sẽ nhận 304.
     """
     if not current_user.employee_id_link:
         raise HTTPException(status_code=400, detail="Tài khoản chưa liên kết hồ sơ nhân viên.")
 
+    emp_id = current_user.employee_id_link
+    cached = my_dashboard_cache.get(emp_id)
+    if cached is None:
+        payload = _build_my_dashboard_summary(db_hr, db_payroll, current_user)
+        if payload["degraded_sources"]:
+            # Không cache kết quả thiếu nguồn
+            payload_etag = http_cache.make_etag(payload)
+        else:
+            payload, payload_etag = my_dashboard_cache.put(emp_id, payload)
+    else:
+        payload, payload_etag = cached
+
+    if http_cache.etag_matches(request, payload_etag):
+        return http_cache.not_modified(payload_etag, MY_DASHBOARD_CACHE_CONTROL)
+    http_cache.set_cache_headers(response, payload_etag, MY_DASHBOARD_CACHE_CONTROL)
+    return payload
+
+def _build_my_dashboard_summary(db_hr: Session, db_payroll: Session, current_user: schemas.User) -> dict:
+    """
+    Tính payload Dashboard cá nhân (không qua cache).
+    Nguồn nào lỗi/quá hạn trả về giá trị mặc định và được liệt kê trong `degraded_sources`.
+    """
     emp_id = current_user.employee_id_link
     today = date.today()
-    
-    # --- 1. THÔNG TIN CÁ NHÂN (Nguồn: HUMAN_2025) ---
-    emp_info = db_hr.query(models.EmployeeHR).options(
-        joinedload(models.EmployeeHR.position)
-    ).filter(models.EmployeeHR.EmployeeID == emp_id).first()
-    
-    position_name = emp_info.position.PositionName if emp_info and emp_info.position else "N/A"
 
-    # --- 2. NGÀY CÔNG THÁNG HIỆN TẠI (Nguồn: PAYROLL - Attendance) ---
-    # Lấy bản ghi chấm công tháng này
-    attendance_curr = db_payroll.query(models.Attendance).filter(
-        models.Attendance.EmployeeID == emp_id,
-        extract('month', models.Attendance.AttendanceMonth) == today.month,
-        extract('year', models.Attendance.AttendanceMonth) == today.year
-    ).first()
-    
-    work_days = attendance_curr.WorkDays if attendance_curr else 0
+    results, failed = fanout.run_groups({
+        "hr": ("hr", lambda db: _my_hr_section(db, emp_id, today),
+               {"full_name": None, "position": "N/A", "is_birthday": False}),
+        "payroll": ("payroll", lambda db: _my_payroll_section(db, emp_id, today),
+                    {"work_days": 0, "absent_days": 0, "leave_used": 0, "net_salary": 0, "salary_month": "N/A"}),
+    }, sessions={"hr": db_hr, "payroll": db_payroll})
+    hr, payroll = results["hr"], results["payroll"]
+
     standard_days = 22 # Giả định công chuẩn là 22
-    
-    # --- 3. PHÉP NĂM (Nguồn: PAYROLL - Tính tổng LeaveDays trong năm) ---
-    total_leave_used = db_payroll.query(func.sum(models.Attendance.LeaveDays)).filter(
-        models.Attendance.EmployeeID == emp_id,
-        extract('year', models.Attendance.AttendanceMonth) == today.year
-    ).scalar() or 0
-    
     MAX_LEAVE = 12
-    leave_remaining = MAX_LEAVE - int(total_leave_used)
+    work_days = payroll["work_days"]
 
-    # --- 4. LƯƠNG THÁNG TRƯỚC (Nguồn: PAYROLL - Salaries) ---
-    # Tìm tháng trước (Logic đơn giản: Lấy bản ghi mới nhất không phải tháng này, hoặc mới nhất)
-    salary_prev = db_payroll.query(models.Salary).filter(
-        models.Salary.EmployeeID == emp_id
-    ).order_by(models.Salary.SalaryMonth.desc()).first()
-    
-    net_salary = float(salary_prev.NetSalary) if salary_prev else 0
-    salary_month_str = str(salary_prev.SalaryMonth) if salary_prev else "N/A"
-
-    # --- 5. THÔNG BÁO (Logic tổng hợp) ---
+    # --- THÔNG BÁO (Logic tổng hợp) ---
     notifications = []
-    
+
     # Check Sinh nhật (Từ HR)
-    if emp_info and emp_info.DateOfBirth:
-        if emp_info.DateOfBirth.month == today.month and emp_info.DateOfBirth.day == today.day:
-            notifications.append({"type": "gift", "message": "🎂 Chúc mừng sinh nhật bạn! Công ty gửi lời chúc tốt đẹp nhất."})
-            
+    if hr["is_birthday"]:
+        notifications.append({"type": "gift", "message": "🎂 Chúc mừng sinh nhật bạn! Công ty gửi lời chúc tốt đẹp nhất."})
+
     # Check Quên chấm công (Từ Payroll - Absent > 0 trong tháng này)
-    if attendance_curr and attendance_curr.AbsentDays > 0:
-        notifications.append({"type": "alert", "message": f"⚠️ Bạn có {attendance_curr.AbsentDays} ngày vắng mặt tháng này. Vui lòng giải trình."})
+    if payroll["absent_days"] > 0:
+        notifications.append({"type": "alert", "message": f"⚠️ Bạn có {payroll['absent_days']} ngày vắng mặt tháng này. Vui lòng giải trình."})
 
     return {
         "personal_info": {
-            "full_name": emp_info.FullName if emp_info else current_user.full_name,
-            "position": position_name
+            "full_name": hr["full_name"] or current_user.full_name,
+            "position": hr["position"]
         },
         "attendance": {
             "current_work_days": work_days,
@@ -220,12 +203,87 @@ def get_my_dashboard_summary(
         },
         "leave": {
             "total": MAX_LEAVE,
-            "used": int(total_leave_used),
-            "remaining": leave_remaining
+            "used": payroll["leave_used"],
+            "remaining": MAX_LEAVE - payroll["leave_used"]
         },
         "salary": {
-            "month": salary_month_str,
-            "net_amount": net_salary
+            "month": payroll["salary_month"],
+            "net_amount": payroll["net_salary"]
         },
-        "notifications": notifications
-    }
\ No newline at end of file
+        "notifications": notifications,
+        "degraded_sources": failed
+    }
+
+
+# --- XUẤT DỮ LIỆU HÀNG LOẠT (Stream CSV / NDJSON) ---
+EXPORT_MEDIA_TYPES = {"csv": "text/csv; charset=utf-8", "ndjson": "application/x-ndjson"}
+
+def _export_response(kind: str, fmt: str, from_month: Optional[str], to_month: Optional[str], department_id: Optional[int]):
+    try:
+        start = date_keys.parse_month(from_month) if from_month else None
+        end = date_keys.parse_month(to_month) if to_month else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Tháng không hợp lệ, định dạng đúng: YYYY-MM")
+
+    # Session riêng (không theo request) vì generator chạy sau khi endpoint trả về
+    db_payroll = SessionLocalMySQL.session_factory()
+    db_hr = SessionLocalSQLServer.session_factory()
+    body = payroll_export.stream(
+        kind, fmt, db_payroll, db_hr,
+        from_month=start, to_month=end, department_id=department_id
+    )
+    filename = f"{kind}_{from_month or 'all'}_{to_month or 'all'}.{fmt}"
+    return StreamingResponse(
+        body, media_type=EXPORT_MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+@router.get("/export/salaries")
+def export_salaries(
+    from_month: Optional[str] = None,
+    to_month: Optional[str] = None,
+    department_id: Optional[int] = None,
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    current_user: schemas.User = Depends(get_current_active_payroll_manager)
+):
+    """Xuất bảng lương (PAYROLL) theo khoảng tháng YYYY-MM và phòng ban, kèm họ tên từ HR."""
+    return _export_response("salaries", format, from_month, to_month, department_id)
+
+@router.get("/export/attendance")
+def export_attendance(
+    from_month: Optional[str] = None,
+    to_month: Optional[str] = None,
+    department_id: Optional[int] = None,
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    current_user: schemas.User = Depends(get_current_active_payroll_manager)
+):
+    """Xuất dữ liệu chấm công (PAYROLL) theo khoảng tháng YYYY-MM và phòng ban, kèm họ tên từ HR."""
+    return _export_response("attendance", format, from_month, to_month, department_id)
+
+
+# --- PHÂN TÍCH PHÂN PHỐI LƯƠNG (NumPy) ---
+@router.get("/payroll-analytics")
+def get_payroll_analytics(
+    from_month: Optional[str] = None,
+    to_month: Optional[str] = None,
+    group_by: str = "department,position,company",
+    db_payroll: Session = Depends(get_db_mysql),
+    current_user: schemas.User = Depends(get_current_active_payroll_manager)
+):
+    """
+    Trung vị, p10/p90, IQR, Gini và chênh lệch theo tháng của lương thực nhận,
+    theo phòng ban / chức vụ / toàn công ty trong khoảng tháng YYYY-MM.
+    """
+    from services import payroll_analytics  # numpy: chỉ nạp ở request phân tích đầu tiên
+
+    try:
+        start = date_keys.parse_month(from_month) if from_month else None
+        end = date_keys.parse_month(to_month) if to_month else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Tháng không hợp lệ, định dạng đúng: YYYY-MM")
+
+    dimensions = [d.strip() for d in group_by.split(",") if d.strip() in payroll_analytics.DIMENSIONS]
+    if not dimensions:
+        raise HTTPException(status_code=400, detail=f"group_by hợp lệ: {', '.join(payroll_analytics.DIMENSIONS)}")
+
+    return payroll_analytics.payroll_analytics(db_payroll, start, end, dimensions)
@@ -2,12 +2,13 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from typing import List
 from sqlalchemy.orm import Session
-from decimal import Decimal
 import schemas
 import models
 from crud import crud_shareholder
+from services import dashboard_snapshot, dividend_ledger
 from database import get_db_sqlserver, get_db_auth
 from auth.auth import get_current_user, get_current_active_payroll_manager, get_current_active_hr_manager
+from core.responses import LeanJSONResponse
 
 router = APIRouter()
 
@@ -18,7 +19,7 @@ def get_shareholders(
     current_user: schemas.User = Depends(get_current_user)
 ):
     """Lấy danh sách cổ đông (Data từ SQLite + SQL Server)."""
-    return crud_shareholder.get_shareholders_real(db_auth, db_hr)
+    return LeanJSONResponse(crud_shareholder.get_shareholders_real(db_auth, db_hr))
 
 @router.post("/", response_model=schemas.Shareholder)
 def create_shareholder(
@@ -85,41 +86,7 @@ def preview_dividend_payout(
     current_user: schemas.User = Depends(get_current_active_payroll_manager)
 ):
     """Bước 2: Tính toán tỷ lệ và số tiền cổ tức (Chưa lưu DB)."""
-    shareholders = db_auth.query(models.Shareholder).filter(models.Shareholder.status == "Active").all()
-    
-    if not shareholders:
-        raise HTTPException(status_code=400, detail="Chưa có cổ đông nào trong hệ thống.")
-
-    total_shares = sum(sh.shares for sh in shareholders)
-    if total_shares == 0:
-        raise HTTPException(status_code=400, detail="Tổng số cổ phần bằng 0, không thể chia.")
-
-    dividend_per_share = request.total_profit / Decimal(total_shares)
-
-    emp_ids = [sh.employee_id for sh in shareholders]
-    employees_hr = db_hr.query(models.EmployeeHR).filter(models.EmployeeHR.EmployeeID.in_(emp_ids)).all()
-    emp_map = {e.EmployeeID: {"name": e.FullName, "dept": e.department.DepartmentName if e.department else "N/A"} for e in employees_hr}
-
-    payout_list = []
-    for sh in shareholders:
-        info = emp_map.get(sh.employee_id, {"name": f"NV {sh.employee_id}", "dept": "Unknown"})
-        amount = Decimal(sh.shares) * dividend_per_share
-        percentage = (sh.shares / total_shares) * 100
-
-        payout_list.append(schemas.DividendItem(
-            employee_id=sh.employee_id,
-            full_name=info["name"],
-            department_name=info["dept"],
-            shares=sh.shares,
-            percentage=round(percentage, 2),
-            dividend_amount=round(amount, 0)
-        ))
-
-    return {
-        "total_shares": total_shares,
-        "dividend_per_share": round(dividend_per_share, 2),
-        "payout_list": payout_list
-    }
+    return crud_shareholder.preview_dividend_payout(db_auth, db_hr, request.total_profit)
 
 @router.post("/confirm-payout")
 def confirm_dividend_payout(
@@ -139,7 +106,12 @@ def confirm_dividend_payout(
             new_records.append(record)
         
         db_hr.add_all(new_records)
+        # Cập nhật sổ tổng hợp cổ tức trong cùng transaction
+        dividend_ledger.record_payouts(db_hr, [
+            (r.EmployeeID, r.DividendAmount, r.DividendDate) for r in new_records
+        ])
         db_hr.commit()
+        dashboard_snapshot.request_rebuild()
         
         return {"message": f"Đã lưu đợt chi trả '{data.title}' thành công cho {len(new_records)} cổ đông."}
         
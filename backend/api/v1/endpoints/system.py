@@ -4,7 +4,9 @@ from sqlalchemy.orm import Session
 from typing import List
 import schemas
 from crud import crud_system
-from database import get_db_auth
+from database import get_db_auth, get_db_sqlserver
+from services import sync_outbox, hr_sync
+from core.responses import LeanJSONResponse
 from auth.auth import get_current_active_admin
 
 router = APIRouter()
@@ -18,7 +20,7 @@ def read_audit_logs(
     current_user: schemas.User = Depends(get_current_active_admin)
 ):
     """Xem nhật ký hoạt động hệ thống."""
-    return crud_system.get_audit_logs(db_auth, skip=skip, limit=limit)
+    return LeanJSONResponse(crud_system.get_audit_logs(db_auth, skip=skip, limit=limit))
 
 # --- SYSTEM CONFIG (Chỉ Admin) ---
 @router.get("/config", response_model=List[schemas.SystemConfig])
@@ -36,4 +38,39 @@ def update_config(
     current_user: schemas.User = Depends(get_current_active_admin)
 ):
     """Cập nhật tham số cấu hình (VD: ngưỡng cảnh báo)."""
-    return crud_system.set_config(db_auth, key, config.value)
\ No newline at end of file
+    return crud_system.set_config(db_auth, key, config.value)
+
+# --- HÀNG ĐỢI ĐỒNG BỘ HR -> PAYROLL / AUTH (Chỉ Admin) ---
+@router.get("/sync-outbox", response_model=schemas.SyncOutboxStatus)
+def read_sync_outbox_status(
+    db_hr: Session = Depends(get_db_sqlserver),
+    current_user: schemas.User = Depends(get_current_active_admin)
+):
+    """Số sự kiện đang chờ / lỗi và lỗi gần nhất của relay đồng bộ."""
+    return sync_outbox.status(db_hr)
+
+@router.post("/sync-outbox/retry")
+def retry_sync_outbox(
+    db_hr: Session = Depends(get_db_sqlserver),
+    current_user: schemas.User = Depends(get_current_active_admin)
+):
+    """Đưa các sự kiện đồng bộ bị lỗi về hàng đợi để thử lại."""
+    return {"requeued": sync_outbox.retry_failed(db_hr)}
+
+# --- ĐỒNG BỘ HR -> AUTH TĂNG DẦN (Chỉ Admin) ---
+@router.get("/hr-sync")
+def read_hr_sync_status(
+    db_auth: Session = Depends(get_db_auth),
+    current_user: schemas.User = Depends(get_current_active_admin)
+):
+    """Watermark hiện tại và kết quả lần đồng bộ tài khoản / cổ đông gần nhất."""
+    return LeanJSONResponse(hr_sync.status(db_auth))
+
+@router.post("/hr-sync/full-rescan", status_code=202)
+def request_hr_full_rescan(
+    current_user: schemas.User = Depends(get_current_active_admin)
+):
+    """Quét lại toàn bộ nhân viên HR (chạy nền trên scheduler) rồi đặt lại watermark."""
+    if not hr_sync.request_full_rescan():
+        raise HTTPException(status_code=503, detail="Scheduler chưa chạy, thử lại sau khi khởi động xong.")
+    return {"scheduled": True}
@@ -6,6 +6,7 @@ import schemas
 from crud import crud_user
 from database import get_db_auth
 from auth.auth import get_current_active_admin, get_current_user
+from core.responses import LeanJSONResponse
 
 router = APIRouter()
 
@@ -30,7 +31,7 @@ def read_users(
         search=search, # Truyền vào CRUD
         role=role      # Truyền vào CRUD
     )
-    return users
+    return LeanJSONResponse(users)
 # --- KẾT THÚC SỬA ---
 
 @router.post("/", response_model=schemas.UserInDB, status_code=status.HTTP_201_CREATED)
@@ -1,7 +1,6 @@
 # backend/auth/auth.py
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from jose import JWTError, jwt
 from sqlalchemy.orm import Session
 from typing import Optional
 
@@ -27,6 +26,7 @@ async def get_current_user(
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+    from jose import JWTError, jwt  # nạp lười: không tốn thời gian import khi khởi động worker
     try:
         # Giải mã token
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
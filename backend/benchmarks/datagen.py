@@ -0,0 +1,253 @@
+# backend/benchmarks/datagen.py
+"""
+Sinh dữ liệu giả lập (tất định theo seed) cho 3 CSDL để chạy benchmark.
+
+Tạo 3 file SQLite thay thế cho HUMAN_2025 / PAYROLL / Auth theo đúng schema
+trong models.py: nhân viên, phòng ban, chức vụ, lương + chấm công nhiều năm,
+cổ tức, cổ đông, tài khoản, thông báo và nhật ký hệ thống. Các bảng tổng hợp
+(payroll_month_rollup, DividendLedger), chỉ mục tìm kiếm FTS5 (employee_search) và
+danh bạ employee_directory được dựng lại sau khi sinh, để benchmark đo đúng đường
+đọc như production (benchmarks/run.py bỏ qua lifespan nên không tự dựng).
+
+Ví dụ (chạy từ thư mục backend):
+    python -m benchmarks.datagen --size 10k
+    python -m benchmarks.datagen --size 1m --months 24 --out ./bench_data
+"""
+import argparse
+import os
+import random
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import sessionmaker
+
+SIZES = {"1k": 1_000, "10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+DEFAULT_SEED = 2025
+DEFAULT_MONTHS = 36
+INSERT_BATCH = 5000
+
+BENCH_ADMIN_EMAIL = "bench.admin@company.vn"
+
+HO = ["Nguyễn", "Trần", "Lê", "Phạm", "Hoàng", "Huỳnh", "Phan", "Vũ", "Võ", "Đặng", "Bùi", "Đỗ", "Hồ", "Ngô", "Dương"]
+DEM = ["Văn", "Thị", "Hữu", "Minh", "Ngọc", "Thanh", "Quốc", "Đức", "Thu", "Gia", "Bảo", "Anh"]
+TEN = ["An", "Bình", "Chi", "Dũng", "Đạt", "Giang", "Hà", "Hải", "Hạnh", "Hùng", "Khánh", "Lan",
+       "Linh", "Long", "Mai", "Nam", "Nga", "Phúc", "Quân", "Sơn", "Tâm", "Thảo", "Trang", "Tuấn", "Vy", "Yến"]
+DEPARTMENTS = ["Nhân sự", "Kế toán", "Kinh doanh", "Marketing", "Kỹ thuật", "Sản xuất", "Kho vận",
+               "Chăm sóc khách hàng", "Pháp chế", "Nghiên cứu", "Mua hàng", "Công nghệ thông tin"]
+POSITIONS = ["Nhân viên", "Chuyên viên", "Trưởng nhóm", "Phó phòng", "Trưởng phòng", "Kế toán viên",
+             "Kỹ sư", "Lập trình viên", "Thực tập sinh", "Giám đốc", "Phó giám đốc", "Thư ký",
+             "Tài xế", "Bảo vệ", "Quản lý Nhân sự", "Quản lý Lương"]
+STATUSES = ["Đang làm việc"] * 17 + ["Nghỉ phép", "Đã nghỉ việc", "Tạm nghỉ"]
+ROLES_BY_POSITION = {"Giám đốc": "Admin", "Quản lý Nhân sự": "HR Manager", "Quản lý Lương": "Payroll Manager"}
+
+
+def _sqlite_engine(path: str):
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+
+    @event.listens_for(engine, "connect")
+    def _fast_pragmas(dbapi_conn, _):
+        # Chỉ dùng khi sinh dữ liệu: bỏ journal/fsync để ghi nhanh
+        cursor = dbapi_conn.cursor()
+        cursor.execute("PRAGMA journal_mode=OFF")
+        cursor.execute("PRAGMA synchronous=OFF")
+        cursor.close()
+
+    return engine
+
+
+def _insert(conn, table, rows):
+    """Chèn theo lô INSERT_BATCH dòng (executemany) từ một iterable bất kỳ."""
+    batch, total = [], 0
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= INSERT_BATCH:
+            conn.execute(table.insert(), batch)
+            total += len(batch)
+            batch = []
+    if batch:
+        conn.execute(table.insert(), batch)
+        total += len(batch)
+    return total
+
+
+def _month_list(months: int, last_month: date):
+    result, y, m = [], last_month.year, last_month.month
+    for _ in range(months):
+        result.append(date(y, m, 1))
+        y, m = (y, m - 1) if m > 1 else (y - 1, 12)
+    return list(reversed(result))
+
+
+def _employees(rng: random.Random, n: int, today: date):
+    for emp_id in range(1, n + 1):
+        hire = today - timedelta(days=rng.randint(30, 365 * 15))
+        yield {
+            "EmployeeID": emp_id,
+            "FullName": f"{rng.choice(HO)} {rng.choice(DEM)} {rng.choice(TEN)}",
+            "DateOfBirth": hire - timedelta(days=rng.randint(365 * 20, 365 * 40)),
+            "Gender": rng.choice(["Nam", "Nữ"]),
+            "PhoneNumber": f"09{emp_id:08d}",
+            "Email": f"nv{emp_id}@company.vn",
+            "HireDate": hire,
+            "DepartmentID": rng.randint(1, len(DEPARTMENTS)),
+            "PositionID": rng.randint(1, len(POSITIONS)),
+            "Status": rng.choice(STATUSES),
+        }
+
+
+def generate(size: str, out_dir: str, seed: int = DEFAULT_SEED, months: int = DEFAULT_MONTHS, today: date = None):
+    """Sinh 3 file hr.db / payroll.db / auth.db trong out_dir. Trả về dict đường dẫn + số dòng."""
+    import models  # noqa: F401 - nạp định nghĩa bảng vào metadata
+    from database import BaseSQLServer, BaseMySQL, BaseAuth
+    from services import payroll_rollup, dividend_ledger, employee_search, employee_directory
+
+    n = SIZES[size]
+    today = today or date(2025, 12, 31)  # Cố định để dữ liệu tất định
+    month_list = _month_list(months, date(today.year, today.month, 1))
+    os.makedirs(out_dir, exist_ok=True)
+    paths = {k: os.path.join(out_dir, f"{k}_{size}.db") for k in ("hr", "payroll", "auth")}
+    for path in paths.values():
+        if os.path.exists(path):
+            os.remove(path)
+
+    engines = {k: _sqlite_engine(p) for k, p in paths.items()}
+    BaseSQLServer.metadata.create_all(engines["hr"])
+    BaseMySQL.metadata.create_all(engines["payroll"])
+    BaseAuth.metadata.create_all(engines["auth"])
+    counts = {}
+
+    # Bảng nhân viên sinh 1 lần, dùng chung cho cả 3 CSDL (giữ trong bộ nhớ dạng gọn)
+    emp_rng = random.Random(seed)
+    employees = [(e["EmployeeID"], e["FullName"], e["Email"], e["DepartmentID"], e["PositionID"], e["Status"], e)
+                 for e in _employees(emp_rng, n, today)]
+
+    with engines["hr"].begin() as conn:
+        counts["Departments"] = _insert(conn, models.DepartmentHR.__table__,
+                                        ({"DepartmentID": i, "DepartmentName": d} for i, d in enumerate(DEPARTMENTS, 1)))
+        counts["Positions"] = _insert(conn, models.PositionHR.__table__,
+                                      ({"PositionID": i, "PositionName": p} for i, p in enumerate(POSITIONS, 1)))
+        counts["Employees"] = _insert(conn, models.EmployeeHR.__table__, (e[-1] for e in employees))
+
+        div_rng = random.Random(seed + 1)
+        payout_dates = [date(y, 6, 30) for y in range(today.year - months // 12 + 1, today.year + 1)]
+        counts["Dividends"] = _insert(conn, models.Dividend.__table__, (
+            {"EmployeeID": emp_id, "DividendDate": d,
+             "DividendAmount": Decimal(div_rng.randint(50, 5000) * 1000)}
+            for emp_id, *_ in employees if div_rng.random() < 0.3
+            for d in payout_dates
+        ))
+
+    with engines["payroll"].begin() as conn:
+        counts["departments"] = _insert(conn, models.DepartmentPayroll.__table__,
+                                        ({"DepartmentID": i, "DepartmentName": d} for i, d in enumerate(DEPARTMENTS, 1)))
+        counts["positions"] = _insert(conn, models.PositionPayroll.__table__,
+                                      ({"PositionID": i, "PositionName": p} for i, p in enumerate(POSITIONS, 1)))
+        counts["employees"] = _insert(conn, models.EmployeePayroll.__table__, (
+            {"EmployeeID": emp_id, "FullName": name, "DepartmentID": dept, "PositionID": pos, "Status": st}
+            for emp_id, name, _, dept, pos, st, _ in employees
+        ))
+
+        sal_rng = random.Random(seed + 2)
+
+        def salaries():
+            for emp_id, *_ in employees:
+                base = sal_rng.randint(8, 60) * 500_000
+                for m in month_list:
+                    bonus = sal_rng.choice((0, 0, 0, 500_000, 1_000_000, 2_000_000))
+                    deductions = sal_rng.randint(0, 10) * 100_000
+                    yield {"EmployeeID": emp_id, "SalaryMonth": m, "BaseSalary": Decimal(base),
+                           "Bonus": Decimal(bonus), "Deductions": Decimal(deductions),
+                           "NetSalary": Decimal(base + bonus - deductions)}
+
+        counts["salaries"] = _insert(conn, models.Salary.__table__, salaries())
+
+        att_rng = random.Random(seed + 3)
+
+        def attendance():
+            for emp_id, *_ in employees:
+                for m in month_list:
+                    absent, leave = att_rng.choice((0, 0, 0, 1, 2)), att_rng.choice((0, 0, 1, 2, 3, 6))
+                    yield {"EmployeeID": emp_id, "AttendanceMonth": m,
+                           "WorkDays": max(0, 22 - absent - leave), "AbsentDays": absent, "LeaveDays": leave}
+
+        counts["attendance"] = _insert(conn, models.Attendance.__table__, attendance())
+
+    with engines["auth"].begin() as conn:
+        counts["users"] = _insert(conn, models.User.__table__, [
+            {"email": BENCH_ADMIN_EMAIL, "full_name": "Benchmark Admin", "hashed_password": "bench",
+             "role": "Admin", "employee_id_link": None}
+        ] + [
+            {"email": email, "full_name": name, "hashed_password": "123456",
+             "role": ROLES_BY_POSITION.get(POSITIONS[pos - 1], "Employee"), "employee_id_link": emp_id}
+            for emp_id, name, email, _, pos, _, _ in employees
+        ])
+
+        sh_rng = random.Random(seed + 4)
+        counts["shareholders"] = _insert(conn, models.Shareholder.__table__, (
+            {"employee_id": emp_id, "shares": sh_rng.randint(100, 10_000), "status": "Active"}
+            for emp_id, *_ in employees if sh_rng.random() < 0.4
+        ))
+
+        noti_rng = random.Random(seed + 5)
+        base_time = datetime(today.year, today.month, today.day, 8, 0)
+        counts["notifications"] = _insert(conn, models.Notification.__table__, (
+            {"user_id": noti_rng.randint(2, n + 1) if noti_rng.random() < 0.7 else None,
+             "role_target": None if noti_rng.random() < 0.7 else noti_rng.choice(["Admin", "HR Manager", "Payroll Manager"]),
+             "message": f"Thông báo thử nghiệm #{i}", "type": noti_rng.choice(["anniversary", "leave", "payroll"]),
+             "is_read": noti_rng.random() < 0.6, "created_at": base_time - timedelta(minutes=i),
+             "related_employee_id": noti_rng.randint(1, n)}
+            for i in range(n // 2)
+        ))
+
+        log_rng = random.Random(seed + 6)
+        counts["audit_logs"] = _insert(conn, models.AuditLog.__table__, (
+            {"user_email": f"nv{log_rng.randint(1, n)}@company.vn",
+             "action": log_rng.choice(["CREATE", "UPDATE", "DELETE", "LOGIN"]),
+             "target": f"Employee {log_rng.randint(1, n)}", "details": "benchmark",
+             "timestamp": base_time - timedelta(minutes=i)}
+            for i in range(n // 2)
+        ))
+
+    # Dựng các bảng tổng hợp / chỉ mục như môi trường thật (các bước khởi động trong main.py)
+    db_payroll = sessionmaker(bind=engines["payroll"])()
+    db_hr = sessionmaker(bind=engines["hr"])()
+    db_auth = sessionmaker(bind=engines["auth"])()
+    try:
+        counts["payroll_month_rollup"] = payroll_rollup.rebuild(db_payroll)
+        counts["DividendLedger"] = dividend_ledger.rebuild(db_hr)
+        if not employee_search.ensure_index(db_auth, db_hr):
+            raise RuntimeError("SQLite hiện tại không hỗ trợ FTS5: benchmark tìm kiếm sẽ chỉ đo đường ilike")
+        counts["employee_search"] = db_auth.execute(text(f"SELECT count(*) FROM {employee_search.TABLE}")).scalar()
+        directory = employee_directory.reconcile(db_hr, db_auth)
+        if "error" in directory:
+            raise RuntimeError(f"Lỗi dựng employee_directory: {directory['error']}")
+        counts["employee_directory"] = directory["inserted"]
+    finally:
+        db_payroll.close()
+        db_hr.close()
+        db_auth.close()
+
+    for engine in engines.values():
+        engine.dispose()
+    return {"paths": paths, "counts": counts}
+
+
+def data_paths(size: str, out_dir: str) -> dict:
+    return {k: os.path.join(out_dir, f"{k}_{size}.db") for k in ("hr", "payroll", "auth")}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sinh dữ liệu giả lập cho benchmark")
+    parser.add_argument("--size", choices=SIZES.keys(), default="10k")
+    parser.add_argument("--out", default="./bench_data")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--months", type=int, default=DEFAULT_MONTHS, help="Số tháng lương/chấm công mỗi nhân viên")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    result = generate(args.size, args.out, args.seed, args.months)
+    for table, count in result["counts"].items():
+        print(f"   {table:<22} {count:>12,}")
+    print(f"✅ Đã sinh dữ liệu '{args.size}' trong {time.perf_counter() - started:.1f}s -> {args.out}")
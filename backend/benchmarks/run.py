@@ -0,0 +1,187 @@
+# backend/benchmarks/run.py
+"""
+Benchmark các endpoint nóng qua ứng dụng ASGI (TestClient, không cần server).
+
+HR / Payroll / Auth được trỏ sang các file SQLite do benchmarks/datagen.py sinh
+ra (qua HR_DB_URL, PAYROLL_DB_URL, DASHBOARD_DB_URL) TRƯỚC khi import app.
+Với mỗi endpoint báo cáo: độ trễ p50/p95/p99 (ms), số truy vấn SQL / request
+(đếm qua sự kiện before_cursor_execute trên cả 3 engine) và bộ nhớ đỉnh
+(tracemalloc, đo ở một lượt riêng để không làm sai số đo thời gian).
+
+Ví dụ (chạy từ thư mục backend):
+    python -m benchmarks.datagen --size 10k
+    python -m benchmarks.run --size 10k --save-baseline
+    python -m benchmarks.run --size 10k            # so sánh với baseline đã lưu
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+from benchmarks.datagen import SIZES, BENCH_ADMIN_EMAIL, data_paths
+
+BASELINE_DIR = os.path.join(os.path.dirname(__file__), "baselines")
+
+# (tên, vai trò token, đường dẫn). {emp_id} được thay bằng nhân viên mẫu.
+ENDPOINTS = [
+    ("employees_list", "admin", "/api/v1/employees/?limit=100"),
+    ("employees_list_1000", "admin", "/api/v1/employees/?limit=1000"),
+    ("users_1000", "admin", "/api/v1/users/?limit=1000"),
+    ("audit_logs_1000", "admin", "/api/v1/system/logs?limit=1000"),
+    ("employees_page", "admin", "/api/v1/employees/page?limit=100&sort=name"),
+    ("employees_search", "admin", "/api/v1/employees/?search=Nguyễn&limit=100"),
+    ("employee_profile", "admin", "/api/v1/employees/{emp_id}"),
+    ("dashboard_summary", "admin", "/api/v1/reports/dashboard-summary"),
+    ("my_dashboard_summary", "employee", "/api/v1/reports/my-dashboard-summary"),
+    ("dividend_summary", "admin", "/api/v1/reports/dividend_summary"),
+    ("payroll_analytics", "admin", "/api/v1/reports/payroll-analytics"),
+    ("shareholders", "admin", "/api/v1/shareholders/"),
+    ("notifications", "admin", "/api/v1/notifications/"),
+    ("employee_salaries", "admin", "/api/v1/payroll/{emp_id}/salaries"),
+]
+
+
+def _configure_env(size: str, data_dir: str):
+    paths = data_paths(size, data_dir)
+    missing = [p for p in paths.values() if not os.path.exists(p)]
+    if missing:
+        sys.exit(f"Chưa có dữ liệu: {', '.join(missing)}. Chạy: python -m benchmarks.datagen --size {size}")
+    os.environ["HR_DB_URL"] = f"sqlite:///{paths['hr']}"
+    os.environ["PAYROLL_DB_URL"] = f"sqlite:///{paths['payroll']}"
+    os.environ["DASHBOARD_DB_URL"] = f"sqlite:///{paths['auth']}"
+
+
+class QueryCounter:
+    def __init__(self, engines):
+        from sqlalchemy import event
+        self.count = 0
+        for engine in engines:
+            event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *args, **kwargs):
+        self.count += 1
+
+
+def _percentiles(samples):
+    if len(samples) < 2:
+        value = samples[0] if samples else 0.0
+        return value, value, value
+    q = statistics.quantiles(samples, n=100, method="inclusive")
+    return q[49], q[94], q[98]
+
+
+def run(size: str, data_dir: str, iterations: int, warmup: int, only=None) -> dict:
+    _configure_env(size, data_dir)
+
+    # Import sau khi đặt biến môi trường: engines đọc settings lúc import
+    from fastapi.testclient import TestClient
+    from core.security import create_access_token
+    from database import engine_sqlserver, engine_mysql, engine_auth, SessionLocalAuth
+    from models import User
+    from main import app
+
+    db_auth = SessionLocalAuth()
+    try:
+        employee = db_auth.query(User).filter(User.employee_id_link.isnot(None))\
+            .order_by(User.employee_id_link).first()
+    finally:
+        SessionLocalAuth.remove()
+    tokens = {
+        "admin": create_access_token({"sub": BENCH_ADMIN_EMAIL, "role": "Admin", "emp_id": None}),
+        "employee": create_access_token({"sub": employee.email, "role": employee.role,
+                                         "emp_id": employee.employee_id_link}),
+    }
+
+    counter = QueryCounter([engine_sqlserver, engine_mysql, engine_auth])
+    client = TestClient(app)  # Không dùng "with": bỏ qua lifespan (đồng bộ khởi động + scheduler)
+    results = {}
+
+    for name, role, path in ENDPOINTS:
+        if only and name not in only:
+            continue
+        url = path.format(emp_id=employee.employee_id_link)
+        headers = {"Authorization": f"Bearer {tokens[role]}"}
+
+        for _ in range(warmup):
+            client.get(url, headers=headers)
+
+        timings, queries, status = [], [], None
+        for _ in range(iterations):
+            counter.count = 0
+            started = time.perf_counter()
+            response = client.get(url, headers=headers)
+            timings.append((time.perf_counter() - started) * 1000)
+            queries.append(counter.count)
+            status = response.status_code
+
+        tracemalloc.start()
+        tracemalloc.reset_peak()
+        client.get(url, headers=headers)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        p50, p95, p99 = _percentiles(timings)
+        results[name] = {
+            "status": status,
+            "p50_ms": round(p50, 2),
+            "p95_ms": round(p95, 2),
+            "p99_ms": round(p99, 2),
+            "queries": round(statistics.mean(queries), 1),
+            "peak_kb": round(peak / 1024, 1),
+        }
+    return results
+
+
+def _baseline_path(size: str) -> str:
+    return os.path.join(BASELINE_DIR, f"{size}.json")
+
+
+def _delta(current, previous):
+    if previous in (None, 0):
+        return ""
+    return f"{(current - previous) / previous * 100:+.0f}%"
+
+
+def print_report(results: dict, baseline: dict = None):
+    baseline = baseline or {}
+    header = f"{'endpoint':<22}{'status':>7}{'p50':>10}{'p95':>10}{'p99':>10}{'queries':>9}{'peak KB':>10}"
+    if baseline:
+        header += f"{'Δp50':>8}{'Δp95':>8}{'Δq':>7}{'Δmem':>8}"
+    print(header)
+    print("-" * len(header))
+    for name, r in results.items():
+        line = (f"{name:<22}{r['status']:>7}{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}"
+                f"{r['p99_ms']:>10.2f}{r['queries']:>9}{r['peak_kb']:>10.1f}")
+        b = baseline.get(name)
+        if b:
+            line += (f"{_delta(r['p50_ms'], b['p50_ms']):>8}{_delta(r['p95_ms'], b['p95_ms']):>8}"
+                     f"{_delta(r['queries'], b['queries']):>7}{_delta(r['peak_kb'], b['peak_kb']):>8}")
+        print(line)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark các endpoint nóng trên dữ liệu giả lập")
+    parser.add_argument("--size", choices=SIZES.keys(), default="10k")
+    parser.add_argument("--data", default="./bench_data", help="Thư mục chứa dữ liệu từ benchmarks.datagen")
+    parser.add_argument("-n", "--iterations", type=int, default=50)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--only", nargs="*", help="Chỉ chạy các endpoint có tên này")
+    parser.add_argument("--save-baseline", action="store_true", help="Lưu kết quả làm baseline cho kích thước này")
+    args = parser.parse_args()
+
+    results = run(args.size, args.data, args.iterations, args.warmup, args.only)
+
+    baseline = None
+    if os.path.exists(_baseline_path(args.size)) and not args.save_baseline:
+        with open(_baseline_path(args.size), encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+    print_report(results, baseline)
+
+    if args.save_baseline:
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        with open(_baseline_path(args.size), "w", encoding="utf-8") as f:
+            json.dump({"size": args.size, "iterations": args.iterations, "results": results}, f, indent=2)
+        print(f"✅ Đã lưu baseline: {_baseline_path(args.size)}")
@@ -0,0 +1,18 @@
+# backend/core/batching.py
+"""
+Chia danh sách lớn thành từng lô (chunk) cho truy vấn IN (...) và executemany.
+SQL Server giới hạn ~2100 tham số mỗi câu lệnh, nên không dùng IN list không giới hạn.
+"""
+from itertools import islice
+
+IN_CHUNK_SIZE = 1000
+
+
+def chunked(iterable, size: int = IN_CHUNK_SIZE):
+    """Sinh các list con tối đa `size` phần tử."""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
@@ -1,7 +1,6 @@
 # backend/core/config.py
 import os
 from dotenv import load_dotenv
-from sqlalchemy import create_engine # Đã chuyển import create_engine về đây
 
 load_dotenv()
 
@@ -42,9 +41,85 @@ class Settings:
     # CSDL mới cho Dashboard Auth (SQLite)
     DASHBOARD_DB_URL = os.getenv("DASHBOARD_DB_URL", "sqlite:///./dashboard_auth.db")
 
+    # Ghi đè toàn bộ chuỗi kết nối HR/Payroll (vd. SQLite thay thế khi chạy benchmarks/)
+    HR_DB_URL = os.getenv("HR_DB_URL")
+    PAYROLL_DB_URL = os.getenv("PAYROLL_DB_URL")
+    if HR_DB_URL:
+        SQLALCHEMY_DATABASE_URI_SQLSERVER = HR_DB_URL
+    if PAYROLL_DB_URL:
+        SQLALCHEMY_DATABASE_URI_MYSQL = PAYROLL_DB_URL
+
     # JWT Settings
     SECRET_KEY = os.getenv("SECRET_KEY", "a_very_secret_key_that_is_long_and_secure")
     ALGORITHM = os.getenv("ALGORITHM", "HS256")
     ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 60))
 
+    # Snapshot Dashboard (dữ liệu tổng hợp dựng sẵn chạy nền)
+    DASHBOARD_SNAPSHOT_REFRESH_MINUTES = int(os.getenv("DASHBOARD_SNAPSHOT_REFRESH_MINUTES", 15))
+    DASHBOARD_SNAPSHOT_MEMORY_TTL_SECONDS = int(os.getenv("DASHBOARD_SNAPSHOT_MEMORY_TTL_SECONDS", 30))
+
+    # Đối soát payroll_month_rollup với bảng salaries (lương do hệ thống payroll cũ ghi thẳng vào MySQL)
+    PAYROLL_ROLLUP_RECONCILE_MINUTES = int(os.getenv("PAYROLL_ROLLUP_RECONCILE_MINUTES", 15))
+    PAYROLL_ROLLUP_RECENT_MONTHS = int(os.getenv("PAYROLL_ROLLUP_RECENT_MONTHS", 3))
+
+    # Cache Dashboard cá nhân (ETag/304)
+    MY_DASHBOARD_CACHE_TTL_SECONDS = int(os.getenv("MY_DASHBOARD_CACHE_TTL_SECONDS", 600))
+    MY_DASHBOARD_CACHE_MAX_ENTRIES = int(os.getenv("MY_DASHBOARD_CACHE_MAX_ENTRIES", 20000))
+
+    # Cache dữ liệu tham chiếu (phòng ban / chức vụ): tự nạp lại sau TTL
+    REFERENCE_CACHE_TTL_SECONDS = int(os.getenv("REFERENCE_CACHE_TTL_SECONDS", 300))
+
+    # Tìm kiếm nhân viên qua chỉ mục FTS5: số kết quả tối đa (<= giới hạn IN của SQL Server)
+    EMPLOYEE_SEARCH_MAX_RESULTS = int(os.getenv("EMPLOYEE_SEARCH_MAX_RESULTS", 1000))
+
+    # Danh bạ nhân viên phi chuẩn hóa trong Auth DB (đọc danh sách không cần JOIN sang HR)
+    EMPLOYEE_DIRECTORY_ENABLED = os.getenv("EMPLOYEE_DIRECTORY_ENABLED", "true").lower() == "true"
+    EMPLOYEE_DIRECTORY_RECONCILE_MINUTES = int(os.getenv("EMPLOYEE_DIRECTORY_RECONCILE_MINUTES", 30))
+
+    # Đồng bộ HR -> Payroll / Auth: "outbox" (ghi HR + hàng đợi trong 1 commit, relay chạy nền)
+    # hoặc "sync" (ghi lần lượt 3 CSDL trong request như trước)
+    SYNC_MODE = os.getenv("SYNC_MODE", "outbox")
+    SYNC_RELAY_INTERVAL_SECONDS = int(os.getenv("SYNC_RELAY_INTERVAL_SECONDS", 10))
+    SYNC_RELAY_BATCH_SIZE = int(os.getenv("SYNC_RELAY_BATCH_SIZE", 200))
+    SYNC_MAX_ATTEMPTS = int(os.getenv("SYNC_MAX_ATTEMPTS", 0))  # 0 = thử lại mãi (tối đa 5 phút / lần)
+    SYNC_ALERT_AFTER_ATTEMPTS = int(os.getenv("SYNC_ALERT_AFTER_ATTEMPTS", 10))  # ~15 phút lỗi liên tục
+    SYNC_OUTBOX_RETENTION_DAYS = int(os.getenv("SYNC_OUTBOX_RETENTION_DAYS", 7))
+
+    # Khởi động: "background" (đồng bộ + làm nóng chạy nền, theo dõi ở /readyz),
+    # "blocking" (chờ xong mới nhận request như trước), "skip" (bỏ qua đồng bộ tài khoản / cổ đông)
+    STARTUP_SYNC_MODE = os.getenv("STARTUP_SYNC_MODE", "background")
+
+    # Đồng bộ HR -> Auth (tài khoản, cổ đông) tăng dần theo watermark lưu trong system_configs.
+    # HR_SYNC_CHANGE_COLUMN: tên cột rowversion của bảng Employees (nếu có) để bắt cả dòng đã sửa
+    HR_SYNC_INTERVAL_MINUTES = int(os.getenv("HR_SYNC_INTERVAL_MINUTES", 5))
+    HR_SYNC_CHANGE_COLUMN = os.getenv("HR_SYNC_CHANGE_COLUMN", "")
+    # Quét lại N EmployeeID ngay dưới watermark (IDENTITY commit không theo thứ tự)
+    HR_SYNC_ID_LOOKBACK = int(os.getenv("HR_SYNC_ID_LOOKBACK", 1000))
+    # Quét toàn bộ định kỳ (bắt thay đổi Status / dòng sửa khi không có cột rowversion), 0 = tắt
+    HR_SYNC_FULL_RESCAN_MINUTES = int(os.getenv("HR_SYNC_FULL_RESCAN_MINUTES", 60))
+
+    # Nhập nhân viên hàng loạt: số dòng mỗi lô (kiểm tra + ghi)
+    IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", 500))
+
+    # Job báo cáo chạy nền (kết quả lưu trên đĩa, tự xóa sau TTL)
+    REPORT_JOB_WORKERS = int(os.getenv("REPORT_JOB_WORKERS", 2))
+    REPORT_JOB_DIR = os.getenv("REPORT_JOB_DIR", "./report_jobs")
+    REPORT_JOB_TTL_HOURS = int(os.getenv("REPORT_JOB_TTL_HOURS", 24))
+    # Tiến trình gia hạn job của mình mỗi HEARTBEAT giây; job không được gia hạn quá LEASE giây -> lỗi
+    REPORT_JOB_HEARTBEAT_SECONDS = int(os.getenv("REPORT_JOB_HEARTBEAT_SECONDS", 30))
+    REPORT_JOB_LEASE_SECONDS = int(os.getenv("REPORT_JOB_LEASE_SECONDS", 120))
+
+    # Báo cáo: truy vấn song song theo CSDL nguồn ("concurrent" hoặc "sequential")
+    REPORT_FANOUT_MODE = os.getenv("REPORT_FANOUT_MODE", "concurrent")
+    # Threadpool chạy endpoint đồng bộ (anyio, mặc định 40); mỗi nguồn có pool fanout riêng,
+    # REPORT_FANOUT_WORKERS = số thread MỖI NGUỒN, 0 = tự tính (1/4 threadpool request ~ pool_size engine)
+    REQUEST_THREADPOOL_SIZE = int(os.getenv("REQUEST_THREADPOOL_SIZE", 40))
+    REPORT_FANOUT_WORKERS = int(os.getenv("REPORT_FANOUT_WORKERS", 0))
+    REPORT_SOURCE_TIMEOUT_SECONDS = float(os.getenv("REPORT_SOURCE_TIMEOUT_SECONDS", 10))
+    REPORT_SOURCE_TIMEOUTS = {
+        "hr": float(os.getenv("REPORT_TIMEOUT_HR", REPORT_SOURCE_TIMEOUT_SECONDS)),
+        "payroll": float(os.getenv("REPORT_TIMEOUT_PAYROLL", REPORT_SOURCE_TIMEOUT_SECONDS)),
+        "auth": float(os.getenv("REPORT_TIMEOUT_AUTH", REPORT_SOURCE_TIMEOUT_SECONDS)),
+    }
+
 settings = Settings()
@@ -0,0 +1,94 @@
+# backend/core/date_keys.py
+"""
+Bộ sinh điều kiện lọc theo lịch (tháng / năm / ngày kỷ niệm) dùng chung.
+
+Thay cho extract('month'/'year'/'day', cột) - vốn buộc SQL Server và MySQL
+quét toàn bảng - bằng khoảng nửa mở [start, end) hoặc danh sách ngày cụ thể,
+để truy vấn dùng được index trên cột ngày (index seek).
+"""
+import calendar
+from datetime import date
+
+from sqlalchemy import and_
+from sqlalchemy.schema import Index
+
+
+def month_bounds(year: int, month: int):
+    """(ngày đầu tháng, ngày đầu tháng kế tiếp)."""
+    start = date(year, month, 1)
+    end = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+    return start, end
+
+
+def year_bounds(year: int):
+    """(1/1 của năm, 1/1 năm kế tiếp)."""
+    return date(year, 1, 1), date(year + 1, 1, 1)
+
+
+def in_range(column, start: date = None, end: date = None):
+    """Điều kiện start <= column < end (bỏ qua đầu mút None)."""
+    conditions = []
+    if start is not None:
+        conditions.append(column >= start)
+    if end is not None:
+        conditions.append(column < end)
+    return and_(*conditions)
+
+
+def in_month(column, year: int, month: int):
+    """Thay cho extract('year') == year AND extract('month') == month."""
+    return in_range(column, *month_bounds(year, month))
+
+
+def in_year(column, year: int):
+    """Thay cho extract('year') == year."""
+    return in_range(column, *year_bounds(year))
+
+
+def months_range(from_month: date = None, to_month: date = None):
+    """Khoảng [đầu from_month, đầu tháng sau to_month) cho các bộ lọc 'từ tháng - đến tháng'."""
+    start = month_bounds(from_month.year, from_month.month)[0] if from_month else None
+    end = month_bounds(to_month.year, to_month.month)[1] if to_month else None
+    return start, end
+
+
+def parse_month(value: str) -> date:
+    """'YYYY-MM' -> ngày đầu tháng (ValueError nếu sai định dạng)."""
+    year, month = value.strip().split("-")[:2]
+    return date(int(year), int(month), 1)
+
+
+def anniversary_dates(today: date, years):
+    """
+    Các ngày tuyển dụng tương ứng tròn `years` năm tính đến hôm nay.
+    Bỏ qua trường hợp 29/2 không tồn tại ở năm đích (giống extract month/day).
+    """
+    dates = []
+    for y in years:
+        target_year = today.year - y
+        if today.month == 2 and today.day == 29 and not calendar.isleap(target_year):
+            continue
+        dates.append(today.replace(year=target_year))
+    return dates
+
+
+def on_anniversary(column, today: date, years):
+    """Thay cho extract('month') == today.month AND extract('day') == today.day, chỉ lấy các mốc `years`."""
+    return column.in_(anniversary_dates(today, years))
+
+
+# Các index khai báo trong models.py phục vụ truy vấn theo lịch
+CALENDAR_INDEXES = {
+    "ix_Employees_HireDate",
+    "ix_salaries_EmployeeID_SalaryMonth",
+    "ix_salaries_SalaryMonth",
+    "ix_attendance_EmployeeID_AttendanceMonth",
+    "ix_attendance_AttendanceMonth",
+}
+
+
+def ensure_indexes(engine, table, names=CALENDAR_INDEXES):
+    """Tạo các index (mặc định: index theo lịch) của bảng nếu CSDL (bảng có sẵn) chưa có."""
+    for index in table.indexes:
+        if isinstance(index, Index) and index.name in names:
+            index.create(bind=engine, checkfirst=True)
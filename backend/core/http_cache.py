@@ -0,0 +1,35 @@
+# backend/core/http_cache.py
+"""
+Tiện ích HTTP caching: sinh ETag mạnh từ payload và xử lý If-None-Match (304).
+"""
+import hashlib
+import json
+
+from fastapi import Request, Response
+
+
+def make_etag(payload) -> str:
+    """ETag mạnh = SHA-256 của JSON chuẩn hóa (sort_keys) của payload."""
+    body = json.dumps(payload, sort_keys=True, default=str, ensure_ascii=False, separators=(",", ":"))
+    return '"' + hashlib.sha256(body.encode("utf-8")).hexdigest()[:32] + '"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """So khớp header If-None-Match (hỗ trợ danh sách, '*' và tiền tố W/)."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [c.strip() for c in header.split(",")]
+    if "*" in candidates:
+        return True
+    return any((c[2:] if c.startswith("W/") else c) == etag for c in candidates)
+
+
+def not_modified(etag: str, cache_control: str) -> Response:
+    """Response 304 rỗng kèm ETag hiện tại."""
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": cache_control})
+
+
+def set_cache_headers(response: Response, etag: str, cache_control: str):
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = cache_control
@@ -0,0 +1,72 @@
+# backend/core/pagination.py
+"""
+Phân trang keyset (cursor) dùng chung.
+
+Thay vì OFFSET (CSDL phải quét rồi bỏ qua mọi dòng phía trước), trang tiếp theo
+được lọc bằng điều kiện "sau dòng cuối của trang trước" theo khóa sắp xếp + khóa
+chính:  (col > v) OR (col = v AND id > last_id)  - viết dạng OR để chạy được cả
+trên SQL Server (không hỗ trợ so sánh tuple). Chi phí trang 500 = trang 1.
+
+Cursor là chuỗi base64 (urlsafe) của JSON {"s": sort, "v": giá trị, "id": id},
+client chỉ việc gửi lại nguyên văn.
+"""
+import base64
+import binascii
+import json
+from datetime import date
+
+from sqlalchemy import and_, or_
+
+
+# Index khai báo trong models.py phục vụ sắp xếp keyset (tạo lúc khởi động)
+KEYSET_INDEXES = {"ix_Employees_FullName_EmployeeID"}
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(sort: str, value, last_id: int) -> str:
+    if isinstance(value, date):
+        value = value.isoformat()
+    raw = json.dumps({"s": sort, "v": value, "id": last_id}, separators=(",", ":"), ensure_ascii=False)
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: str, sort: str):
+    """Trả về (giá trị, id) của dòng cuối trang trước; cursor phải được tạo với cùng kiểu sắp xếp."""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8"))
+        value, last_id = data["v"], int(data["id"])
+        cursor_sort = data["s"]
+    except (binascii.Error, UnicodeError, ValueError, KeyError, TypeError):
+        raise InvalidCursor("Cursor không hợp lệ")
+    if cursor_sort != sort:
+        raise InvalidCursor("Cursor được tạo với kiểu sắp xếp khác")
+    return value, last_id
+
+
+def parse_date(value) -> date:
+    """Giá trị ngày (ISO) lấy từ cursor; sai định dạng -> InvalidCursor."""
+    try:
+        return date.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise InvalidCursor("Cursor không hợp lệ")
+
+
+def keyset_filter(sort_col, id_col, value, last_id, descending: bool = False):
+    """Điều kiện WHERE lấy các dòng nằm SAU (value, last_id) theo thứ tự (sort_col, id_col)."""
+    if sort_col is id_col:
+        return id_col < last_id if descending else id_col > last_id
+    if descending:
+        return or_(sort_col < value, and_(sort_col == value, id_col < last_id))
+    return or_(sort_col > value, and_(sort_col == value, id_col > last_id))
+
+
+def keyset_order(sort_col, id_col, descending: bool = False):
+    if sort_col is id_col:
+        return [id_col.desc() if descending else id_col.asc()]
+    if descending:
+        return [sort_col.desc(), id_col.desc()]
+    return [sort_col.asc(), id_col.asc()]
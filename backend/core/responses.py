@@ -0,0 +1,38 @@
+# backend/core/responses.py
+"""
+Response JSON "gọn" cho các endpoint danh sách lớn.
+
+Endpoint trả thẳng `LeanJSONResponse(list[dict])`: FastAPI không chạy lại
+validate/serialize theo `response_model` (vẫn khai báo để có tài liệu OpenAPI),
+và orjson mã hóa nhanh hơn json chuẩn nhiều lần. Định dạng giữ giống Pydantic:
+Decimal -> chuỗi, date/datetime -> ISO 8601 (UTC ghi "Z").
+Nếu chưa cài orjson thì dùng json chuẩn.
+"""
+import json
+from decimal import Decimal
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson là tùy chọn
+    orjson = None
+
+
+def _default(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    raise TypeError(f"Không serialize được kiểu {type(value).__name__}")
+
+
+class LeanJSONResponse(JSONResponse):
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(content, default=_default, option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS)
+        return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
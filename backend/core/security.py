@@ -2,7 +2,6 @@
 from datetime import datetime, timedelta
 from typing import Optional
 
-from jose import jwt
 # --- SỬA: BỎ PASSLIB ---
 # from passlib.context import CryptContext 
 
@@ -36,5 +35,6 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     else:
         expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     to_encode.update({"exp": expire})
+    from jose import jwt  # nạp lười (python-jose + cryptography) ở lần đăng nhập đầu tiên
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
\ No newline at end of file
@@ -0,0 +1,109 @@
+# backend/core/startup_profile.py
+"""
+`python main.py --profile-startup`: in bảng thời gian import / khởi tạo của worker.
+
+1. Import: chạy `python -X importtime -c "import main"` trong tiến trình con (bắt đầu
+   sạch, không bị module đã nạp sẵn làm sai số), cộng thời gian "self" theo package gốc.
+2. Khởi tạo (trong tiến trình hiện tại): tạo từng engine, mở session Auth đầu tiên
+   (SELECT 1) và kiểm tra bảng Auth (chỉ đọc, không ghi vào CSDL đang dùng).
+   HR / Payroll chỉ tạo engine, chỉ kết nối khi có `connect_all=True` (--connect-all).
+"""
+import os
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TOP_PACKAGES = 15
+
+
+def import_breakdown(module: str = "main"):
+    """Trả về ({package gốc: micro giây self}, tổng micro giây, stderr nếu import lỗi)."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR, capture_output=True, text=True
+    )
+    by_package, pending, total_us, errors = defaultdict(int), [], 0, []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:"):
+            errors.append(line)
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue  # Dòng tiêu đề
+        self_us, cumulative_us, name = int(parts[0]), int(parts[1]), parts[2].strip()
+        pending.append((name.split(".")[0], self_us))
+        if len(parts[2]) - len(parts[2].lstrip()) > 1:
+            continue  # Module con: đã in trước module cha
+        # Hết 1 cây import cấp 0: chỉ giữ cây của `module` (bỏ phần khởi động interpreter / site)
+        if name == module:
+            total_us = cumulative_us
+            for package, us in pending:
+                by_package[package] += us
+        pending = []
+    return dict(by_package), total_us, ("\n".join(errors[-10:]) if proc.returncode else None)
+
+
+def _timed(label: str, fn, rows: list):
+    started = time.perf_counter()
+    try:
+        fn()
+        rows.append((label, (time.perf_counter() - started) * 1000, None))
+    except Exception as e:
+        rows.append((label, (time.perf_counter() - started) * 1000, str(e)))
+
+
+def init_breakdown(connect_all: bool = False) -> list:
+    """[(bước, ms, lỗi)] cho các bước khởi tạo CSDL."""
+    from sqlalchemy import inspect, text
+    import database
+
+    rows = []
+    _timed("engine_auth", lambda: database.get_engine("engine_auth"), rows)
+
+    def _auth_session():
+        db = database.SessionLocalAuth.session_factory()
+        try:
+            db.execute(text("SELECT 1"))
+        finally:
+            db.close()
+    _timed("Auth: session đầu tiên + SELECT 1", _auth_session, rows)
+    def _check_auth_tables():
+        # Chỉ đọc: công cụ đo không được tạo bảng trên dashboard_auth.db đang dùng thật
+        existing = set(inspect(database.get_engine("engine_auth")).get_table_names())
+        missing = sorted(set(database.BaseAuth.metadata.tables) - existing)
+        if missing:
+            raise RuntimeError(f"thiếu bảng (server sẽ tạo khi khởi động): {', '.join(missing)}")
+    _timed("Auth: kiểm tra bảng (chỉ đọc)", _check_auth_tables, rows)
+
+    for name in ("engine_sqlserver", "engine_mysql"):
+        _timed(name, lambda name=name: database.get_engine(name), rows)
+        if connect_all:
+            def _connect(name=name):
+                with database.get_engine(name).connect() as conn:
+                    conn.execute(text("SELECT 1"))
+            _timed(f"{name}: kết nối + SELECT 1", _connect, rows)
+    return rows
+
+
+def report(module: str = "main", connect_all: bool = False):
+    by_package, total_us, error = import_breakdown(module)
+    print(f'== Import (python -X importtime -c "import {module}") ==')
+    if error:
+        print(f"!!! Import lỗi:\n{error}")
+    print(f"   Tổng: {total_us / 1000:.1f} ms")
+    ranked = sorted(by_package.items(), key=lambda item: item[1], reverse=True)
+    for name, self_us in ranked[:TOP_PACKAGES]:
+        share = self_us / total_us * 100 if total_us else 0
+        print(f"   {name:<28} {self_us / 1000:>8.1f} ms  {share:5.1f}%")
+    rest = sum(us for _, us in ranked[TOP_PACKAGES:])
+    if rest:
+        print(f"   {'(khác)':<28} {rest / 1000:>8.1f} ms")
+
+    print("== Khởi tạo CSDL ==")
+    rows = init_breakdown(connect_all)
+    for label, ms, err in rows:
+        print(f"   {label:<40} {ms:>8.1f} ms" + (f"  LỖI: {err}" if err else ""))
+    ready_ms = total_us / 1000 + sum(ms for label, ms, _ in rows if label.startswith(("engine_auth", "Auth")))
+    print(f"== Ước tính tới khi sẵn sàng (import + Auth): {ready_ms:.1f} ms ==")
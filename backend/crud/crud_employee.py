@@ -1,16 +1,25 @@
 # backend/crud/crud_employee.py
 from fastapi import HTTPException
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import or_
+from sqlalchemy import or_, func, text, update
 from models import (
     EmployeeHR, EmployeePayroll, DepartmentPayroll, PositionPayroll,
     DepartmentHR, PositionHR, Salary, Attendance, Dividend,
-    User as AuthUser, Shareholder # [UPDATE] Import Shareholder
+    User as AuthUser, Shareholder, # [UPDATE] Import Shareholder
+    EmployeeDirectory
 )
 import schemas
 from auth.auth import get_user_role as get_role_from_hr
 from . import crud_user
+from services import (
+    dashboard_snapshot, payroll_rollup, my_dashboard_cache, employee_search, employee_directory, reference_cache,
+    sync_outbox, fanout
+)
 from typing import Optional
+from core import pagination
+from core.batching import chunked
+from collections import defaultdict
+import time
 
 # --- GET HELPERS ---
 def get_employee_by_id(db_hr: Session, employee_id: int):
@@ -23,27 +32,40 @@ def get_employee_by_email(db_hr: Session, email: str):
     ).filter(EmployeeHR.Email == email).first()
 
 # --- MAIN CRUD ---
-def get_employees(
+def _filtered_employee_query(
     db_hr: Session,
-    db_auth: Session,
-    skip: int = 0,
-    limit: int = 100,
     search: Optional[str] = None,
     department_id: Optional[int] = None,
     position_id: Optional[int] = None,
-    status: Optional[str] = None
+    status: Optional[str] = None,
+    db_auth: Optional[Session] = None,
+    eager: bool = True
 ):
-    """Query với Eager Loading và Filter."""
-    query = db_hr.query(EmployeeHR).options(
-        joinedload(EmployeeHR.department),
-        joinedload(EmployeeHR.position)
-    )
+    """
+    Query với Eager Loading và Filter (dùng chung cho phân trang offset và keyset).
+    Trả về (query, ranked_ids): ranked_ids là EmployeeID theo độ liên quan khi `search`
+    đi qua chỉ mục FTS5 (services/employee_search.py), ngược lại None (kể cả khi từ khóa
+    khớp quá nhiều nhân viên -> dùng ilike để lọc / phân trang không thiếu kết quả).
+    eager=False: không joinedload (người gọi tự chọn cột bằng with_entities).
+    """
+    query = db_hr.query(EmployeeHR)
+    if eager:
+        query = query.options(
+            joinedload(EmployeeHR.department),
+            joinedload(EmployeeHR.position)
+        )
 
     if department_id: query = query.filter(EmployeeHR.DepartmentID == department_id)
     if position_id: query = query.filter(EmployeeHR.PositionID == position_id)
     if status: query = query.filter(EmployeeHR.Status == status)
 
-    if search:
+    ranked_ids = employee_search.search_ids(db_auth, search) if search and db_auth is not None else None
+    if ranked_ids is not None:
+        # Tìm theo mã nhân viên vẫn được hỗ trợ như trước
+        if search.strip().isdigit() and int(search) not in ranked_ids:
+            ranked_ids.insert(0, int(search))
+        query = query.filter(EmployeeHR.EmployeeID.in_(ranked_ids))
+    elif search:
         st = f"%{search}%"
         query = query.outerjoin(DepartmentHR).outerjoin(PositionHR)
         filters = [
@@ -56,32 +78,258 @@ def get_employees(
             filters.append(EmployeeHR.EmployeeID == int(search))
         except: pass
         query = query.filter(or_(*filters))
+    return query, ranked_ids
+
+def _map_auth_data(db_auth: Session, results):
+    """Gắn role / auth_user_id từ Auth DB (1 truy vấn IN cho cả trang)."""
+    emails = [e.Email for e in results if e.Email]
+    auth_map = {}
+    if emails:
+        users = db_auth.query(AuthUser).filter(AuthUser.email.in_(emails)).all()
+        auth_map = {u.email: u for u in users}
+
+    mapped = []
+    for e in results:
+        s = schemas.Employee.from_orm(e)
+        if e.Email in auth_map:
+            s.role = auth_map[e.Email].role
+            s.auth_user_id = auth_map[e.Email].id
+        mapped.append(s)
+    return mapped
+
+# Cột cần cho danh sách (đặt tên theo schemas.Employee) - không nạp entity / quan hệ
+_LEAN_HR_COLUMNS = (
+    EmployeeHR.EmployeeID, EmployeeHR.FullName, EmployeeHR.Email, EmployeeHR.DateOfBirth,
+    EmployeeHR.HireDate, EmployeeHR.DepartmentID, EmployeeHR.PositionID, EmployeeHR.Status,
+    EmployeeHR.Gender, EmployeeHR.PhoneNumber
+)
+_LEAN_DIRECTORY_COLUMNS = (
+    EmployeeDirectory.employee_id.label("EmployeeID"), EmployeeDirectory.full_name.label("FullName"),
+    EmployeeDirectory.email.label("Email"), EmployeeDirectory.date_of_birth.label("DateOfBirth"),
+    EmployeeDirectory.hire_date.label("HireDate"), EmployeeDirectory.department_id.label("DepartmentID"),
+    EmployeeDirectory.position_id.label("PositionID"), EmployeeDirectory.status.label("Status"),
+    EmployeeDirectory.gender.label("Gender"), EmployeeDirectory.phone_number.label("PhoneNumber"),
+    EmployeeDirectory.department_name.label("DepartmentName"),
+    EmployeeDirectory.position_name.label("PositionName"),
+    EmployeeDirectory.role, EmployeeDirectory.auth_user_id
+)
+
+def _employee_dict(row, department_name, position_name, role, auth_user_id) -> dict:
+    """Cùng cấu trúc JSON với schemas.Employee."""
+    return {
+        "FullName": row.FullName,
+        "Email": row.Email,
+        "DateOfBirth": row.DateOfBirth,
+        "HireDate": row.HireDate,
+        "DepartmentID": row.DepartmentID,
+        "PositionID": row.PositionID,
+        "Status": row.Status,
+        "Gender": row.Gender,
+        "PhoneNumber": row.PhoneNumber,
+        "EmployeeID": row.EmployeeID,
+        "department": {"DepartmentName": department_name, "DepartmentID": row.DepartmentID}
+        if department_name is not None else None,
+        "position": {"PositionName": position_name, "PositionID": row.PositionID}
+        if position_name is not None else None,
+        "role": role,
+        "auth_user_id": auth_user_id,
+    }
 
+def get_employees(
+    db_hr: Session,
+    db_auth: Session,
+    skip: int = 0,
+    limit: int = 100,
+    search: Optional[str] = None,
+    department_id: Optional[int] = None,
+    position_id: Optional[int] = None,
+    status: Optional[str] = None
+):
+    """
+    Phân trang OFFSET (chế độ cũ, giữ cho tương thích). Trang sâu nên dùng get_employees_page.
+    Chỉ SELECT các cột cần và trả về list dict (endpoint trả qua LeanJSONResponse).
+    """
+    # Danh bạ trong Auth DB (services/employee_directory.py): 1 truy vấn cục bộ, không JOIN sang HR
+    use_directory = employee_directory.is_ready(db_auth)
+    ranked_ids = rank_col = None
+    if use_directory:
+        query, rank_col = employee_directory.filtered_query(db_auth, search, department_id, position_id, status)
+        query, id_col = query.with_entities(*_LEAN_DIRECTORY_COLUMNS), EmployeeDirectory.employee_id
+    else:
+        query, ranked_ids = _filtered_employee_query(
+            db_hr, search, department_id, position_id, status, db_auth, eager=False
+        )
+        query, id_col = query.with_entities(*_LEAN_HR_COLUMNS), EmployeeHR.EmployeeID
     try:
-        results = query.order_by(EmployeeHR.EmployeeID).offset(skip).limit(limit).all()
-        
-        # Map Auth Data
-        emails = [e.Email for e in results if e.Email]
-        auth_map = {}
-        if emails:
-            users = db_auth.query(AuthUser).filter(AuthUser.email.in_(emails)).all()
-            auth_map = {u.email: u for u in users}
-
-        mapped = []
-        for e in results:
-            s = schemas.Employee.from_orm(e)
-            if e.Email in auth_map:
-                s.role = auth_map[e.Email].role
-                s.auth_user_id = auth_map[e.Email].id
-            mapped.append(s)
-        return mapped
+        if rank_col is not None:
+            # Xếp theo độ liên quan ngay trong SQL (chỉ mục FTS5 JOIN với danh bạ)
+            rows = query.order_by(rank_col, id_col).offset(skip).limit(limit).all()
+        elif ranked_ids is not None:
+            # Xếp theo độ liên quan; tập ứng viên đã giới hạn nên sắp xếp/cắt trang trong Python
+            rank = {emp_id: i for i, emp_id in enumerate(ranked_ids)}
+            rows = sorted(query.all(), key=lambda e: rank.get(e.EmployeeID, 0))[skip:skip + limit]
+        else:
+            rows = query.order_by(id_col).offset(skip).limit(limit).all()
+
+        if use_directory:
+            return [_employee_dict(r, r.DepartmentName, r.PositionName, r.role, r.auth_user_id) for r in rows]
+
+        # Tên phòng ban/chức vụ từ cache tham chiếu, role / auth_user_id: 1 truy vấn IN theo email
+        dept_names = reference_cache.department_names(db_hr)
+        pos_names = reference_cache.position_names(db_hr)
+        emails = [r.Email for r in rows if r.Email]
+        accounts = {
+            u.email: (u.role, u.id)
+            for u in db_auth.query(AuthUser.email, AuthUser.role, AuthUser.id).filter(AuthUser.email.in_(emails))
+        } if emails else {}
+        return [
+            _employee_dict(r, dept_names.get(r.DepartmentID), pos_names.get(r.PositionID),
+                           *accounts.get(r.Email, (None, None)))
+            for r in rows
+        ]
 
     except Exception as e:
         print(f"Error fetching employees: {e}")
         return []
 
+# Các kiểu sắp xếp ổn định cho phân trang keyset: tên -> (cột, giảm dần)
+EMPLOYEE_SORTS = {
+    "id": (EmployeeHR.EmployeeID, False),
+    "-id": (EmployeeHR.EmployeeID, True),
+    "name": (EmployeeHR.FullName, False),
+    "-name": (EmployeeHR.FullName, True),
+    "hire_date": (EmployeeHR.HireDate, False),
+    "-hire_date": (EmployeeHR.HireDate, True),
+}
+
+def _estimate_employee_total(db_hr: Session, query, has_filters: bool) -> int:
+    """Không lọc trên SQL Server: đọc số dòng từ metadata (sys.partitions) thay vì COUNT(*)."""
+    if not has_filters and db_hr.get_bind().dialect.name == "mssql":
+        estimate = db_hr.execute(text(
+            "SELECT SUM(p.rows) FROM sys.partitions p "
+            "WHERE p.object_id = OBJECT_ID('Employees') AND p.index_id IN (0, 1)"
+        )).scalar()
+        if estimate is not None:
+            return int(estimate)
+    return query.order_by(None).with_entities(func.count(EmployeeHR.EmployeeID)).scalar() or 0
+
+def get_employees_page(
+    db_hr: Session,
+    db_auth: Session,
+    limit: int = 100,
+    after: Optional[str] = None,
+    sort: str = "id",
+    include_total: bool = False,
+    search: Optional[str] = None,
+    department_id: Optional[int] = None,
+    position_id: Optional[int] = None,
+    status: Optional[str] = None
+):
+    """
+    Phân trang keyset: `after` là cursor trả về ở trang trước (next_cursor).
+    Ném pagination.InvalidCursor nếu cursor sai hoặc khác kiểu sắp xếp.
+    """
+    if employee_directory.is_ready(db_auth):
+        sort_col, descending = employee_directory.DIRECTORY_SORTS[sort]
+        id_col = EmployeeDirectory.employee_id
+        query, _ = employee_directory.filtered_query(db_auth, search, department_id, position_id, status)
+        to_items = lambda rows: [employee_directory.to_schema(r) for r in rows]
+    else:
+        sort_col, descending = EMPLOYEE_SORTS[sort]
+        id_col = EmployeeHR.EmployeeID
+        query, _ = _filtered_employee_query(db_hr, search, department_id, position_id, status, db_auth)
+        to_items = lambda rows: _map_auth_data(db_auth, rows)
+    base_query = query
+
+    if after:
+        value, last_id = pagination.decode_cursor(after, sort)
+        if sort.endswith("hire_date"):
+            value = pagination.parse_date(value)
+        query = query.filter(pagination.keyset_filter(sort_col, id_col, value, last_id, descending))
+
+    # Lấy dư 1 dòng để biết còn trang sau hay không
+    rows = query.order_by(*pagination.keyset_order(sort_col, id_col, descending)).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    next_cursor = None
+    if has_more and rows:
+        last = rows[-1]
+        next_cursor = pagination.encode_cursor(sort, getattr(last, sort_col.key), getattr(last, id_col.key))
+
+    total = None
+    if include_total:
+        if id_col is EmployeeHR.EmployeeID:
+            has_filters = any([search, department_id, position_id, status])
+            total = _estimate_employee_total(db_hr, base_query, has_filters)
+        else:
+            total = base_query.order_by(None).with_entities(func.count(id_col)).scalar() or 0
+
+    return {
+        "items": to_items(rows),
+        "next_cursor": next_cursor,
+        "has_more": has_more,
+        "sort": sort,
+        "total_estimate": total
+    }
+
+def _create_employee_outbox(db_hr: Session, db_auth: Session, employee: schemas.EmployeeCreate):
+    """
+    SYNC_MODE=outbox: 1 commit bên HR (nhân viên + sự kiện), Payroll do relay áp dụng.
+    Tài khoản Auth tạo ngay trong request: mật khẩu KHÔNG bao giờ được ghi vào SyncOutbox (CSDL HR).
+    """
+    # Kiểm tra trước các ràng buộc bên Auth để báo lỗi rõ ràng cho người dùng
+    if crud_user.get_user_by_email(db_auth, employee.Email):
+        raise Exception("Lỗi tạo tài khoản: Email đã được dùng cho tài khoản khác")
+    if employee.PhoneNumber and db_auth.query(AuthUser.id).filter(AuthUser.phone_number == employee.PhoneNumber).first():
+        raise Exception("Lỗi tạo tài khoản: Số điện thoại đã được dùng cho tài khoản khác")
+
+    db_emp = EmployeeHR(**employee.dict(exclude={"password"}))
+    db_hr.add(db_emp)
+    try:
+        db_hr.flush()  # Lấy EmployeeID cho sự kiện và tài khoản
+        sync_outbox.enqueue(db_hr, sync_outbox.EMPLOYEE_CREATED, db_emp.EmployeeID)
+    except Exception as e:
+        db_hr.rollback()
+        raise Exception(f"Lỗi tạo HR: {e}")
+
+    # Auth trước khi commit HR: lỗi tạo tài khoản -> bỏ luôn nhân viên (chưa commit)
+    try:
+        role = get_role_from_hr(db_hr.query(EmployeeHR).options(joinedload(EmployeeHR.department))
+                                .filter(EmployeeHR.EmployeeID == db_emp.EmployeeID).first())
+        db_user = crud_user.create_user(db_auth, schemas.UserCreate(
+            full_name=employee.FullName,
+            email=employee.Email,
+            password=employee.password,
+            role=role,
+            phone_number=employee.PhoneNumber,
+            employee_id_link=db_emp.EmployeeID
+        ))
+    except Exception as e:
+        db_auth.rollback()
+        db_hr.rollback()
+        raise Exception(f"Lỗi tạo tài khoản: {e}")
+
+    try:
+        db_hr.commit()
+        db_hr.refresh(db_emp)
+    except Exception as e:
+        db_hr.rollback()
+        db_auth.query(AuthUser).filter(AuthUser.id == db_user.id).delete(synchronize_session=False)
+        db_auth.commit()
+        raise Exception(f"Lỗi tạo HR: {e}")
+
+    sync_outbox.request_relay()
+    employee_search.index_employee(db_hr, db_emp.EmployeeID, db_auth)
+    employee_directory.refresh_employee(db_hr, db_emp.EmployeeID, db_auth)
+    dashboard_snapshot.request_rebuild()
+    return db_emp
+
 def create_employee_synced(db_hr: Session, db_payroll: Session, db_auth: Session, employee: schemas.EmployeeCreate):
     """Tạo HR -> Đồng bộ Payroll -> Tạo Auth."""
+    if sync_outbox.enabled():
+        return _create_employee_outbox(db_hr, db_auth, employee)
+
     # 1. HR
     emp_data = employee.dict(exclude={"password"})
     db_emp = EmployeeHR(**emp_data)
@@ -141,6 +389,9 @@ def create_employee_synced(db_hr: Session, db_payroll: Session, db_auth: Session
         db_hr.delete(db_emp); db_hr.commit()
         raise Exception(f"Lỗi tạo tài khoản: {e}")
 
+    employee_search.index_employee(db_hr, db_emp.EmployeeID, db_auth)
+    employee_directory.refresh_employee(db_hr, db_emp.EmployeeID, db_auth)
+    dashboard_snapshot.request_rebuild()
     return db_emp
 
 def update_employee_synced(db_hr: Session, db_payroll: Session, db_auth: Session, employee_id: int, employee_update: schemas.EmployeeUpdate):
@@ -153,18 +404,36 @@ def update_employee_synced(db_hr: Session, db_payroll: Session, db_auth: Session
     for k, v in data.items():
         setattr(db_emp, k, v)
     
+    outbox = sync_outbox.enabled()
     try:
+        if outbox:
+            # Payroll/Auth được relay áp dụng (cùng commit với thay đổi HR)
+            sync_outbox.enqueue(db_hr, sync_outbox.EMPLOYEE_UPDATED, employee_id, {"fields": sorted(data)})
         db_hr.commit()
         db_hr.refresh(db_emp)
     except Exception as e:
         db_hr.rollback()
         raise Exception(f"Lỗi update HR: {e}")
 
+    if outbox:
+        sync_outbox.request_relay()
+        if any(k in data for k in ['DepartmentID', 'PositionID', 'FullName']):
+            employee_search.index_employee(db_hr, employee_id, db_auth)
+        employee_directory.refresh_employee(db_hr, employee_id, db_auth)
+        dashboard_snapshot.request_rebuild()
+        my_dashboard_cache.invalidate(employee_id)
+        return db_emp
+
     # Sync Payroll (Chỉ khi có thay đổi liên quan lương/thông tin cơ bản)
     if any(k in data for k in ['DepartmentID', 'PositionID', 'Status', 'FullName']):
         p_emp = db_payroll.query(EmployeePayroll).filter(EmployeePayroll.EmployeeID == employee_id).first()
         if p_emp:
             try:
+                if 'DepartmentID' in data:
+                    # Chuyển số liệu lương của nhân viên sang phòng ban mới trong rollup
+                    payroll_rollup.reassign_employee_department(
+                        db_payroll, employee_id, p_emp.DepartmentID, data['DepartmentID']
+                    )
                 for k in ['DepartmentID', 'PositionID', 'Status', 'FullName']:
                     if k in data: setattr(p_emp, k, data[k])
                 db_payroll.commit()
@@ -185,49 +454,250 @@ def update_employee_synced(db_hr: Session, db_payroll: Session, db_auth: Session
                 db_auth.commit()
             except: db_auth.rollback()
 
+    if any(k in data for k in ['DepartmentID', 'PositionID', 'FullName']):
+        employee_search.index_employee(db_hr, employee_id, db_auth)
+    employee_directory.refresh_employee(db_hr, employee_id, db_auth)
+
+    dashboard_snapshot.request_rebuild()
+    my_dashboard_cache.invalidate(employee_id)
     return db_emp
 
-def delete_employee_synced(db_hr: Session, db_payroll: Session, db_auth: Session, employee_id: int):
+BULK_TRANSFER_MAX = 5000
+
+def bulk_transfer_employees(
+    db_hr: Session, db_payroll: Session, db_auth: Session,
+    employee_ids: list, department_id: Optional[int] = None, position_id: Optional[int] = None
+):
     """
-    Xóa nhân viên với kiểm tra ràng buộc.
+    Điều chuyển nhiều nhân viên sang phòng ban / chức vụ mới.
+    Khác update_employee_synced (commit + refresh từng người), mỗi CSDL chỉ chạy
+    các câu UPDATE ... WHERE id IN (...) theo lô trong 1 transaction; role được tính
+    lại 1 lượt rồi ghi theo nhóm role; rollup lương chỉ dựng lại các tháng liên quan.
+    Payroll lỗi -> khôi phục HR về giá trị cũ (bù trừ như create_employee_synced).
     """
-    # [UPDATE] RÀNG BUỘC CỔ ĐÔNG (Quan trọng cho HR Manager)
-    is_shareholder = db_auth.query(Shareholder).filter(
-        Shareholder.employee_id == employee_id, 
-        Shareholder.shares > 0
-    ).first()
-    if is_shareholder:
-        raise HTTPException(
-            status_code=400, 
-            detail=f"KHÔNG THỂ XÓA: Nhân viên đang là Cổ đông ({is_shareholder.shares} CP). Vui lòng thu hồi cổ phần trước."
-        )
+    started = time.perf_counter()
+    changes = {}
+    if department_id is not None:
+        if department_id not in reference_cache.department_names(db_hr):
+            raise HTTPException(status_code=400, detail=f"Phòng ban {department_id} không tồn tại")
+        changes["DepartmentID"] = department_id
+    if position_id is not None:
+        if position_id not in reference_cache.position_names(db_hr):
+            raise HTTPException(status_code=400, detail=f"Chức vụ {position_id} không tồn tại")
+        changes["PositionID"] = position_id
+    if not changes:
+        raise HTTPException(status_code=400, detail="Cần chọn phòng ban hoặc chức vụ mới")
+
+    requested = list(dict.fromkeys(employee_ids))
+    old_values = {}
+    for ids in chunked(requested):
+        old_values.update({
+            r.EmployeeID: (r.DepartmentID, r.PositionID)
+            for r in db_hr.query(EmployeeHR.EmployeeID, EmployeeHR.DepartmentID, EmployeeHR.PositionID)
+            .filter(EmployeeHR.EmployeeID.in_(ids))
+        })
+    found = [i for i in requested if i in old_values]
+    not_found = [i for i in requested if i not in old_values]
+    if not found:
+        return {"requested": len(requested), "updated": 0, "not_found": not_found,
+                "roles_changed": 0, "rollup_months": 0, "duration_ms": round((time.perf_counter() - started) * 1000)}
+
+    # 1. HR
+    try:
+        for ids in chunked(found):
+            db_hr.execute(update(EmployeeHR).where(EmployeeHR.EmployeeID.in_(ids)).values(**changes))
+        db_hr.commit()
+    except Exception as e:
+        db_hr.rollback()
+        raise Exception(f"Lỗi update HR: {e}")
 
-    # 1. RÀNG BUỘC 1: CỔ TỨC (HUMAN)
-    if db_hr.query(Dividend).filter(Dividend.EmployeeID == employee_id).first():
-        raise HTTPException(status_code=400, detail=f"KHÔNG THỂ XÓA: Nhân viên có lịch sử nhận Cổ tức.")
+    def restore_hr():
+        by_old = defaultdict(list)
+        for emp_id in found:
+            by_old[old_values[emp_id]].append(emp_id)
+        for (dept, pos), group in by_old.items():
+            for ids in chunked(group):
+                db_hr.execute(update(EmployeeHR).where(EmployeeHR.EmployeeID.in_(ids))
+                              .values(DepartmentID=dept, PositionID=pos))
+        db_hr.commit()
+
+    # 2. Payroll (+ phòng ban/chức vụ còn thiếu bên Payroll, như create_employee_synced)
+    rollup_months = []
+    try:
+        if department_id is not None and not db_payroll.get(DepartmentPayroll, department_id):
+            db_payroll.add(DepartmentPayroll(DepartmentID=department_id,
+                                             DepartmentName=reference_cache.department_name(department_id, db_hr)))
+        if position_id is not None and not db_payroll.get(PositionPayroll, position_id):
+            db_payroll.add(PositionPayroll(PositionID=position_id,
+                                           PositionName=reference_cache.position_name(position_id, db_hr)))
+        for ids in chunked(found):
+            db_payroll.execute(update(EmployeePayroll).where(EmployeePayroll.EmployeeID.in_(ids)).values(**changes))
+        db_payroll.commit()
+    except Exception as e:
+        db_payroll.rollback()
+        restore_hr()
+        raise Exception(f"Lỗi đồng bộ Payroll: {e}")
+
+    if department_id is not None:
+        # Rollup theo phòng ban: dựng lại các tháng có lương của nhóm nhân viên này
+        months = set()
+        for ids in chunked(found):
+            months.update(m for (m,) in db_payroll.query(Salary.SalaryMonth).filter(Salary.EmployeeID.in_(ids)).distinct())
+        rollup_months = sorted(months)
+        if rollup_months:
+            try:
+                payroll_rollup.rebuild(db_payroll, rollup_months)
+            except Exception as e:
+                print(f"Lỗi dựng lại payroll_month_rollup sau điều chuyển: {e}")
+
+    # 3. Auth: tính role 1 lượt, ghi theo nhóm role
+    roles_changed = 0
+    by_role = defaultdict(list)
+    for ids in chunked(found):
+        for row in db_hr.query(EmployeeHR.EmployeeID, EmployeeHR.DepartmentID, EmployeeHR.PositionID)\
+                .filter(EmployeeHR.EmployeeID.in_(ids)):
+            by_role[get_role_from_hr(row)].append(row.EmployeeID)
+    try:
+        for role, group in by_role.items():
+            for ids in chunked(group):
+                result = db_auth.execute(
+                    update(AuthUser)
+                    .where(AuthUser.employee_id_link.in_(ids), AuthUser.role != role)
+                    .values(role=role)
+                )
+                roles_changed += result.rowcount
+        db_auth.commit()
+    except Exception as e:
+        db_auth.rollback()
+        print(f"Lỗi cập nhật role sau điều chuyển: {e}")
+
+    # 4. Các bản chiếu / cache
+    for ids in chunked(found):
+        employee_search.reindex(db_hr, EmployeeHR.EmployeeID.in_(ids), db_auth)
+        employee_directory.refresh(db_hr, EmployeeHR.EmployeeID.in_(ids), db_auth)
+    for emp_id in found:
+        my_dashboard_cache.invalidate(emp_id)
+    dashboard_snapshot.request_rebuild()
+
+    return {
+        "requested": len(requested),
+        "updated": len(found),
+        "not_found": not_found,
+        "roles_changed": roles_changed,
+        "rollup_months": len(rollup_months),
+        "duration_ms": round((time.perf_counter() - started) * 1000),
+    }
+
+# --- XÓA (kiểm tra ràng buộc theo lô, song song 3 CSDL) ---
+BULK_DELETE_MAX = 5000
 
-    # 2. RÀNG BUỘC 2: LƯƠNG (PAYROLL)
-    if db_payroll.query(Salary).filter(Salary.EmployeeID == employee_id).first():
-         raise HTTPException(status_code=400, detail=f"KHÔNG THỂ XÓA: Nhân viên có dữ liệu Lương.")
+def _probe_shareholders(db_auth: Session, employee_ids):
+    found = {}
+    for ids in chunked(employee_ids):
+        found.update(db_auth.query(Shareholder.employee_id, Shareholder.shares).filter(
+            Shareholder.employee_id.in_(ids), Shareholder.shares > 0
+        ).all())
+    return found
 
-    # 3. Tiến hành xóa (Auth -> Payroll -> HR)
+def _probe_hr(db_hr: Session, employee_ids):
+    existing, with_dividends = set(), set()
+    for ids in chunked(employee_ids):
+        existing.update(i for (i,) in db_hr.query(EmployeeHR.EmployeeID).filter(EmployeeHR.EmployeeID.in_(ids)))
+        with_dividends.update(i for (i,) in db_hr.query(Dividend.EmployeeID).filter(Dividend.EmployeeID.in_(ids)).distinct())
+    return existing, with_dividends
+
+def _probe_salaries(db_payroll: Session, employee_ids):
+    found = set()
+    for ids in chunked(employee_ids):
+        found.update(i for (i,) in db_payroll.query(Salary.EmployeeID).filter(Salary.EmployeeID.in_(ids)).distinct())
+    return found
+
+def probe_delete_constraints(db_hr: Session, db_payroll: Session, db_auth: Session, employee_ids: list):
+    """
+    Kiểm tra ràng buộc xóa cho cả danh sách: 1 truy vấn tập hợp / CSDL (theo lô IN),
+    3 CSDL chạy song song (services/fanout.py).
+    Trả về (tập EmployeeID tồn tại bên HR, {EmployeeID: [lý do không xóa được]}).
+    """
+    results, failed = fanout.run_groups({
+        "shareholders": ("auth", lambda db: _probe_shareholders(db, employee_ids), None),
+        "hr": ("hr", lambda db: _probe_hr(db, employee_ids), None),
+        "salaries": ("payroll", lambda db: _probe_salaries(db, employee_ids), None),
+    }, sessions={"hr": db_hr, "payroll": db_payroll, "auth": db_auth})
+    if failed:
+        raise HTTPException(status_code=503, detail=f"Không kiểm tra được ràng buộc xóa ({', '.join(failed)}), vui lòng thử lại.")
+
+    shareholders = results["shareholders"]
+    existing, with_dividends = results["hr"]
+    with_salaries = results["salaries"]
+    reasons = {}
+    for emp_id in employee_ids:
+        blocking = []
+        if emp_id in shareholders:
+            blocking.append(f"Nhân viên đang là Cổ đông ({shareholders[emp_id]} CP). Vui lòng thu hồi cổ phần trước.")
+        if emp_id in with_dividends:
+            blocking.append("Nhân viên có lịch sử nhận Cổ tức.")
+        if emp_id in with_salaries:
+            blocking.append("Nhân viên có dữ liệu Lương.")
+        if blocking:
+            reasons[emp_id] = blocking
+    return existing, reasons
+
+def _delete_employees(db_hr: Session, db_payroll: Session, db_auth: Session, employee_ids: list):
+    """Xóa theo lô (Auth -> Payroll -> HR), mỗi CSDL 1 commit."""
     try:
-        # Auth
-        db_auth.query(AuthUser).filter(AuthUser.employee_id_link == employee_id).delete()
-        db_auth.query(Shareholder).filter(Shareholder.employee_id == employee_id).delete() # Xóa record cổ đông rỗng nếu có
+        # Auth (kèm record cổ đông rỗng nếu có)
+        for ids in chunked(employee_ids):
+            db_auth.query(AuthUser).filter(AuthUser.employee_id_link.in_(ids)).delete(synchronize_session=False)
+            db_auth.query(Shareholder).filter(Shareholder.employee_id.in_(ids)).delete(synchronize_session=False)
         db_auth.commit()
 
         # Payroll
-        db_payroll.query(Attendance).filter(Attendance.EmployeeID == employee_id).delete()
-        db_payroll.query(EmployeePayroll).filter(EmployeePayroll.EmployeeID == employee_id).delete()
+        for ids in chunked(employee_ids):
+            db_payroll.query(Attendance).filter(Attendance.EmployeeID.in_(ids)).delete(synchronize_session=False)
+            db_payroll.query(EmployeePayroll).filter(EmployeePayroll.EmployeeID.in_(ids)).delete(synchronize_session=False)
         db_payroll.commit()
 
         # HR
-        db_hr.query(EmployeeHR).filter(EmployeeHR.EmployeeID == employee_id).delete()
+        for ids in chunked(employee_ids):
+            db_hr.query(EmployeeHR).filter(EmployeeHR.EmployeeID.in_(ids)).delete(synchronize_session=False)
         db_hr.commit()
-        
+
     except Exception as e:
-        print(f"Error deleting employee {employee_id}: {e}")
+        db_auth.rollback(); db_payroll.rollback(); db_hr.rollback()
+        print(f"Error deleting employees {employee_ids[:10]}: {e}")
         raise HTTPException(status_code=500, detail="Lỗi hệ thống khi xóa dữ liệu.")
 
-    return True
\ No newline at end of file
+    employee_search.remove_many(employee_ids, db_auth)
+    employee_directory.remove_many(employee_ids, db_auth)
+    dashboard_snapshot.request_rebuild()
+    for emp_id in employee_ids:
+        my_dashboard_cache.invalidate(emp_id)
+
+def delete_employee_synced(db_hr: Session, db_payroll: Session, db_auth: Session, employee_id: int):
+    """
+    Xóa nhân viên với kiểm tra ràng buộc (cổ đông, cổ tức, lương).
+    """
+    _, reasons = probe_delete_constraints(db_hr, db_payroll, db_auth, [employee_id])
+    if employee_id in reasons:
+        raise HTTPException(status_code=400, detail=f"KHÔNG THỂ XÓA: {reasons[employee_id][0]}")
+
+    _delete_employees(db_hr, db_payroll, db_auth, [employee_id])
+    return True
+
+def bulk_delete_employees(db_hr: Session, db_payroll: Session, db_auth: Session, employee_ids: list):
+    """Xóa nhiều nhân viên: trả về ID đã xóa, ID bị chặn kèm lý do và ID không tồn tại."""
+    started = time.perf_counter()
+    requested = list(dict.fromkeys(employee_ids))
+    existing, reasons = probe_delete_constraints(db_hr, db_payroll, db_auth, requested)
+
+    eligible = [i for i in requested if i in existing and i not in reasons]
+    if eligible:
+        _delete_employees(db_hr, db_payroll, db_auth, eligible)
+
+    return {
+        "requested": len(requested),
+        "deleted": eligible,
+        "blocked": [{"employee_id": i, "reasons": reasons[i]} for i in requested if i in reasons],
+        "not_found": [i for i in requested if i not in existing and i not in reasons],
+        "duration_ms": round((time.perf_counter() - started) * 1000),
+    }
@@ -3,36 +3,46 @@ from fastapi import HTTPException
 from sqlalchemy.orm import Session
 from models import DepartmentHR, PositionHR, EmployeeHR, DepartmentPayroll, PositionPayroll
 import schemas
+from services import dashboard_snapshot, my_dashboard_cache, employee_search, employee_directory, reference_cache, sync_outbox
 
 # ==========================================
 # QUẢN LÝ PHÒNG BAN (DEPARTMENTS)
 # ==========================================
 
 def get_departments(db_hr: Session):
-    """Lấy danh sách từ HUMAN_2025"""
+    """Lấy danh sách từ HUMAN_2025 (qua cache tham chiếu - services/reference_cache.py)"""
     # [FIX] Có thể thêm logic đếm số nhân viên nếu cần hiển thị ở Frontend
-    return list(db_hr.query(DepartmentHR).all())
+    return reference_cache.get_departments(db_hr)[0]
 
 def create_department_synced(db_hr: Session, db_payroll: Session, dept: schemas.DepartmentCreate):
     # 1. Tạo HR
     db_dept = DepartmentHR(DepartmentName=dept.DepartmentName)
     db_hr.add(db_dept)
+    outbox = sync_outbox.enabled()
     try:
+        if outbox:
+            db_hr.flush()
+            sync_outbox.enqueue(db_hr, sync_outbox.DEPARTMENT_UPSERTED, db_dept.DepartmentID)
         db_hr.commit()
         db_hr.refresh(db_dept)
     except Exception as e:
         db_hr.rollback()
         raise HTTPException(status_code=400, detail=f"Lỗi tạo HR: {e}")
 
-    # 2. Đồng bộ Payroll (Integration Role)
-    try:
-        db_p = DepartmentPayroll(DepartmentID=db_dept.DepartmentID, DepartmentName=db_dept.DepartmentName)
-        db_payroll.add(db_p)
-        db_payroll.commit()
-    except:
-        db_hr.delete(db_dept); db_hr.commit() # Rollback nếu sync lỗi
-        raise HTTPException(status_code=500, detail="Lỗi đồng bộ Payroll")
-    
+    # 2. Đồng bộ Payroll (Integration Role) - chế độ outbox: relay chạy nền áp dụng
+    if outbox:
+        sync_outbox.request_relay()
+    else:
+        try:
+            db_p = DepartmentPayroll(DepartmentID=db_dept.DepartmentID, DepartmentName=db_dept.DepartmentName)
+            db_payroll.add(db_p)
+            db_payroll.commit()
+        except:
+            db_hr.delete(db_dept); db_hr.commit() # Rollback nếu sync lỗi
+            raise HTTPException(status_code=500, detail="Lỗi đồng bộ Payroll")
+
+    reference_cache.invalidate()
+    dashboard_snapshot.request_rebuild()
     return db_dept
 
 def update_department_synced(db_hr: Session, db_payroll: Session, dept_id: int, dept_update: schemas.DepartmentUpdate):
@@ -42,15 +52,26 @@ def update_department_synced(db_hr: Session, db_payroll: Session, dept_id: int,
     # Update HR
     if dept_update.DepartmentName:
         db_dept.DepartmentName = dept_update.DepartmentName
-        db_hr.commit()
-        db_hr.refresh(db_dept)
-
-        # Update Payroll (Mapping)
-        p_dept = db_payroll.get(DepartmentPayroll, dept_id)
-        if p_dept:
-            p_dept.DepartmentName = dept_update.DepartmentName
-            db_payroll.commit()
-            
+        if sync_outbox.enabled():
+            sync_outbox.enqueue(db_hr, sync_outbox.DEPARTMENT_UPSERTED, dept_id)
+            db_hr.commit()
+            db_hr.refresh(db_dept)
+            sync_outbox.request_relay()
+        else:
+            db_hr.commit()
+            db_hr.refresh(db_dept)
+
+            # Update Payroll (Mapping)
+            p_dept = db_payroll.get(DepartmentPayroll, dept_id)
+            if p_dept:
+                p_dept.DepartmentName = dept_update.DepartmentName
+                db_payroll.commit()
+
+        # Tên phòng ban nằm trong cache tham chiếu, chỉ mục tìm kiếm và danh bạ nhân viên
+        reference_cache.invalidate()
+        employee_search.reindex(db_hr, EmployeeHR.DepartmentID == dept_id)
+        employee_directory.refresh(db_hr, EmployeeHR.DepartmentID == dept_id)
+        dashboard_snapshot.request_rebuild()
     return db_dept
 
 def delete_department(db_hr: Session, db_payroll: Session, dept_id: int):
@@ -76,7 +97,9 @@ def delete_department(db_hr: Session, db_payroll: Session, dept_id: int):
     if db_hr.get(DepartmentHR, dept_id):
         db_hr.query(DepartmentHR).filter(DepartmentHR.DepartmentID==dept_id).delete()
         db_hr.commit()
-        
+
+    reference_cache.invalidate()
+    dashboard_snapshot.request_rebuild()
     return True
 
 # ==========================================
@@ -84,24 +107,32 @@ def delete_department(db_hr: Session, db_payroll: Session, dept_id: int):
 # ==========================================
 
 def get_positions(db_hr: Session):
-    return list(db_hr.query(PositionHR).all())
+    return reference_cache.get_positions(db_hr)[0]
 
 def create_position_synced(db_hr: Session, db_payroll: Session, pos: schemas.PositionCreate):
     # 1. HR
     db_pos = PositionHR(PositionName=pos.PositionName)
     db_hr.add(db_pos)
+    outbox = sync_outbox.enabled()
     try:
+        if outbox:
+            db_hr.flush()
+            sync_outbox.enqueue(db_hr, sync_outbox.POSITION_UPSERTED, db_pos.PositionID)
         db_hr.commit(); db_hr.refresh(db_pos)
     except Exception as e:
         db_hr.rollback(); raise HTTPException(status_code=400, detail=f"Lỗi HR: {e}")
 
-    # 2. Payroll
-    try:
-        db_p = PositionPayroll(PositionID=db_pos.PositionID, PositionName=db_pos.PositionName)
-        db_payroll.add(db_p); db_payroll.commit()
-    except:
-        db_hr.delete(db_pos); db_hr.commit()
-        raise HTTPException(status_code=500, detail="Lỗi Payroll")
+    # 2. Payroll (chế độ outbox: relay chạy nền áp dụng)
+    if outbox:
+        sync_outbox.request_relay()
+    else:
+        try:
+            db_p = PositionPayroll(PositionID=db_pos.PositionID, PositionName=db_pos.PositionName)
+            db_payroll.add(db_p); db_payroll.commit()
+        except:
+            db_hr.delete(db_pos); db_hr.commit()
+            raise HTTPException(status_code=500, detail="Lỗi Payroll")
+    reference_cache.invalidate()
     return db_pos
 
 def update_position_synced(db_hr: Session, db_payroll: Session, pos_id: int, update: schemas.PositionUpdate):
@@ -110,12 +141,23 @@ def update_position_synced(db_hr: Session, db_payroll: Session, pos_id: int, upd
     
     if update.PositionName:
         db_pos.PositionName = update.PositionName
-        db_hr.commit()
-        
-        p_pos = db_payroll.get(PositionPayroll, pos_id)
-        if p_pos:
-            p_pos.PositionName = update.PositionName
-            db_payroll.commit()
+        if sync_outbox.enabled():
+            sync_outbox.enqueue(db_hr, sync_outbox.POSITION_UPSERTED, pos_id)
+            db_hr.commit()
+            sync_outbox.request_relay()
+        else:
+            db_hr.commit()
+
+            p_pos = db_payroll.get(PositionPayroll, pos_id)
+            if p_pos:
+                p_pos.PositionName = update.PositionName
+                db_payroll.commit()
+
+        # Tên chức vụ nằm trong cache tham chiếu, payload Dashboard cá nhân và chỉ mục tìm kiếm
+        reference_cache.invalidate()
+        my_dashboard_cache.invalidate_all()
+        employee_search.reindex(db_hr, EmployeeHR.PositionID == pos_id)
+        employee_directory.refresh(db_hr, EmployeeHR.PositionID == pos_id)
     return db_pos
 
 def delete_position(db_hr: Session, db_payroll: Session, pos_id: int):
@@ -137,4 +179,5 @@ def delete_position(db_hr: Session, db_payroll: Session, pos_id: int):
     if db_hr.get(PositionHR, pos_id):
         db_hr.query(PositionHR).filter(PositionHR.PositionID==pos_id).delete()
         db_hr.commit()
+    reference_cache.invalidate()
     return True
\ No newline at end of file
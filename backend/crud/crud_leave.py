@@ -3,6 +3,7 @@ from sqlalchemy.orm import Session
 from models import LeaveRequest, EmployeeHR
 import schemas
 from datetime import datetime
+from services import employee_directory
 
 def create_leave_request(db_auth: Session, request: schemas.LeaveRequestCreate, employee_id: int):
     db_request = LeaveRequest(
@@ -33,12 +34,19 @@ def get_leave_requests(db_auth: Session, db_hr: Session, employee_id: int = None
 
     # Lấy danh sách ID để query tên bên HR
     emp_ids = list(set([r.employee_id for r in results]))
-    employees = db_hr.query(EmployeeHR).filter(EmployeeHR.EmployeeID.in_(emp_ids)).all()
-    emp_map = {e.EmployeeID: e.FullName for e in employees}
+    if employee_directory.is_ready(db_auth):
+        # Danh bạ cục bộ (cùng Auth DB): có luôn tên phòng ban
+        directory = employee_directory.lookup(db_auth, emp_ids)
+        emp_map = {emp_id: name for emp_id, (name, _) in directory.items()}
+        dept_map = {emp_id: dept or "" for emp_id, (_, dept) in directory.items()}
+    else:
+        employees = db_hr.query(EmployeeHR).filter(EmployeeHR.EmployeeID.in_(emp_ids)).all()
+        emp_map = {e.EmployeeID: e.FullName for e in employees}
+        dept_map = {}
 
     mapped = []
     for req in results:
-        mapped.append(_map_to_schema(req, emp_map.get(req.employee_id, "Unknown")))
+        mapped.append(_map_to_schema(req, emp_map.get(req.employee_id, "Unknown"), dept_map.get(req.employee_id, "")))
         
     return mapped
 
@@ -52,12 +60,12 @@ def update_leave_status(db_auth: Session, request_id: int, status: str, approver
         return _map_to_schema(req, "Unknown") # Tên không quan trọng khi update
     return None
 
-def _map_to_schema(db_obj, employee_name):
+def _map_to_schema(db_obj, employee_name, department_name=""):
     return schemas.LeaveRequest(
         RequestID=db_obj.id,
         EmployeeID=db_obj.employee_id,
         EmployeeName=employee_name,
-        DepartmentName="", # Có thể query thêm nếu cần
+        DepartmentName=department_name,
         LeaveType=db_obj.leave_type,
         StartDate=db_obj.start_date,
         EndDate=db_obj.end_date,
@@ -3,11 +3,50 @@ from sqlalchemy.orm import Session
 from models import Salary, Attendance, EmployeePayroll
 import schemas
 from decimal import Decimal
+from services import dashboard_snapshot, payroll_rollup, my_dashboard_cache
+from core import pagination
+
+# Khóa sắp xếp ghi trong cursor phân trang lịch sử lương / chấm công
+SALARY_CURSOR = "-salary_month"
+ATTENDANCE_CURSOR = "-attendance_month"
 
 def get_salary_history(db_payroll: Session, employee_id: int):
     """Lấy lịch sử lương của nhân viên (Sắp xếp tháng mới nhất trước)."""
     return db_payroll.query(Salary).filter(Salary.EmployeeID == employee_id).order_by(Salary.SalaryMonth.desc()).all()
 
+def _history_page(db_payroll: Session, model, month_col, employee_id: int, sort_key: str, limit=None, after=None):
+    """
+    Lịch sử theo tháng (mới nhất trước) với phân trang keyset trên (tháng, ID).
+    after = (tháng, ID) của dòng cuối trang trước. limit=None -> toàn bộ.
+    Trả về (items, next_cursor).
+    """
+    id_col = model.__mapper__.primary_key[0]
+    id_attr = getattr(model, id_col.key)
+    query = db_payroll.query(model).filter(model.EmployeeID == employee_id)
+    if after:
+        query = query.filter(pagination.keyset_filter(month_col, id_attr, after[0], after[1], descending=True))
+    query = query.order_by(*pagination.keyset_order(month_col, id_attr, descending=True))
+    if limit is None:
+        return query.all(), None
+
+    rows = query.limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, pagination.encode_cursor(sort_key, getattr(last, month_col.key), getattr(last, id_col.key))
+
+def get_salary_page(db_payroll: Session, employee_id: int, limit=None, after=None):
+    return _history_page(db_payroll, Salary, Salary.SalaryMonth, employee_id, SALARY_CURSOR, limit, after)
+
+def get_attendance_page(db_payroll: Session, employee_id: int, limit=None, after=None):
+    return _history_page(db_payroll, Attendance, Attendance.AttendanceMonth, employee_id, ATTENDANCE_CURSOR, limit, after)
+
+def decode_history_cursor(cursor: str, sort_key: str):
+    """Cursor của get_salary_page / get_attendance_page -> (tháng, ID). Ném pagination.InvalidCursor."""
+    value, last_id = pagination.decode_cursor(cursor, sort_key)
+    return pagination.parse_date(value), last_id
+
 def get_attendance_data(db_payroll: Session, employee_id: int):
     """
     [Data Source: MySQL]
@@ -28,6 +67,10 @@ def update_salary(db_payroll: Session, salary_id: int, salary_update: schemas.Sa
 
     update_data = salary_update.dict(exclude_unset=True)
 
+    # Phần đóng góp cũ vào bảng tổng hợp payroll_month_rollup
+    department_id = db_salary.employee.DepartmentID if db_salary.employee else None
+    old_contribution = payroll_rollup.salary_contribution(db_salary, department_id)
+
     # Cập nhật các trường được gửi lên
     for key, value in update_data.items():
         setattr(db_salary, key, value)
@@ -43,10 +86,17 @@ def update_salary(db_payroll: Session, salary_id: int, salary_update: schemas.Sa
 
     db_payroll.add(db_salary)
     try:
+        # Cập nhật rollup trong cùng transaction với bản ghi lương
+        payroll_rollup.apply_salary_change(
+            db_payroll, old_contribution,
+            payroll_rollup.salary_contribution(db_salary, department_id)
+        )
         db_payroll.commit()
         db_payroll.refresh(db_salary)
     except Exception as e:
         db_payroll.rollback()
         raise e 
-        
+
+    dashboard_snapshot.request_rebuild()
+    my_dashboard_cache.invalidate(db_salary.EmployeeID)
     return db_salary
\ No newline at end of file
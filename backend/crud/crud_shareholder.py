@@ -1,9 +1,14 @@
 # backend/crud/crud_shareholder.py
+from fastapi import HTTPException
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from models import Shareholder, EmployeeHR, DepartmentHR, Dividend
+from sqlalchemy import case, inspect, select, text, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from models import Shareholder, EmployeeHR
 import schemas
 from decimal import Decimal
+import time
+from services import dashboard_snapshot, dividend_ledger, reference_cache, employee_directory
+from core.batching import chunked
 
 def get_shareholders_real(db_auth: Session, db_hr: Session):
     """
@@ -13,7 +18,9 @@ def get_shareholders_real(db_auth: Session, db_hr: Session):
     3. Ghép lại để hiển thị.
     """
     # 1. Lấy danh sách cổ đông đã lưu trong Auth DB
-    shareholders_db = db_auth.query(Shareholder).all()
+    shareholders_db = db_auth.query(
+        Shareholder.id, Shareholder.employee_id, Shareholder.shares, Shareholder.status
+    ).all()
     
     if not shareholders_db:
         return []
@@ -21,29 +28,34 @@ def get_shareholders_real(db_auth: Session, db_hr: Session):
     # Lấy list ID để query SQL Server 1 lần
     emp_ids = [s.employee_id for s in shareholders_db]
 
-    # 2. Query thông tin nhân viên từ HR DB
-    employees_hr = db_hr.query(
-        EmployeeHR.EmployeeID, 
-        EmployeeHR.FullName, 
-        DepartmentHR.DepartmentName
-    ).join(
-        DepartmentHR, EmployeeHR.DepartmentID == DepartmentHR.DepartmentID
-    ).filter(
-        EmployeeHR.EmployeeID.in_(emp_ids)
-    ).all()
-
-    # Tạo map để tra cứu nhanh: ID -> {Name, Dept}
-    emp_map = {e.EmployeeID: {"name": e.FullName, "dept": e.DepartmentName} for e in employees_hr}
+    # 2. Thông tin nhân viên: đọc từ danh bạ cục bộ (services/employee_directory.py) nếu đã dựng
+    emp_map = {}
+    if employee_directory.is_ready(db_auth):
+        emp_map = {
+            emp_id: {"name": name, "dept": dept}
+            for emp_id, (name, dept) in employee_directory.lookup(db_auth, emp_ids).items() if dept is not None
+        }
+    else:
+        # Query thông tin nhân viên từ HR DB (theo lô, tránh IN list không giới hạn)
+        # Tên phòng ban tra từ cache tham chiếu thay vì JOIN
+        dept_names = reference_cache.department_names(db_hr)
+        for ids in chunked(emp_ids):
+            employees_hr = db_hr.query(
+                EmployeeHR.EmployeeID,
+                EmployeeHR.FullName,
+                EmployeeHR.DepartmentID
+            ).filter(
+                EmployeeHR.EmployeeID.in_(ids),
+                EmployeeHR.DepartmentID.isnot(None)
+            ).all()
+            # Tạo map để tra cứu nhanh: ID -> {Name, Dept}
+            emp_map.update({
+                e.EmployeeID: {"name": e.FullName, "dept": dept_names.get(e.DepartmentID)}
+                for e in employees_hr if e.DepartmentID in dept_names
+            })
 
-    # 3. Tính tổng cổ tức đã nhận (từ SQL Server)
-    dividends = db_hr.query(
-        Dividend.EmployeeID,
-        func.sum(Dividend.DividendAmount).label("total")
-    ).filter(
-        Dividend.EmployeeID.in_(emp_ids)
-    ).group_by(Dividend.EmployeeID).all()
-    
-    div_map = {d.EmployeeID: d.total for d in dividends}
+    # 3. Tổng cổ tức đã nhận: đọc sẵn từ sổ tổng hợp DividendLedger
+    div_map = dividend_ledger.paid_by_employee(db_hr)
 
     # 4. Ghép dữ liệu
     result = []
@@ -55,61 +67,121 @@ def get_shareholders_real(db_auth: Session, db_hr: Session):
         
         percent = (sh.shares / total_shares_company) * 100
 
-        result.append(schemas.Shareholder(
-            ShareholderID=sh.id,
-            EmployeeID=sh.employee_id,
-            FullName=info["name"],
-            DepartmentName=info["dept"],
-            Shares=sh.shares,
-            SharePercentage=round(percent, 4),
-            Status=sh.status,
-            UnpaidDividend=total_div # Hiển thị tổng đã nhận hoặc logic khác tùy business
-        ))
+        # dict cùng cấu trúc schemas.Shareholder (endpoint trả qua LeanJSONResponse)
+        result.append({
+            "EmployeeID": sh.employee_id,
+            "Shares": sh.shares,
+            "Status": sh.status,
+            "ShareholderID": sh.id,
+            "FullName": info["name"],
+            "DepartmentName": info["dept"],
+            "SharePercentage": round(percent, 4),
+            "UnpaidDividend": total_div # Hiển thị tổng đã nhận hoặc logic khác tùy business
+        })
     
     return result
 
 # --- [THÊM MỚI] Hàm này sẽ chạy khi khởi động server ---
-def sync_all_employees_to_shareholders(db_auth: Session, db_hr: Session):
+# Trạng thái cổ đông suy ra từ trạng thái nhân sự (các giá trị khác do người dùng đặt tay -> giữ nguyên)
+SYNCED_STATUSES = ("Active", "Inactive")
+
+def _initial_shares(position_id) -> int:
+    # Logic giả định số cổ phần ban đầu dựa trên chức vụ
+    # 5: Giám đốc, 4: Trưởng phòng... (Dựa trên data mẫu của bạn)
+    if position_id == 5: return 5000
+    elif position_id == 4: return 2000
+    elif position_id == 3: return 1000
+    return 100 # Nhân viên thường tặng 100 cổ phần tượng trưng
+
+def _shareholder_status(hr_status) -> str:
+    return "Active" if hr_status == "Đang làm việc" else "Inactive"
+
+def ensure_hr_status_column(engine):
+    """Bảng shareholders có từ trước: thêm cột hr_status nếu chưa có."""
+    columns = {c["name"] for c in inspect(engine).get_columns(Shareholder.__tablename__)}
+    if "hr_status" not in columns:
+        with engine.begin() as conn:
+            conn.execute(text(f"ALTER TABLE {Shareholder.__tablename__} ADD COLUMN hr_status VARCHAR(50)"))
+
+def sync_all_employees_to_shareholders(db_auth: Session, db_hr: Session, where=None):
     """
-    Tự động quét toàn bộ nhân viên từ HR (SQL Server).
-    Nếu nhân viên chưa có trong bảng Shareholders (SQLite), sẽ tự động thêm vào.
+    Đồng bộ nhân viên HR (SQL Server) sang bảng Shareholders (SQLite) theo tập hợp:
+    - Nhân viên chưa có -> INSERT ... ON CONFLICT DO NOTHING theo lô.
+    - Nhân viên đã có mà trạng thái HR đổi so với lần đồng bộ trước (cột hr_status)
+      -> UPDATE theo lô. Chỉ so với HR, không so với `status` hiện tại: trạng thái
+      Active/Inactive đặt tay (create_shareholder) giữ nguyên tới khi HR thật sự đổi.
+    - Cổ đông chưa có hr_status (tạo trước đây / tạo tay) -> chỉ ghi mốc, không đổi `status`.
+    `where`: điều kiện thêm trên EmployeeHR (đồng bộ tăng dần), None = toàn bộ.
     """
+    started = time.perf_counter()
+    stats = {"scanned": 0, "added": 0, "status_updated": 0}
     try:
-        # 1. Lấy tất cả nhân viên đang làm việc từ HR
-        employees = db_hr.query(EmployeeHR).all()
-        
-        added_count = 0
-        for emp in employees:
-            # Kiểm tra xem đã có trong bảng Shareholder chưa
-            exists = db_auth.query(Shareholder).filter(Shareholder.employee_id == emp.EmployeeID).first()
-            
-            if not exists:
-                # Logic giả định số cổ phần ban đầu dựa trên chức vụ
-                # 5: Giám đốc, 4: Trưởng phòng... (Dựa trên data mẫu của bạn)
-                initial_shares = 0
-                if emp.PositionID == 5: initial_shares = 5000
-                elif emp.PositionID == 4: initial_shares = 2000
-                elif emp.PositionID == 3: initial_shares = 1000
-                else: initial_shares = 100 # Nhân viên thường tặng 100 cổ phần tượng trưng
-
-                new_sh = Shareholder(
-                    employee_id=emp.EmployeeID,
-                    shares=initial_shares,
-                    status="Active" if emp.Status == "Đang làm việc" else "Inactive"
+        # 1 truy vấn cho toàn bộ cổ đông hiện có: employee_id -> (status, hr_status)
+        existing = {
+            employee_id: (status, hr_status)
+            for employee_id, status, hr_status in db_auth.query(
+                Shareholder.employee_id, Shareholder.status, Shareholder.hr_status
+            )
+        }
+
+        stmt = select(EmployeeHR.EmployeeID, EmployeeHR.PositionID, EmployeeHR.Status)
+        if where is not None:
+            stmt = stmt.where(where)
+        new_rows = []
+        hr_changes = {"Active": [], "Inactive": []}  # HR đổi -> cập nhật hr_status + status
+        first_seen = {"Active": [], "Inactive": []}  # Chưa có mốc -> chỉ ghi hr_status
+        for partition in db_hr.execute(stmt.execution_options(yield_per=5000)).partitions():
+            for emp in partition:
+                stats["scanned"] += 1
+                hr_status = _shareholder_status(emp.Status)
+                if emp.EmployeeID not in existing:
+                    new_rows.append({
+                        "employee_id": emp.EmployeeID,
+                        "shares": _initial_shares(emp.PositionID),
+                        "status": hr_status,
+                        "hr_status": hr_status
+                    })
+                    continue
+                status, last_hr_status = existing[emp.EmployeeID]
+                if last_hr_status is None:
+                    first_seen[hr_status].append(emp.EmployeeID)
+                elif last_hr_status != hr_status:
+                    hr_changes[hr_status].append(emp.EmployeeID)
+                    if status in SYNCED_STATUSES and status != hr_status:
+                        stats["status_updated"] += 1
+
+        insert_stmt = sqlite_insert(Shareholder.__table__).on_conflict_do_nothing(index_elements=["employee_id"])
+        for rows in chunked(new_rows, 500):
+            stats["added"] += db_auth.execute(insert_stmt, rows).rowcount
+        for hr_status, employee_ids in hr_changes.items():
+            # Trạng thái khác Active/Inactive do người dùng đặt -> giữ nguyên
+            new_status = case((Shareholder.status.in_(SYNCED_STATUSES), hr_status), else_=Shareholder.status)
+            for ids in chunked(employee_ids):
+                db_auth.execute(
+                    update(Shareholder).where(Shareholder.employee_id.in_(ids))
+                    .values(status=new_status, hr_status=hr_status)
                 )
-                db_auth.add(new_sh)
-                added_count += 1
-        
-        if added_count > 0:
-            db_auth.commit()
-            print(f"✅ [AUTO-SYNC] Đã đồng bộ thêm {added_count} nhân viên vào danh sách Cổ đông.")
+        for hr_status, employee_ids in first_seen.items():
+            for ids in chunked(employee_ids):
+                db_auth.execute(
+                    update(Shareholder).where(Shareholder.employee_id.in_(ids)).values(hr_status=hr_status)
+                )
+        db_auth.commit()
+
+        stats["duration_ms"] = round((time.perf_counter() - started) * 1000)
+        if stats["added"] or stats["status_updated"]:
+            dashboard_snapshot.request_rebuild()
+            print(f"✅ [AUTO-SYNC] Đã đồng bộ thêm {stats['added']} nhân viên vào danh sách Cổ đông, "
+                  f"cập nhật trạng thái {stats['status_updated']} cổ đông ({stats['duration_ms']} ms).")
         else:
-            print("✅ [AUTO-SYNC] Danh sách cổ đông đã đồng bộ (không có nhân viên mới).")
-            
+            print(f"✅ [AUTO-SYNC] Danh sách cổ đông đã đồng bộ (không có thay đổi, {stats['duration_ms']} ms).")
+
     except Exception as e:
         db_auth.rollback()
+        stats["error"] = str(e)
         print(f"❌ [AUTO-SYNC ERROR] Lỗi đồng bộ cổ đông: {e}")
-        
+    return stats
+
 def create_shareholder(db_auth: Session, db_hr: Session, shareholder_in: schemas.ShareholderCreate):
     """Thêm cổ đông mới vào SQLite, kiểm tra ID tồn tại bên HR."""
     # Kiểm tra nhân viên có tồn tại bên HR không
@@ -125,6 +197,7 @@ def create_shareholder(db_auth: Session, db_hr: Session, shareholder_in: schemas
         existing.status = shareholder_in.Status
         db_auth.commit()
         db_auth.refresh(existing)
+        dashboard_snapshot.request_rebuild()
         return existing
 
     # Tạo mới
@@ -136,4 +209,60 @@ def create_shareholder(db_auth: Session, db_hr: Session, shareholder_in: schemas
     db_auth.add(db_obj)
     db_auth.commit()
     db_auth.refresh(db_obj)
-    return db_obj
\ No newline at end of file
+    dashboard_snapshot.request_rebuild()
+    return db_obj
+
+def preview_dividend_payout(db_auth: Session, db_hr: Session, total_profit: Decimal):
+    """
+    Tính tỷ lệ và số tiền cổ tức cho toàn bộ cổ đông Active (chưa lưu DB).
+    Dùng chung cho API preview-payout và job báo cáo chạy nền.
+    """
+    shareholders = db_auth.query(Shareholder).filter(Shareholder.status == "Active").all()
+
+    if not shareholders:
+        raise HTTPException(status_code=400, detail="Chưa có cổ đông nào trong hệ thống.")
+
+    total_shares = sum(sh.shares for sh in shareholders)
+    if total_shares == 0:
+        raise HTTPException(status_code=400, detail="Tổng số cổ phần bằng 0, không thể chia.")
+
+    dividend_per_share = total_profit / Decimal(total_shares)
+
+    emp_map = {}
+    if employee_directory.is_ready(db_auth):
+        # Danh bạ cục bộ: tên + phòng ban trong cùng Auth DB
+        emp_map = {
+            emp_id: {"name": name, "dept": dept or "N/A"}
+            for emp_id, (name, dept) in employee_directory.lookup(db_auth, [sh.employee_id for sh in shareholders]).items()
+        }
+    else:
+        # Lấy tên theo lô (1 truy vấn/lô), tên phòng ban tra từ cache tham chiếu
+        dept_names = reference_cache.department_names(db_hr)
+        for ids in chunked([sh.employee_id for sh in shareholders]):
+            rows = db_hr.query(
+                EmployeeHR.EmployeeID, EmployeeHR.FullName, EmployeeHR.DepartmentID
+            ).filter(EmployeeHR.EmployeeID.in_(ids)).all()
+            emp_map.update({
+                r.EmployeeID: {"name": r.FullName, "dept": dept_names.get(r.DepartmentID) or "N/A"} for r in rows
+            })
+
+    payout_list = []
+    for sh in shareholders:
+        info = emp_map.get(sh.employee_id, {"name": f"NV {sh.employee_id}", "dept": "Unknown"})
+        amount = Decimal(sh.shares) * dividend_per_share
+        percentage = (sh.shares / total_shares) * 100
+
+        payout_list.append(schemas.DividendItem(
+            employee_id=sh.employee_id,
+            full_name=info["name"],
+            department_name=info["dept"],
+            shares=sh.shares,
+            percentage=round(percentage, 2),
+            dividend_amount=round(amount, 0)
+        ))
+
+    return {
+        "total_shares": total_shares,
+        "dividend_per_share": round(dividend_per_share, 2),
+        "payout_list": payout_list
+    }
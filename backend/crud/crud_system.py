@@ -25,8 +25,11 @@ def create_audit_log(db_auth: Session, user_email: str, action: str, target: str
         print(f"❌ Error writing audit log (Ignored): {e}")
 
 def get_audit_logs(db_auth: Session, skip: int = 0, limit: int = 100):
-    """Lấy danh sách log (Mới nhất trước)."""
-    return db_auth.query(AuditLog).order_by(AuditLog.timestamp.desc()).offset(skip).limit(limit).all()
+    """Lấy danh sách log (Mới nhất trước) dạng dict, chỉ các cột cần hiển thị."""
+    rows = db_auth.query(
+        AuditLog.id, AuditLog.user_email, AuditLog.action, AuditLog.target, AuditLog.details, AuditLog.timestamp
+    ).order_by(AuditLog.timestamp.desc()).offset(skip).limit(limit).all()
+    return [row._asdict() for row in rows]
 
 # --- SYSTEM CONFIG ---
 def get_config(db_auth: Session, key: str):
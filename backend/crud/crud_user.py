@@ -5,6 +5,7 @@ from models import User
 import schemas
 from core.security import get_password_hash
 from typing import Optional # Make sure Optional is imported
+from services import employee_directory
 
 def get_user_by_email(db_auth: Session, email: str):
     return db_auth.query(User).filter(User.email == email).first()
@@ -12,6 +13,9 @@ def get_user_by_email(db_auth: Session, email: str):
 def get_user_by_id(db_auth: Session, user_id: int):
     return db_auth.query(User).filter(User.id == user_id).first()
 
+def get_user_by_employee_id(db_auth: Session, employee_id: int):
+    return db_auth.query(User).filter(User.employee_id_link == employee_id).first()
+
 # --- HÀM ĐÃ SỬA ---
 def get_users(
     db_auth: Session,
@@ -20,7 +24,10 @@ def get_users(
     search: Optional[str] = None,
     role: Optional[str] = None # <-- Đảm bảo tham số 'role' ở đây
 ):
-    query = db_auth.query(User)
+    # Chỉ SELECT các cột trả về (không có hashed_password), trả về list dict cho LeanJSONResponse
+    query = db_auth.query(
+        User.email, User.full_name, User.phone_number, User.role, User.employee_id_link, User.id
+    )
 
     # Filter by search term
     if search:
@@ -37,7 +44,7 @@ def get_users(
         query = query.filter(User.role == role)
 
     # Apply ordering, skip, and limit before fetching
-    return query.order_by(User.id).offset(skip).limit(limit).all()
+    return [row._asdict() for row in query.order_by(User.id).offset(skip).limit(limit).all()]
 # --- KẾT THÚC HÀM SỬA ---
 
 def create_user(db_auth: Session, user: schemas.UserCreate):
@@ -54,6 +61,7 @@ def create_user(db_auth: Session, user: schemas.UserCreate):
     db_auth.add(db_user)
     db_auth.commit()
     db_auth.refresh(db_user)
+    employee_directory.sync_account(db_auth, db_user)
     return db_user
 
 def update_user_role(db_auth: Session, user_id: int, new_role: str):
@@ -64,6 +72,7 @@ def update_user_role(db_auth: Session, user_id: int, new_role: str):
     db_auth.add(db_user)
     db_auth.commit()
     db_auth.refresh(db_user)
+    employee_directory.sync_account(db_auth, db_user)
     return db_user
 
 def update_user_password(db_auth: Session, user_id: int, new_password: str):
@@ -1,50 +1,112 @@
 # backend/database.py
+import threading
+
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, scoped_session
 from core.config import settings
 
+
+def _sqlite_args(url: str) -> dict:
+    """HR/Payroll có thể trỏ sang SQLite (HR_DB_URL / PAYROLL_DB_URL), cần tắt check_same_thread."""
+    return {"connect_args": {"check_same_thread": False}} if url.startswith("sqlite") else {}
+
 # --- Thiết lập 3 Engines và 3 Bases ---
+# Engine tạo LƯỜI (lần đầu mở session hoặc truy cập `database.engine_xxx`): create_engine nạp
+# driver (pyodbc, mysql-connector) và dựng pool, worker chỉ dùng Auth DB không phải trả phí đó.
+
+def _create_engine_sqlserver():
+    # 1. SQL Server (HUMAN_2025)
+    return create_engine(
+        settings.SQLALCHEMY_DATABASE_URI_SQLSERVER,
+        # --- THÊM CẤU HÌNH POOL ---
+        pool_size=10,         # Tăng số kết nối cơ bản
+        max_overflow=20,      # Tăng số kết nối dự phòng
+        pool_timeout=30,      # Giữ nguyên timeout chờ kết nối
+        # pool_recycle=1800   # Có thể thêm nếu SQL Server của bạn đóng kết nối nhàn rỗi
+        # --------------------------
+        **_sqlite_args(settings.SQLALCHEMY_DATABASE_URI_SQLSERVER)
+    )
+
+def _create_engine_mysql():
+    # 2. MySQL (PAYROLL)
+    return create_engine(
+        settings.SQLALCHEMY_DATABASE_URI_MYSQL,
+        # --- THÊM CẤU HÌNH POOL ---
+        pool_size=10,
+        max_overflow=20,
+        pool_timeout=30,
+        pool_recycle=3600,   # Rất nên có cho MySQL để tránh lỗi connection closed
+        # --------------------------
+        **_sqlite_args(settings.SQLALCHEMY_DATABASE_URI_MYSQL)
+    )
+
+def _create_engine_auth():
+    # 3. SQLite (DASHBOARD AUTH)
+    return create_engine(
+        settings.DASHBOARD_DB_URL,
+        connect_args={"check_same_thread": False}, # Bắt buộc cho SQLite
+        # --- THÊM CẤU HÌNH POOL CHO SQLITE ---
+        # SQLite thường không cần pool phức tạp, nhưng QueuePool là mặc định
+        # Tăng giới hạn nếu cần, nhưng vấn đề SQLite thường là ghi đồng thời
+        pool_size=10,         # Tăng nhẹ
+        max_overflow=20       # Tăng nhẹ
+        # pool_timeout=30     # Mặc định thường là đủ
+        # ------------------------------------
+    )
+
+_ENGINE_BUILDERS = {
+    "engine_sqlserver": _create_engine_sqlserver,
+    "engine_mysql": _create_engine_mysql,
+    "engine_auth": _create_engine_auth,
+}
+_engines = {}
+_engines_lock = threading.Lock()
+
+
+def get_engine(name: str):
+    """Trả về engine theo tên ("engine_sqlserver" / "engine_mysql" / "engine_auth"), tạo ở lần gọi đầu."""
+    engine = _engines.get(name)
+    if engine is None:
+        with _engines_lock:
+            engine = _engines.get(name)
+            if engine is None:
+                engine = _engines[name] = _ENGINE_BUILDERS[name]()
+    return engine
+
+
+def created_engines() -> list:
+    """Tên các engine đã được tạo (dùng cho --profile-startup)."""
+    return list(_engines)
+
+
+def __getattr__(name):
+    # `from database import engine_auth` / `database.engine_mysql` vẫn dùng được như trước
+    if name in _ENGINE_BUILDERS:
+        return get_engine(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+class _LazySessionmaker(sessionmaker):
+    """sessionmaker chỉ gắn engine (và tạo engine) khi mở session đầu tiên."""
+
+    def __init__(self, engine_name: str, **kw):
+        super().__init__(**kw)
+        self._engine_name = engine_name
+
+    def __call__(self, **local_kw):
+        if self.kw.get("bind") is None:
+            self.configure(bind=get_engine(self._engine_name))
+        return super().__call__(**local_kw)
+
 
-# 1. SQL Server (HUMAN_2025)
-engine_sqlserver = create_engine(
-    settings.SQLALCHEMY_DATABASE_URI_SQLSERVER,
-    # --- THÊM CẤU HÌNH POOL ---
-    pool_size=10,         # Tăng số kết nối cơ bản
-    max_overflow=20,      # Tăng số kết nối dự phòng
-    pool_timeout=30,      # Giữ nguyên timeout chờ kết nối
-    # pool_recycle=1800   # Có thể thêm nếu SQL Server của bạn đóng kết nối nhàn rỗi
-    # --------------------------
-)
-SessionLocalSQLServer = scoped_session(sessionmaker(autocommit=False, autoflush=False, bind=engine_sqlserver))
+SessionLocalSQLServer = scoped_session(_LazySessionmaker("engine_sqlserver", autocommit=False, autoflush=False))
 BaseSQLServer = declarative_base()
 
-# 2. MySQL (PAYROLL)
-engine_mysql = create_engine(
-    settings.SQLALCHEMY_DATABASE_URI_MYSQL,
-    # --- THÊM CẤU HÌNH POOL ---
-    pool_size=10,
-    max_overflow=20,
-    pool_timeout=30,
-    pool_recycle=3600    # Rất nên có cho MySQL để tránh lỗi connection closed
-    # --------------------------
-)
-SessionLocalMySQL = scoped_session(sessionmaker(autocommit=False, autoflush=False, bind=engine_mysql))
+SessionLocalMySQL = scoped_session(_LazySessionmaker("engine_mysql", autocommit=False, autoflush=False))
 BaseMySQL = declarative_base()
 
-# 3. SQLite (DASHBOARD AUTH)
-engine_auth = create_engine(
-    settings.DASHBOARD_DB_URL,
-    connect_args={"check_same_thread": False}, # Bắt buộc cho SQLite
-    # --- THÊM CẤU HÌNH POOL CHO SQLITE ---
-    # SQLite thường không cần pool phức tạp, nhưng QueuePool là mặc định
-    # Tăng giới hạn nếu cần, nhưng vấn đề SQLite thường là ghi đồng thời
-    pool_size=10,         # Tăng nhẹ
-    max_overflow=20       # Tăng nhẹ
-    # pool_timeout=30     # Mặc định thường là đủ
-    # ------------------------------------
-)
-SessionLocalAuth = scoped_session(sessionmaker(autocommit=False, autoflush=False, bind=engine_auth))
+SessionLocalAuth = scoped_session(_LazySessionmaker("engine_auth", autocommit=False, autoflush=False))
 BaseAuth = declarative_base()
 
 
@@ -68,4 +130,4 @@ def get_db_auth():
     try:
         yield db
     finally:
-        SessionLocalAuth.remove()
\ No newline at end of file
+        SessionLocalAuth.remove()
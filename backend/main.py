@@ -1,30 +1,29 @@
 # backend/main.py
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from apscheduler.schedulers.background import BackgroundScheduler
 from contextlib import asynccontextmanager
 import atexit
-from sqlalchemy.orm import joinedload 
+import threading
 
 from api.v1.api import api_router
-from database import SessionLocalSQLServer, SessionLocalMySQL, SessionLocalAuth, engine_auth, BaseAuth
-from services.alert_service import (
-    check_work_anniversaries,
-    check_excessive_leave,
-    send_monthly_payroll_emails,
-    check_payroll_discrepancies
-)
+# Engine tạo lười (database.get_engine): lỗi driver / kết nối chỉ làm hỏng bước khởi động dùng nó
+from database import SessionLocalSQLServer, SessionLocalMySQL, SessionLocalAuth, BaseAuth, get_engine
 # Sửa import: Lấy EmployeeHR trực tiếp từ models
-from models import User as AuthUser, EmployeeHR
-# [CẬP NHẬT] Thêm crud_shareholder vào import
+from models import EmployeeHR
 from crud import crud_user, crud_shareholder
 import schemas 
-from core.security import get_password_hash 
-from auth.auth import get_user_role as get_role_from_hr
-from database import engine_mysql, BaseMySQL
+from services import (
+    dashboard_snapshot, payroll_rollup, dividend_ledger, report_jobs, employee_search, reference_cache,
+    employee_directory, sync_outbox, hr_sync, startup
+)
+from core import date_keys, pagination
+from core.config import settings
+from core.responses import LeanJSONResponse
+from models import Attendance, Salary
 
 def run_alert_jobs():
     """Các hàm chạy dịch vụ cảnh báo (chạy hàng ngày)"""
+    from services.alert_service import check_work_anniversaries, check_excessive_leave, check_payroll_discrepancies
     print("Scheduler running daily jobs...")
     db_hr = SessionLocalSQLServer()
     db_payroll = SessionLocalMySQL()
@@ -41,6 +40,7 @@ def run_alert_jobs():
 
 def run_monthly_email_job():
     """Hàm wrapper để chạy job gửi email lương hàng tháng"""
+    from services.alert_service import send_monthly_payroll_emails
     print("Scheduler running monthly email job...")
     db_hr = SessionLocalSQLServer()
     db_payroll = SessionLocalMySQL()
@@ -53,13 +53,30 @@ def run_monthly_email_job():
         if db_payroll: db_payroll.close()
 
 
+# critical = request đọc/ghi trực tiếp bảng của bước đó -> /readyz chỉ trả 200 khi đã xong.
+# Chỉ mục tìm kiếm không critical: trong lúc dựng, tìm kiếm tự quay về ilike.
+STARTUP_STAGES = (
+    ("auth_schema", "Tạo bảng dashboard_auth.db", True),
+    ("admin_account", "Tài khoản ADMIN", True),
+    ("payroll_rollup", "Bảng payroll_month_rollup", True),
+    ("dividend_ledger", "Sổ cổ tức DividendLedger", True),
+    ("date_indexes", "Index truy vấn theo ngày / phân trang", False),
+    ("sync_outbox", "Bảng SyncOutbox", True),
+    ("scheduler", "Scheduler", False),
+    ("hr_sync", "Đồng bộ tài khoản / Cổ đông HR -> Auth", False),
+    ("employee_search", "Chỉ mục tìm kiếm nhân viên", False),
+    ("reference_cache", "Cache phòng ban / chức vụ", False),
+)
+
+
 def initial_sync_and_setup():
     """
-    Hàm này chạy một lần khi server khởi động:
+    Hàm này chạy một lần khi server khởi động (ở nền, xem services/startup.py):
     1. Tạo CSDL auth nếu chưa có (bao gồm cả bảng shareholders, leave_requests).
     2. Tạo/Kiểm tra tài khoản ADMIN mặc định.
-    3. Đồng bộ nhân viên từ HR_DB sang Auth_DB.
-    4. [MỚI] Đồng bộ danh sách Cổ đông từ HR sang Auth DB.
+    3. Tạo các bảng / index phụ trợ rồi khởi động scheduler.
+    4. Đồng bộ nhân viên + Cổ đông từ HR_DB sang Auth_DB, tăng dần theo watermark
+       (bỏ qua nếu STARTUP_SYNC_MODE=skip; sau đó chạy định kỳ trên scheduler).
     """
     print("--- BẮT ĐẦU KHỞI TẠO VÀ ĐỒNG BỘ ---")
     db_auth = SessionLocalAuth()
@@ -67,94 +84,157 @@ def initial_sync_and_setup():
     try:
         # 1. Tạo bảng trong CSDL Auth (Users, Shareholders, LeaveRequests...)
         print("1. Đang kiểm tra và tạo bảng trong dashboard_auth.db...")
-        BaseAuth.metadata.create_all(bind=engine_auth)
+        with startup.stage("auth_schema"):
+            BaseAuth.metadata.create_all(bind=get_engine("engine_auth"))
+            crud_shareholder.ensure_hr_status_column(get_engine("engine_auth"))
+
+            # Job báo cáo còn dở của tiến trình đã dừng (hết lease) -> đánh dấu lỗi
+            interrupted = report_jobs.fail_interrupted_jobs(db_auth)
+            if interrupted:
+                print(f"   -> Đã đánh dấu {interrupted} job báo cáo bị gián đoạn.")
 
         # 2. Tạo/Kiểm tra tài khoản DEV (BỎ QUA)
         print("2. (Đã bỏ qua) Tạo tài khoản DEV...")
         
         # --- TẠO/KIỂM TRA TÀI KHOẢN ADMIN ---
         print("3. Đang kiểm tra và tạo tài khoản ADMIN...")
-        admin_email = "admin@company.vn"
-        admin_user = crud_user.get_user_by_email(db_auth, email=admin_email)
-        if not admin_user:
-            admin_schema = schemas.UserCreate(
-                full_name="Admin Dashboard",
-                email=admin_email,
-                password="adminpassword123", # Mật khẩu gốc sẽ được băm
-                role="Admin",
-                phone_number="0000000000" 
-            )
-            crud_user.create_user(db_auth, admin_schema)
-            print("   -> Đã tạo tài khoản ADMIN thành công.")
-        else:
-            print("   -> Tài khoản ADMIN đã tồn tại.")
+        with startup.stage("admin_account", on_error=db_auth.rollback):
+            admin_email = "admin@company.vn"
+            admin_user = crud_user.get_user_by_email(db_auth, email=admin_email)
+            if not admin_user:
+                admin_schema = schemas.UserCreate(
+                    full_name="Admin Dashboard",
+                    email=admin_email,
+                    password="adminpassword123", # Mật khẩu gốc sẽ được băm
+                    role="Admin",
+                    phone_number="0000000000" 
+                )
+                crud_user.create_user(db_auth, admin_schema)
+                print("   -> Đã tạo tài khoản ADMIN thành công.")
+            else:
+                print("   -> Tài khoản ADMIN đã tồn tại.")
         # --- KẾT THÚC ---
 
-        # 4. Đồng bộ nhân viên từ HR sang Auth (User Accounts)
-        print("4. Bắt đầu đồng bộ tài khoản nhân viên từ HUMAN_2025 sang Auth DB...")
-        hr_employees_query = db_hr.query(EmployeeHR).options(
-             joinedload(EmployeeHR.department), # Eager load 
-             joinedload(EmployeeHR.position)    # Eager load 
-        )
+        # 4a. Bảng tổng hợp lương theo tháng (PAYROLL)
+        print("4a. Đang kiểm tra bảng tổng hợp payroll_month_rollup...")
+        db_payroll = SessionLocalMySQL()
         try:
-             hr_employees = list(hr_employees_query.all()) 
-        except Exception as e_hr:
-             print(f"!!! LỖI khi lấy danh sách nhân viên từ HR DB: {e_hr}")
-             hr_employees = [] 
-        
-        synced_count = 0
-        for emp in hr_employees:
-            if not emp.Email:
-                continue
-
-            auth_user = crud_user.get_user_by_email(db_auth, email=emp.Email)
-            if not auth_user:
-                role = get_role_from_hr(emp) 
-                user_schema = schemas.UserCreate(
-                    full_name=emp.FullName,
-                    email=emp.Email,
-                    password="password123", 
-                    role=role,
-                    phone_number=emp.PhoneNumber,
-                    employee_id_link=emp.EmployeeID
-                )
+            with startup.stage("payroll_rollup"):
+                payroll_rollup.ensure_table(get_engine("engine_mysql"), db_payroll)
+        finally:
+            db_payroll.close()
+
+        # 4b. Sổ tổng hợp cổ tức (HUMAN_2025)
+        print("4b. Đang kiểm tra sổ tổng hợp cổ tức DividendLedger...")
+        with startup.stage("dividend_ledger", on_error=db_hr.rollback):
+            dividend_ledger.ensure_table(get_engine("engine_sqlserver"), db_hr)
+
+        # 4c. Index cho các truy vấn theo lịch (tháng/năm/ngày kỷ niệm)
+        print("4c. Đang kiểm tra index cho truy vấn theo ngày tháng...")
+        with startup.stage("date_indexes"):
+            errors = []
+            engine_hr, engine_payroll = get_engine("engine_sqlserver"), get_engine("engine_mysql")
+            for engine, table, names in ((engine_hr, EmployeeHR.__table__, date_keys.CALENDAR_INDEXES),
+                                         (engine_payroll, Attendance.__table__, date_keys.CALENDAR_INDEXES),
+                                         (engine_payroll, Salary.__table__, date_keys.CALENDAR_INDEXES),
+                                         (engine_hr, EmployeeHR.__table__, pagination.KEYSET_INDEXES)):
                 try:
-                    crud_user.create_user(db_auth, user_schema)
-                    synced_count += 1
-                except Exception as e_sync:
-                    print(f"   -> LỖI đồng bộ user {emp.Email}: {e_sync}")
+                    date_keys.ensure_indexes(engine, table, names)
+                except Exception as e_idx:
+                    print(f"!!! LỖI khi tạo index cho bảng {table.name}: {e_idx}")
+                    errors.append(f"{table.name}: {e_idx}")
+            if errors:
+                raise RuntimeError("; ".join(errors))
 
-        print(f"   -> Đồng bộ tài khoản hoàn tất. Đã thêm {synced_count} nhân viên mới vào Auth DB.")
+        # 4d. Hàng đợi đồng bộ HR -> Payroll / Auth (SyncOutbox, HUMAN_2025)
+        with startup.stage("sync_outbox"):
+            sync_outbox.ensure_table(get_engine("engine_sqlserver"))
 
-        # 5. [MỚI] Đồng bộ danh sách Cổ đông (Shareholders)
-        print("5. Đang đồng bộ danh sách Cổ đông từ Nhân sự...")
-        try:
-            crud_shareholder.sync_all_employees_to_shareholders(db_auth, db_hr)
-        except Exception as e_sh:
-            print(f"!!! LỖI khi đồng bộ Cổ đông: {e_sh}")
+        # Bảng đã sẵn sàng -> bật scheduler (relay outbox, đối soát danh bạ...) trước các bước đồng bộ dài
+        with startup.stage("scheduler"):
+            start_scheduler()
+
+        # 4e. Đồng bộ tài khoản + cổ đông từ HR sang Auth - tăng dần theo watermark, xem services/hr_sync.py
+        #     (lần đầu chưa có watermark = quét toàn bộ)
+        if startup.sync_enabled():
+            print("4e. Bắt đầu đồng bộ tài khoản nhân viên và Cổ đông từ HUMAN_2025 sang Auth DB...")
+            with startup.stage("hr_sync", on_error=db_auth.rollback):
+                stats = hr_sync.sync_now(db_hr, db_auth)
+                startup.set_detail("hr_sync", stats)
+                accounts = stats["accounts"]
+                if accounts is None:
+                    print(f"   -> Không có nhân viên mới / thay đổi kể từ lần đồng bộ trước ({stats['total_ms']} ms).")
+                else:
+                    print(f"   -> Đồng bộ tài khoản hoàn tất. Đã thêm {accounts['created']} nhân viên mới vào Auth DB "
+                          f"(quét {accounts['scanned']}, bỏ qua {accounts['skipped_conflicts']} do trùng SĐT/liên kết; "
+                          f"Auth {accounts['auth_ms']} ms, HR {accounts['hr_ms']} ms, ghi {accounts['insert_ms']} ms).")
+        else:
+            print("4e. (STARTUP_SYNC_MODE=skip) Bỏ qua đồng bộ tài khoản nhân viên / Cổ đông.")
+            startup.skip("hr_sync", "STARTUP_SYNC_MODE=skip")
+
+        # 4f. Chỉ mục tìm kiếm nhân viên (FTS5 trong Auth DB)
+        print("4f. Đang kiểm tra chỉ mục tìm kiếm nhân viên...")
+        with startup.stage("employee_search", on_error=db_auth.rollback):
+            employee_search.ensure_index(db_auth, db_hr)
+
+        # 4g. Nạp sẵn cache Phòng ban / Chức vụ
+        with startup.stage("reference_cache"):
+            reference_cache.warm(db_hr)
 
     except Exception as e:
         print(f"!!! LỖI TRONG QUÁ TRÌNH KHỞI TẠO CHUNG: {e}")
     finally:
         if db_auth: db_auth.close()
         if db_hr: db_hr.close()
+        # Bước đầu lỗi vẫn phải có scheduler (job cảnh báo, báo cáo...)
+        start_scheduler()
     print("--- KẾT THÚC KHỞI TẠO VÀ ĐỒNG BỘ ---\n")
 
 
-# Khởi tạo scheduler
-scheduler = BackgroundScheduler()
+# Scheduler tạo khi khởi động xong phần bảng (APScheduler nạp lười)
+scheduler = None
+_scheduler_lock = threading.Lock()
+_scheduler_stopped = False  # Đã tắt server -> thread khởi động nền không bật lại scheduler
+
+def start_scheduler():
+    global scheduler
+    with _scheduler_lock:
+        if _scheduler_stopped or (scheduler is not None and scheduler.running):
+            return
+        from apscheduler.schedulers.background import BackgroundScheduler
+        scheduler = BackgroundScheduler()
+        scheduler.add_job(run_alert_jobs, 'interval', days=1, id="daily_check")
+        scheduler.add_job(run_monthly_email_job, 'cron', day=1, hour=9, id="monthly_payroll")
+        dashboard_snapshot.attach_scheduler(scheduler)
+        report_jobs.attach_scheduler(scheduler)
+        payroll_rollup.attach_scheduler(scheduler)
+        employee_directory.attach_scheduler(scheduler)
+        sync_outbox.attach_scheduler(scheduler)
+        hr_sync.attach_scheduler(scheduler)
+        scheduler.start()
+        print("Scheduler started...")
+        # Dựng snapshot Dashboard lần đầu ở nền
+        dashboard_snapshot.request_rebuild()
+
+def stop_scheduler():
+    global _scheduler_stopped
+    with _scheduler_lock:
+        _scheduler_stopped = True
+        if scheduler is not None and scheduler.running:
+            scheduler.shutdown(wait=False)
+            print("Scheduler stopped.")
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    initial_sync_and_setup()
-
-    scheduler.add_job(run_alert_jobs, 'interval', days=1, id="daily_check")
-    scheduler.add_job(run_monthly_email_job, 'cron', day=1, hour=9, id="monthly_payroll")
-    scheduler.start()
-    print("Scheduler started...")
+    # Threadpool cho endpoint đồng bộ; pool fanout báo cáo tính theo số này (services/fanout.py)
+    import anyio.to_thread
+    anyio.to_thread.current_default_thread_limiter().total_tokens = settings.REQUEST_THREADPOOL_SIZE
+    # Đồng bộ + làm nóng chạy nền: server nhận request ngay, tiến độ xem ở /readyz
+    for name, label, critical in STARTUP_STAGES:
+        startup.register(name, label, critical)
+    startup.run(initial_sync_and_setup)
     yield
-    scheduler.shutdown()
-    print("Scheduler stopped.")
+    stop_scheduler()
 
 app = FastAPI(
     title="HRM & Payroll Integrated Dashboard API",
@@ -177,4 +257,30 @@ app.include_router(api_router, prefix="/api/v1")
 def read_root():
     return {"message": "Welcome to the Integrated Dashboard API"}
 
-atexit.register(lambda: scheduler.shutdown(wait=False))
\ No newline at end of file
+@app.get("/healthz", tags=["Health"])
+def healthz():
+    """Liveness: tiến trình còn sống (không chạm CSDL)."""
+    return {"status": "ok"}
+
+@app.get("/readyz", tags=["Health"])
+def readyz():
+    """Readiness: 200 khi các bước khởi động bắt buộc đã xong, 503 nếu chưa; kèm tiến độ từng bước."""
+    body = startup.status()
+    return LeanJSONResponse(body, status_code=200 if body["ready"] else 503)
+
+atexit.register(stop_scheduler)
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="HRM & Payroll Integrated Dashboard API")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="In thời gian import từng package và thời gian khởi tạo CSDL của worker")
+    parser.add_argument("--connect-all", action="store_true",
+                        help="Cùng --profile-startup: đo cả kết nối HR (SQL Server) và Payroll (MySQL)")
+    args = parser.parse_args()
+
+    if not args.profile_startup:
+        parser.print_help()
+    else:
+        from core import startup_profile
+        startup_profile.report("main", connect_all=args.connect_all)
@@ -1,5 +1,5 @@
 # backend/models.py
-from sqlalchemy import Column, Integer, String, Date, DateTime, DECIMAL, ForeignKey, NVARCHAR, Boolean, Float
+from sqlalchemy import Column, Integer, String, Date, DateTime, DECIMAL, ForeignKey, NVARCHAR, Boolean, Float, Text, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from database import BaseSQLServer, BaseMySQL, BaseAuth
@@ -31,6 +31,12 @@ class EmployeeHR(BaseSQLServer):
     PositionID = Column(Integer, ForeignKey('Positions.PositionID'))
     Status = Column(NVARCHAR(50))
 
+    # Index cho truy vấn ngày kỷ niệm (xem core/date_keys.py) và phân trang keyset theo tên
+    __table_args__ = (
+        Index('ix_Employees_HireDate', 'HireDate'),
+        Index('ix_Employees_FullName_EmployeeID', 'FullName', 'EmployeeID'),
+    )
+
     department = relationship("DepartmentHR", back_populates="employees")
     position = relationship("PositionHR", back_populates="employees")
     
@@ -45,6 +51,38 @@ class Dividend(BaseSQLServer):
 
     employee = relationship("EmployeeHR", back_populates="dividends")
 
+class DividendLedger(BaseSQLServer):
+    """
+    Sổ tổng hợp cổ tức theo nhân viên (tổng đã nhận, lần nhận gần nhất, số lần).
+    Ghi cùng transaction với bảng Dividends. Xem services/dividend_ledger.py.
+    """
+    __tablename__ = 'DividendLedger'
+    EmployeeID = Column(Integer, primary_key=True, autoincrement=False)
+    TotalPaid = Column(DECIMAL(16, 2), nullable=False, default=0)
+    PayoutCount = Column(Integer, nullable=False, default=0)
+    LastPaidDate = Column(Date, nullable=True)
+
+class SyncOutbox(BaseSQLServer):
+    """
+    Hàng đợi đồng bộ HR -> Payroll / Auth, ghi CÙNG transaction với thay đổi bên HR.
+    Relay chạy nền đọc và áp dụng (xem services/sync_outbox.py).
+    """
+    __tablename__ = 'SyncOutbox'
+    OutboxID = Column(Integer, primary_key=True)
+    EventType = Column(NVARCHAR(50), nullable=False)
+    AggregateID = Column(Integer, nullable=False)
+    Payload = Column(Text, nullable=True)  # JSON
+    Status = Column(NVARCHAR(20), nullable=False, default="pending")  # pending / done / failed
+    Attempts = Column(Integer, nullable=False, default=0)
+    LastError = Column(NVARCHAR(500), nullable=True)
+    CreatedAt = Column(DateTime, server_default=func.now())
+    NextAttemptAt = Column(DateTime, nullable=True)
+    ProcessedAt = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index('ix_SyncOutbox_Status_OutboxID', 'Status', 'OutboxID'),
+    )
+
 
 # --- Models cho PAYROLL (MySQL) ---
 
@@ -80,6 +118,11 @@ class Salary(BaseMySQL):
     Deductions = Column(DECIMAL(12, 2), default=0.00)
     NetSalary = Column(DECIMAL(12, 2), nullable=False)
 
+    __table_args__ = (
+        Index('ix_salaries_EmployeeID_SalaryMonth', 'EmployeeID', 'SalaryMonth'),
+        Index('ix_salaries_SalaryMonth', 'SalaryMonth'),  # Đối soát rollup theo tháng (services/payroll_rollup.py)
+    )
+
     employee = relationship("EmployeePayroll", back_populates="salaries")
 
 class Attendance(BaseMySQL):
@@ -91,8 +134,29 @@ class Attendance(BaseMySQL):
     LeaveDays = Column(Integer, default=0)
     AttendanceMonth = Column(Date, nullable=False)
 
+    # Index cho truy vấn theo khoảng tháng/năm (xem core/date_keys.py)
+    __table_args__ = (
+        Index('ix_attendance_EmployeeID_AttendanceMonth', 'EmployeeID', 'AttendanceMonth'),
+        Index('ix_attendance_AttendanceMonth', 'AttendanceMonth'),
+    )
+
     employee = relationship("EmployeePayroll", back_populates="attendances")
 
+class PayrollMonthRollup(BaseMySQL):
+    """
+    Bảng tổng hợp lương theo Tháng x Phòng ban (duy trì tăng dần khi ghi lương).
+    DepartmentID = 0: nhân viên chưa gán phòng ban. Xem services/payroll_rollup.py.
+    """
+    __tablename__ = 'payroll_month_rollup'
+    SalaryMonth = Column(Date, primary_key=True)
+    DepartmentID = Column(Integer, primary_key=True, autoincrement=False)
+    EmployeeCount = Column(Integer, nullable=False, default=0)
+    TotalBase = Column(DECIMAL(16, 2), nullable=False, default=0)
+    TotalBonus = Column(DECIMAL(16, 2), nullable=False, default=0)
+    TotalDeductions = Column(DECIMAL(16, 2), nullable=False, default=0)
+    TotalNet = Column(DECIMAL(16, 2), nullable=False, default=0)
+    AvgNet = Column(DECIMAL(14, 2), nullable=False, default=0)
+
 # (Optional) Model LeaveRequest nếu muốn lưu ở MySQL
 class LeaveRequestPayroll(BaseMySQL):
     __tablename__ = 'leave_requests'
@@ -138,6 +202,9 @@ class Shareholder(BaseAuth):
     employee_id = Column(Integer, unique=True, index=True, nullable=False)
     shares = Column(Integer, default=0, nullable=False)
     status = Column(String(50), default="Active")
+    # Trạng thái suy ra từ HR ở lần đồng bộ gần nhất (crud_shareholder.sync_all_employees_to_shareholders):
+    # chỉ khi giá trị này đổi mới ghi đè `status`, nên trạng thái đặt tay được giữ nguyên
+    hr_status = Column(String(50), nullable=True)
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
 class LeaveRequest(BaseAuth):
@@ -165,4 +232,61 @@ class SystemConfig(BaseAuth):
     __tablename__ = 'system_configs'
     key = Column(String(50), primary_key=True)
     value = Column(String(255))
-    description = Column(String(255), nullable=True)
\ No newline at end of file
+    description = Column(String(255), nullable=True)
+
+class DashboardSnapshot(BaseAuth):
+    """Payload Dashboard tổng hợp dựng sẵn (xem services/dashboard_snapshot.py)."""
+    __tablename__ = 'dashboard_snapshots'
+    key = Column(String(50), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    built_at = Column(DateTime(timezone=True), nullable=True)
+    payload = Column(Text, nullable=False)
+
+class ReportJob(BaseAuth):
+    """Job báo cáo chạy nền (xuất dữ liệu, phân tích...). Xem services/report_jobs.py."""
+    __tablename__ = 'report_jobs'
+    id = Column(String(36), primary_key=True)
+    kind = Column(String(50), nullable=False)
+    params = Column(Text, nullable=True)
+    status = Column(String(20), nullable=False, default="queued", index=True)
+    created_by = Column(String(100), nullable=False, index=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+    expires_at = Column(DateTime(timezone=True), nullable=True, index=True)
+    result_path = Column(String(255), nullable=True)
+    result_media_type = Column(String(100), nullable=True)
+    result_filename = Column(String(255), nullable=True)
+    error = Column(String(500), nullable=True)
+    worker_id = Column(String(100), nullable=True)  # Tiến trình đang giữ job (services/report_jobs.WORKER_ID)
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True)  # Lần gia hạn lease gần nhất
+
+
+class EmployeeDirectory(BaseAuth):
+    """
+    Bản chiếu phi chuẩn hóa của nhân viên (HR + tên phòng ban/chức vụ + tài khoản Auth)
+    để danh sách / tìm kiếm đọc từ 1 bảng cục bộ. Xem services/employee_directory.py.
+    """
+    __tablename__ = 'employee_directory'
+    employee_id = Column(Integer, primary_key=True)
+    full_name = Column(String(100), nullable=False)
+    email = Column(String(100), nullable=True, index=True)
+    date_of_birth = Column(Date, nullable=True)
+    hire_date = Column(Date, nullable=True)
+    gender = Column(String(10), nullable=True)
+    phone_number = Column(String(15), nullable=True)
+    department_id = Column(Integer, nullable=True, index=True)
+    department_name = Column(String(100), nullable=True)
+    position_id = Column(Integer, nullable=True, index=True)
+    position_name = Column(String(100), nullable=True)
+    status = Column(String(50), nullable=True, index=True)
+    role = Column(String(50), nullable=True)
+    auth_user_id = Column(Integer, nullable=True)
+    search_key = Column(String(500), nullable=True)  # họ tên, email, phòng ban, chức vụ đã chuẩn hóa
+    synced_at = Column(DateTime(timezone=True), nullable=True)
+
+    # Cùng thứ tự với các kiểu sắp xếp keyset của danh sách nhân viên
+    __table_args__ = (
+        Index('ix_employee_directory_full_name', 'full_name', 'employee_id'),
+        Index('ix_employee_directory_hire_date', 'hire_date', 'employee_id'),
+    )
@@ -101,6 +101,54 @@ class Employee(EmployeeBase):
     auth_user_id: Optional[int] = None
     model_config = ConfigDict(from_attributes=True)
 
+class EmployeeImportError(BaseModel):
+    row: int # Số dòng trong file (dòng 1 là tiêu đề CSV)
+    email: Optional[str] = None
+    errors: List[str]
+
+class EmployeeImportResult(BaseModel):
+    total_rows: int
+    valid_rows: int
+    created: int
+    failed: int
+    dry_run: bool
+    errors: List[EmployeeImportError] = []
+    duration_ms: int
+
+class EmployeeBulkTransfer(BaseModel):
+    employee_ids: List[int]
+    DepartmentID: Optional[int] = None # Bỏ trống = giữ nguyên
+    PositionID: Optional[int] = None
+
+class EmployeeBulkTransferResult(BaseModel):
+    requested: int
+    updated: int
+    not_found: List[int] = []
+    roles_changed: int
+    rollup_months: int # Số tháng lương được dựng lại trong payroll_month_rollup
+    duration_ms: int
+
+class EmployeeBulkDelete(BaseModel):
+    employee_ids: List[int]
+
+class EmployeeDeleteBlocked(BaseModel):
+    employee_id: int
+    reasons: List[str]
+
+class EmployeeBulkDeleteResult(BaseModel):
+    requested: int
+    deleted: List[int] = []
+    blocked: List[EmployeeDeleteBlocked] = []
+    not_found: List[int] = []
+    duration_ms: int
+
+class EmployeePage(BaseModel):
+    items: List[Employee]
+    next_cursor: Optional[str] = None # Gửi lại qua tham số `after` để lấy trang kế tiếp
+    has_more: bool
+    sort: str
+    total_estimate: Optional[int] = None
+
 # ==========================================
 # 3. PAYROLL MANAGEMENT (MYSQL)
 # ==========================================
@@ -129,6 +177,10 @@ class Attendance(BaseModel):
 class EmployeeFullProfile(Employee):
     salaries: List[Salary] = []
     attendances: List[Attendance] = []
+    # Phân trang (khi gọi kèm salary_limit / attendance_limit): gửi lại qua salary_cursor / attendance_cursor
+    salaries_next_cursor: Optional[str] = None
+    attendances_next_cursor: Optional[str] = None
+    degraded_sources: List[str] = [] # Các phần không tải được (lỗi/quá hạn)
 
 # ==========================================
 # 4. SHAREHOLDER & DIVIDEND MANAGEMENT
@@ -225,6 +277,15 @@ class SystemConfigUpdate(BaseModel):
 class SystemConfig(SystemConfigBase):
     model_config = ConfigDict(from_attributes=True)
 
+class SyncOutboxStatus(BaseModel):
+    mode: str # "outbox" hoặc "sync" (SYNC_MODE)
+    pending: int
+    retrying: int = 0 # Đang chờ thử lại sau lỗi
+    failed: int
+    done: int
+    oldest_pending_at: Optional[datetime] = None
+    last_error: Optional[str] = None
+
 # ==========================================
 # 7. NOTIFICATIONS (THÔNG BÁO)
 # ==========================================
@@ -247,4 +308,24 @@ class NotificationCreate(BaseModel):
 class Notification(NotificationBase):
     id: int
     created_at: datetime
+    model_config = ConfigDict(from_attributes=True)
+
+# ==========================================
+# 8. REPORT JOBS (BÁO CÁO CHẠY NỀN)
+# ==========================================
+class ReportJobCreate(BaseModel):
+    kind: str # 'export_salaries', 'export_attendance', 'payroll_analytics', 'dividend_preview'
+    params: dict = {}
+
+class ReportJob(BaseModel):
+    id: str
+    kind: str
+    status: str # 'queued', 'running', 'succeeded', 'failed'
+    created_by: str
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    expires_at: Optional[datetime] = None
+    result_filename: Optional[str] = None
+    error: Optional[str] = None
     model_config = ConfigDict(from_attributes=True)
\ No newline at end of file
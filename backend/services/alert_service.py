@@ -1,13 +1,15 @@
 # backend/services/alert_service.py
 from sqlalchemy.orm import Session
-from sqlalchemy import extract, func, or_
+from sqlalchemy import func, or_
 from datetime import date
 import logging
 
 # Import Models
 from models import EmployeeHR, Attendance, Salary
 from database import SessionLocalAuth 
+from core import date_keys
 from crud import crud_notification
+from services import payroll_rollup
 import schemas
 
 logger = logging.getLogger(__name__)
@@ -31,8 +33,7 @@ def check_work_anniversaries(db_hr: Session):
     today = date.today()
     milestones = [1, 3, 5, 10, 15, 20, 25, 30]
     employees = db_hr.query(EmployeeHR).filter(
-        extract('month', EmployeeHR.HireDate) == today.month,
-        extract('day', EmployeeHR.HireDate) == today.day,
+        date_keys.on_anniversary(EmployeeHR.HireDate, today, milestones),
         or_(EmployeeHR.Status == 'Đang làm việc', EmployeeHR.Status == 'Active')
     ).all()
     for emp in employees:
@@ -54,7 +55,7 @@ def check_excessive_leave(db_payroll: Session):
             Attendance.EmployeeID, 
             func.sum(Attendance.LeaveDays).label("total_leave")
         ).filter(
-            extract('year', Attendance.AttendanceMonth) == current_year
+            date_keys.in_year(Attendance.AttendanceMonth, current_year)
         ).group_by(
             Attendance.EmployeeID
         ).all()
@@ -79,15 +80,15 @@ def check_excessive_leave(db_payroll: Session):
     except Exception as e:
         logger.error(f"Error checking excessive leave in MySQL: {e}")
 
-# 3. Chênh lệch lương (Giữ nguyên)
+# 3. Chênh lệch lương (Đọc từ bảng tổng hợp payroll_month_rollup)
 def check_payroll_discrepancies(db_payroll: Session):
-    months = db_payroll.query(Salary.SalaryMonth).distinct().order_by(Salary.SalaryMonth.desc()).limit(2).all()
+    months = payroll_rollup.latest_months(db_payroll, 2)
     if len(months) < 2: return
 
-    curr_month, prev_month = months[0][0], months[1][0]
-    
-    curr_total = db_payroll.query(func.sum(Salary.NetSalary)).filter(Salary.SalaryMonth == curr_month).scalar() or 0
-    prev_total = db_payroll.query(func.sum(Salary.NetSalary)).filter(Salary.SalaryMonth == prev_month).scalar() or 0
+    curr_month, prev_month = months[0], months[1]
+
+    curr_total = payroll_rollup.month_totals(db_payroll, curr_month)[0] or 0
+    prev_total = payroll_rollup.month_totals(db_payroll, prev_month)[0] or 0
 
     if prev_total > 0:
         diff_percent = ((curr_total - prev_total) / prev_total) * 100
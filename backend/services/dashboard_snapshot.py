@@ -0,0 +1,271 @@
+# backend/services/dashboard_snapshot.py
+"""
+Snapshot Dashboard tổng hợp (Admin/Manager).
+
+Payload của /reports/dashboard-summary được dựng nền trên APScheduler và lưu
+vào bảng `dashboard_snapshots` (Auth DB) kèm version + thời điểm dựng.
+Endpoint chỉ còn đọc snapshot thay vì chạy ~9 truy vấn tổng hợp trên 3 CSDL.
+
+Các hàm CRUD ghi dữ liệu liên quan gọi `request_rebuild()` để dựng lại.
+"""
+import json
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import func
+
+from core.config import settings
+from database import SessionLocalAuth
+import models
+from services import fanout, payroll_rollup, dividend_ledger, reference_cache
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_KEY = "dashboard_summary"
+REBUILD_JOB_ID = "dashboard_snapshot_rebuild"
+REFRESH_JOB_ID = "dashboard_snapshot_refresh"
+
+_scheduler = None
+_build_lock = threading.Lock()
+_state_lock = threading.Lock()
+_dirty = False
+_memory = None        # {"version", "built_at", "payload"}
+_memory_loaded_at = 0.0
+
+
+def empty_dashboard_summary() -> dict:
+    """Payload mặc định khi chưa dựng được dữ liệu (giữ nguyên cấu trúc cũ)."""
+    return {
+        "hr_metrics": {"total_employees": 0, "shareholder_count": 0, "department_distribution": [], "status_distribution": []},
+        "payroll_metrics": {"current_month": None, "total_salary_budget": 0, "total_base_salary": 0, "total_bonus": 0, "salary_by_dept": [], "salary_trend": []},
+        "financial_metrics": {"total_dividends": 0}
+    }
+
+
+def _hr_section(db_hr) -> dict:
+    total_employees = db_hr.query(func.count(models.EmployeeHR.EmployeeID)).scalar() or 0
+
+    # Nhóm theo DepartmentID, tên tra từ cache tham chiếu (không JOIN bảng Departments)
+    dept_names = reference_cache.department_names(db_hr)
+    dept_counts = {}
+    for dept_id, count in db_hr.query(
+        models.EmployeeHR.DepartmentID, func.count(models.EmployeeHR.EmployeeID)
+    ).group_by(models.EmployeeHR.DepartmentID).all():
+        if dept_id in dept_names:
+            name = dept_names[dept_id]
+            dept_counts[name] = dept_counts.get(name, 0) + count
+
+    status_dist = db_hr.query(
+        models.EmployeeHR.Status, func.count(models.EmployeeHR.EmployeeID)
+    ).group_by(models.EmployeeHR.Status).all()
+
+    total_dividends = dividend_ledger.total_paid(db_hr)
+
+    return {
+        "total_employees": total_employees,
+        "department_distribution": [{"name": name, "value": count} for name, count in dept_counts.items()],
+        "status_distribution": [{"name": s[0] or "Unknown", "value": s[1]} for s in status_dist],
+        "total_dividends": float(total_dividends)
+    }
+
+
+def _payroll_section(db_payroll) -> dict:
+    """Đọc từ bảng tổng hợp payroll_month_rollup (không quét bảng salaries)."""
+    months = payroll_rollup.latest_months(db_payroll, 1)
+    latest_salary_month = months[0] if months else None
+    total_salary = 0
+    total_base = 0
+    total_bonus = 0
+    salary_by_dept = []
+    salary_trend_data = []
+
+    if latest_salary_month:
+        totals = payroll_rollup.month_totals(db_payroll, latest_salary_month)
+        total_salary = totals[0] or 0
+        total_base = totals[1] or 0
+        total_bonus = totals[2] or 0
+
+        dist_query = payroll_rollup.department_averages(db_payroll, latest_salary_month)
+        salary_by_dept = [{"name": a[0], "value": int(a[1]) if a[1] else 0} for a in dist_query]
+
+        trend_query = payroll_rollup.monthly_net_trend(db_payroll, 6)
+        salary_trend_data = [{"name": str(t[0]), "value": float(t[1])} for t in reversed(trend_query)]
+
+    return {
+        "current_month": str(latest_salary_month) if latest_salary_month else None,
+        "total_salary_budget": float(total_salary),
+        "total_base_salary": float(total_base),
+        "total_bonus": float(total_bonus),
+        "salary_by_dept": salary_by_dept,
+        "salary_trend": salary_trend_data
+    }
+
+
+def _auth_section(db_auth) -> dict:
+    count = db_auth.query(models.Shareholder).filter(models.Shareholder.status == "Active").count()
+    return {"shareholder_count": count}
+
+
+def _previous_sections(previous) -> dict:
+    """Tách payload snapshot trước thành từng phần để dùng làm giá trị dự phòng."""
+    empty = empty_dashboard_summary()
+    payload = (previous or {}).get("payload") or empty
+    hr = payload.get("hr_metrics", empty["hr_metrics"])
+    return {
+        "hr": {
+            "total_employees": hr.get("total_employees", 0),
+            "department_distribution": hr.get("department_distribution", []),
+            "status_distribution": hr.get("status_distribution", []),
+            "total_dividends": payload.get("financial_metrics", {}).get("total_dividends", 0)
+        },
+        "payroll": payload.get("payroll_metrics", empty["payroll_metrics"]),
+        "auth": {"shareholder_count": hr.get("shareholder_count", 0)},
+    }
+
+
+def build_dashboard_summary(db_hr=None, db_payroll=None, db_auth=None, previous=None) -> dict:
+    """
+    Chạy các nhóm truy vấn tổng hợp (song song theo nguồn, xem services/fanout.py)
+    và ghép thành payload Dashboard.
+    Nguồn nào lỗi/quá hạn sẽ giữ số liệu của snapshot trước (nếu có) và được
+    liệt kê trong `degraded_sources`. Ném lỗi nếu tất cả các nguồn đều hỏng.
+    """
+    fallback = _previous_sections(previous)
+    sessions = {k: v for k, v in (("hr", db_hr), ("payroll", db_payroll), ("auth", db_auth)) if v is not None}
+    results, failed = fanout.run_groups({
+        "hr": ("hr", _hr_section, fallback["hr"]),
+        "payroll": ("payroll", _payroll_section, fallback["payroll"]),
+        "auth": ("auth", _auth_section, fallback["auth"]),
+    }, sessions=sessions)
+    if len(failed) == len(results):
+        raise RuntimeError("Không truy vấn được nguồn dữ liệu nào")
+
+    hr, payroll, auth = results["hr"], results["payroll"], results["auth"]
+    return {
+        "hr_metrics": {
+            "total_employees": hr["total_employees"],
+            "shareholder_count": auth["shareholder_count"],
+            "department_distribution": hr["department_distribution"],
+            "status_distribution": hr["status_distribution"]
+        },
+        "payroll_metrics": payroll,
+        "financial_metrics": {
+            "total_dividends": hr["total_dividends"]
+        },
+        "degraded_sources": failed
+    }
+
+
+def _remember(snapshot: dict):
+    global _memory, _memory_loaded_at
+    with _state_lock:
+        _memory = snapshot
+        _memory_loaded_at = time.monotonic()
+
+
+def _save_snapshot(db_auth, payload: dict) -> dict:
+    row = db_auth.get(models.DashboardSnapshot, SNAPSHOT_KEY)
+    if row is None:
+        row = models.DashboardSnapshot(key=SNAPSHOT_KEY, version=0)
+        db_auth.add(row)
+    row.version = (row.version or 0) + 1
+    row.built_at = datetime.now()
+    row.payload = json.dumps(payload, default=str, ensure_ascii=False)
+    db_auth.commit()
+    return {"version": row.version, "built_at": row.built_at, "payload": payload}
+
+
+def rebuild_snapshot(db_hr=None, db_payroll=None, db_auth=None) -> dict:
+    """
+    Dựng lại snapshot và lưu vào Auth DB.
+    Nếu không truyền session (chạy từ scheduler) thì tự mở session Auth;
+    session HR/Payroll do services/fanout.py mở theo từng nhóm truy vấn.
+    Trả về snapshot mới, hoặc snapshot hiện có nếu dựng lỗi.
+    """
+    global _dirty
+    own_sessions = db_auth is None
+    if own_sessions:
+        db_auth = SessionLocalAuth()
+
+    try:
+        with _build_lock:
+            snapshot = None
+            # Lặp lại nếu có yêu cầu dựng mới phát sinh trong lúc đang dựng
+            while True:
+                with _state_lock:
+                    _dirty = False
+                started = time.perf_counter()
+                try:
+                    previous = _memory or get_snapshot(db_auth)
+                    payload = build_dashboard_summary(db_hr, db_payroll, db_auth, previous=previous)
+                    snapshot = _save_snapshot(db_auth, payload)
+                    _remember(snapshot)
+                    logger.info(
+                        f"Dashboard snapshot v{snapshot['version']} built in {time.perf_counter() - started:.2f}s"
+                    )
+                except Exception as e:
+                    db_auth.rollback()
+                    logger.error(f"Dashboard snapshot build error: {e}")
+                    return snapshot or get_snapshot(db_auth)
+                with _state_lock:
+                    if not _dirty:
+                        return snapshot
+    finally:
+        if own_sessions:
+            SessionLocalAuth.remove()
+
+
+def get_snapshot(db_auth):
+    """
+    Đọc snapshot hiện tại: ưu tiên bản trong bộ nhớ (TTL ngắn), sau đó đọc
+    1 dòng theo khóa chính từ Auth DB (để các worker khác thấy bản mới).
+    Trả về None nếu chưa từng dựng.
+    """
+    with _state_lock:
+        if _memory and time.monotonic() - _memory_loaded_at < settings.DASHBOARD_SNAPSHOT_MEMORY_TTL_SECONDS:
+            return _memory
+
+    try:
+        row = db_auth.get(models.DashboardSnapshot, SNAPSHOT_KEY)
+    except Exception as e:
+        logger.error(f"Dashboard snapshot read error: {e}")
+        return _memory
+    if row is None:
+        return None
+
+    snapshot = {"version": row.version, "built_at": row.built_at, "payload": json.loads(row.payload)}
+    _remember(snapshot)
+    return snapshot
+
+
+def attach_scheduler(scheduler):
+    """Gắn APScheduler của main.py và đăng ký job làm mới định kỳ."""
+    global _scheduler
+    _scheduler = scheduler
+    scheduler.add_job(
+        rebuild_snapshot, 'interval',
+        minutes=settings.DASHBOARD_SNAPSHOT_REFRESH_MINUTES,
+        id=REFRESH_JOB_ID, replace_existing=True
+    )
+
+
+def request_rebuild():
+    """
+    Đánh dấu snapshot đã cũ và lên lịch dựng lại ngay trên scheduler.
+    Nhiều lần ghi liên tiếp được gộp thành 1 lần dựng (cùng job id).
+    """
+    global _dirty
+    with _state_lock:
+        _dirty = True
+    if _scheduler is None or not _scheduler.running:
+        return
+    try:
+        _scheduler.add_job(
+            rebuild_snapshot, 'date',
+            run_date=datetime.now() + timedelta(seconds=1),
+            id=REBUILD_JOB_ID, replace_existing=True
+        )
+    except Exception as e:
+        logger.error(f"Cannot schedule dashboard snapshot rebuild: {e}")
@@ -0,0 +1,119 @@
+# backend/services/dividend_ledger.py
+"""
+Sổ tổng hợp cổ tức `DividendLedger` (HUMAN_2025 - SQL Server).
+
+Mỗi nhân viên 1 dòng: tổng cổ tức đã nhận, ngày nhận gần nhất, số lần nhận.
+Được cập nhật trong CÙNG transaction với các bản ghi `Dividends` khi xác nhận
+chi trả, nên báo cáo cổ tức và danh sách cổ đông đọc số đã tổng hợp sẵn thay
+vì SUM toàn bộ bảng Dividends mỗi lần tải trang.
+
+Dựng lại:  python -m services.dividend_ledger --rebuild
+"""
+import argparse
+from collections import defaultdict
+from decimal import Decimal
+
+from sqlalchemy import func, select, insert, delete
+from sqlalchemy.orm import Session
+
+from core.batching import chunked
+from models import DividendLedger, Dividend, EmployeeHR
+
+_ZERO = Decimal(0)
+
+
+def record_payouts(db_hr: Session, payouts):
+    """
+    Cộng dồn các khoản chi trả [(employee_id, amount, paid_date)] vào sổ tổng hợp.
+    Không commit - người gọi commit cùng với các bản ghi Dividends.
+    """
+    grouped = defaultdict(lambda: [_ZERO, 0, None])
+    for employee_id, amount, paid_date in payouts:
+        g = grouped[employee_id]
+        g[0] += Decimal(amount or 0)
+        g[1] += 1
+        g[2] = paid_date if g[2] is None or paid_date > g[2] else g[2]
+
+    for ids in chunked(grouped.keys()):
+        existing = {
+            row.EmployeeID: row for row in db_hr.query(DividendLedger)
+            .filter(DividendLedger.EmployeeID.in_(ids)).with_for_update().all()
+        }
+        for employee_id in ids:
+            total, count, last_date = grouped[employee_id]
+            row = existing.get(employee_id)
+            if row is None:
+                db_hr.add(DividendLedger(
+                    EmployeeID=employee_id, TotalPaid=total, PayoutCount=count, LastPaidDate=last_date
+                ))
+                continue
+            row.TotalPaid = (row.TotalPaid or _ZERO) + total
+            row.PayoutCount = (row.PayoutCount or 0) + count
+            if row.LastPaidDate is None or last_date > row.LastPaidDate:
+                row.LastPaidDate = last_date
+
+
+def rebuild(db_hr: Session) -> int:
+    """Dựng lại toàn bộ sổ tổng hợp từ bảng Dividends."""
+    source = select(
+        Dividend.EmployeeID,
+        func.sum(Dividend.DividendAmount),
+        func.count(Dividend.DividendID),
+        func.max(Dividend.DividendDate)
+    ).where(Dividend.EmployeeID.isnot(None)).group_by(Dividend.EmployeeID)
+    try:
+        db_hr.execute(delete(DividendLedger))
+        result = db_hr.execute(insert(DividendLedger).from_select(
+            ["EmployeeID", "TotalPaid", "PayoutCount", "LastPaidDate"], source
+        ))
+        db_hr.commit()
+    except Exception:
+        db_hr.rollback()
+        raise
+    return result.rowcount
+
+
+def ensure_table(engine, db_hr: Session):
+    """Tạo bảng nếu chưa có; dựng dữ liệu lần đầu nếu bảng trống mà Dividends có dữ liệu."""
+    DividendLedger.__table__.create(bind=engine, checkfirst=True)
+    if db_hr.query(DividendLedger.EmployeeID).first() is None \
+            and db_hr.query(Dividend.DividendID).first() is not None:
+        rebuild(db_hr)
+
+
+# --- Các hàm đọc ---
+
+def total_paid(db_hr: Session) -> Decimal:
+    return db_hr.query(func.sum(DividendLedger.TotalPaid)).scalar() or _ZERO
+
+
+def top_recipients(db_hr: Session, limit: int = 5):
+    """[(EmployeeID, FullName, TotalPaid)] - nhóm theo EmployeeID (tên có thể trùng)."""
+    return db_hr.query(
+        DividendLedger.EmployeeID, EmployeeHR.FullName, DividendLedger.TotalPaid
+    ).outerjoin(EmployeeHR, EmployeeHR.EmployeeID == DividendLedger.EmployeeID)\
+     .order_by(DividendLedger.TotalPaid.desc())\
+     .limit(limit).all()
+
+
+def paid_by_employee(db_hr: Session) -> dict:
+    """{EmployeeID: TotalPaid} cho toàn bộ sổ (1 dòng/nhân viên, không dùng IN list)."""
+    return dict(db_hr.query(DividendLedger.EmployeeID, DividendLedger.TotalPaid).all())
+
+
+if __name__ == "__main__":
+    from database import SessionLocalSQLServer, engine_sqlserver
+
+    parser = argparse.ArgumentParser(description="Quản lý bảng DividendLedger")
+    parser.add_argument("--rebuild", action="store_true", help="Dựng lại sổ tổng hợp từ bảng Dividends")
+    args = parser.parse_args()
+
+    if not args.rebuild:
+        parser.print_help()
+    else:
+        db = SessionLocalSQLServer()
+        try:
+            DividendLedger.__table__.create(bind=engine_sqlserver, checkfirst=True)
+            print(f"✅ Đã dựng lại DividendLedger: {rebuild(db)} nhân viên.")
+        finally:
+            db.close()
@@ -0,0 +1,337 @@
+# backend/services/employee_directory.py
+"""
+Danh bạ nhân viên phi chuẩn hóa (bảng `employee_directory` trong Auth DB).
+
+Mỗi nhân viên 1 dòng: thông tin HR + tên phòng ban/chức vụ + role / auth_user_id
+của tài khoản + `search_key` đã chuẩn hóa (xem employee_search.normalize). Danh
+sách, tìm kiếm nhân viên, cổ đông và nghỉ phép đọc từ bảng này (1 truy vấn cục bộ
+có index) thay vì JOIN 3 bảng SQL Server rồi tra thêm `users` trong SQLite.
+
+Cập nhật:
+- Ngay trong các hàm ghi đồng bộ (crud_employee, crud_hr, crud_user, nhập hàng loạt).
+- Đối soát định kỳ `reconcile()` trên scheduler (EMPLOYEE_DIRECTORY_RECONCILE_MINUTES):
+  so từng lô với HR, chỉ ghi các dòng thay đổi và xóa dòng không còn bên HR.
+Khi bảng chưa được dựng lần nào, `is_ready()` trả về False -> người gọi đọc HR như cũ.
+
+Dựng lại thủ công: python -m services.employee_directory --reconcile
+"""
+import argparse
+import logging
+import time
+from datetime import datetime, timezone
+
+from sqlalchemy import select, delete, update, or_, true
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+import schemas
+from core.batching import chunked
+from core.config import settings
+from database import SessionLocalSQLServer, SessionLocalAuth
+from models import EmployeeHR, DepartmentHR, PositionHR, EmployeeDirectory, User as AuthUser
+from services import employee_search
+
+logger = logging.getLogger(__name__)
+
+RECONCILE_JOB_ID = "employee_directory_reconcile"
+RECONCILE_CHUNK_SIZE = 2000
+
+# Các cột so sánh khi đối soát (không gồm synced_at)
+_VALUE_COLUMNS = [
+    "full_name", "email", "date_of_birth", "hire_date", "gender", "phone_number",
+    "department_id", "department_name", "position_id", "position_name",
+    "status", "role", "auth_user_id", "search_key",
+]
+
+# Cùng tên kiểu sắp xếp với crud_employee.EMPLOYEE_SORTS -> cursor dùng chung được
+DIRECTORY_SORTS = {
+    "id": (EmployeeDirectory.employee_id, False),
+    "-id": (EmployeeDirectory.employee_id, True),
+    "name": (EmployeeDirectory.full_name, False),
+    "-name": (EmployeeDirectory.full_name, True),
+    "hire_date": (EmployeeDirectory.hire_date, False),
+    "-hire_date": (EmployeeDirectory.hire_date, True),
+}
+
+_ready = None  # None = chưa kiểm tra
+
+
+def _value_columns():
+    return [getattr(EmployeeDirectory, c) for c in _VALUE_COLUMNS]
+
+
+def _hr_select(where):
+    return select(
+        EmployeeHR.EmployeeID, EmployeeHR.FullName, EmployeeHR.Email, EmployeeHR.DateOfBirth,
+        EmployeeHR.HireDate, EmployeeHR.Gender, EmployeeHR.PhoneNumber, EmployeeHR.Status,
+        EmployeeHR.DepartmentID, DepartmentHR.DepartmentName,
+        EmployeeHR.PositionID, PositionHR.PositionName
+    ).outerjoin(DepartmentHR, EmployeeHR.DepartmentID == DepartmentHR.DepartmentID)\
+     .outerjoin(PositionHR, EmployeeHR.PositionID == PositionHR.PositionID)\
+     .where(where)
+
+
+def _accounts_by_email(db_auth: Session, emails) -> dict:
+    """Tài khoản Auth ghép theo email (giống cách danh sách nhân viên gắn role trước đây)."""
+    accounts = {}
+    for ids in chunked([e for e in emails if e]):
+        accounts.update({
+            u.email: (u.id, u.role)
+            for u in db_auth.query(AuthUser.id, AuthUser.email, AuthUser.role).filter(AuthUser.email.in_(ids))
+        })
+    return accounts
+
+
+def _project(rows, accounts: dict) -> list:
+    projected = []
+    for row in rows:
+        auth_user_id, role = accounts.get(row.Email, (None, None))
+        projected.append({
+            "employee_id": row.EmployeeID,
+            "full_name": row.FullName,
+            "email": row.Email,
+            "date_of_birth": row.DateOfBirth,
+            "hire_date": row.HireDate,
+            "gender": row.Gender,
+            "phone_number": row.PhoneNumber,
+            "department_id": row.DepartmentID,
+            "department_name": row.DepartmentName,
+            "position_id": row.PositionID,
+            "position_name": row.PositionName,
+            "status": row.Status,
+            "role": role,
+            "auth_user_id": auth_user_id,
+            "search_key": " ".join(filter(None, (
+                employee_search.normalize(v)
+                for v in (row.FullName, row.Email, row.DepartmentName, row.PositionName)
+            ))),
+        })
+    return projected
+
+
+def _upsert(db_auth: Session, rows: list, now: datetime):
+    if not rows:
+        return
+    stmt = sqlite_insert(EmployeeDirectory)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[EmployeeDirectory.employee_id],
+        set_={c: stmt.excluded[c] for c in _VALUE_COLUMNS + ["synced_at"]}
+    )
+    db_auth.execute(stmt, [{**r, "synced_at": now} for r in rows])
+
+
+def refresh(db_hr: Session, where, db_auth: Session = None) -> int:
+    """Ghi lại danh bạ cho các nhân viên thỏa `where` (biểu thức trên EmployeeHR). Không ném lỗi."""
+    own_session = db_auth is None
+    db_auth = db_auth or SessionLocalAuth.session_factory()
+    count = 0
+    try:
+        now = datetime.now(timezone.utc)
+        result = db_hr.execute(_hr_select(where).execution_options(yield_per=RECONCILE_CHUNK_SIZE))
+        for partition in result.partitions():
+            accounts = _accounts_by_email(db_auth, [r.Email for r in partition])
+            _upsert(db_auth, _project(partition, accounts), now)
+            count += len(partition)
+        db_auth.commit()
+    except Exception as e:
+        db_auth.rollback()
+        logger.error(f"Lỗi cập nhật danh bạ nhân viên: {e}")
+    finally:
+        if own_session:
+            db_auth.close()
+    return count
+
+
+def refresh_employee(db_hr: Session, employee_id: int, db_auth: Session = None):
+    return refresh(db_hr, EmployeeHR.EmployeeID == employee_id, db_auth)
+
+
+def refresh_many(db_hr: Session, employee_ids, db_auth: Session = None) -> int:
+    return sum(refresh(db_hr, EmployeeHR.EmployeeID.in_(ids), db_auth) for ids in chunked(list(employee_ids)))
+
+
+def remove(employee_id: int, db_auth: Session):
+    remove_many([employee_id], db_auth)
+
+
+def remove_many(employee_ids, db_auth: Session):
+    try:
+        for ids in chunked(list(employee_ids)):
+            db_auth.execute(delete(EmployeeDirectory).where(EmployeeDirectory.employee_id.in_(ids)))
+        db_auth.commit()
+    except Exception as e:
+        db_auth.rollback()
+        logger.error(f"Lỗi xóa nhân viên {list(employee_ids)[:10]} khỏi danh bạ: {e}")
+
+
+def sync_account(db_auth: Session, user):
+    """Cập nhật role / auth_user_id sau khi tài khoản được tạo hoặc đổi quyền."""
+    try:
+        db_auth.execute(
+            update(EmployeeDirectory)
+            .where(or_(EmployeeDirectory.email == user.email,
+                       EmployeeDirectory.employee_id == user.employee_id_link))
+            .values(role=user.role, auth_user_id=user.id)
+        )
+        db_auth.commit()
+    except Exception as e:
+        db_auth.rollback()
+        logger.error(f"Lỗi cập nhật tài khoản {user.email} trong danh bạ: {e}")
+
+
+def reconcile(db_hr: Session = None, db_auth: Session = None) -> dict:
+    """
+    Đối soát toàn bộ danh bạ với HR: thêm/cập nhật dòng khác biệt, xóa nhân viên
+    không còn tồn tại. Trả về số dòng thêm / sửa / xóa và thời gian chạy.
+    """
+    global _ready
+    own_hr, own_auth = db_hr is None, db_auth is None
+    db_hr = db_hr or SessionLocalSQLServer.session_factory()
+    db_auth = db_auth or SessionLocalAuth.session_factory()
+    started = time.perf_counter()
+    stats = {"inserted": 0, "updated": 0, "deleted": 0, "unchanged": 0}
+    try:
+        now = datetime.now(timezone.utc)
+        seen = set()
+        result = db_hr.execute(_hr_select(true()).execution_options(yield_per=RECONCILE_CHUNK_SIZE))
+        for partition in result.partitions():
+            ids = [r.EmployeeID for r in partition]
+            seen.update(ids)
+            existing = {
+                row[0]: tuple(row[1:])
+                for row in db_auth.query(EmployeeDirectory.employee_id, *_value_columns())
+                .filter(EmployeeDirectory.employee_id.in_(ids))
+            }
+            changed = []
+            for row in _project(partition, _accounts_by_email(db_auth, [r.Email for r in partition])):
+                current = existing.get(row["employee_id"])
+                if current is None:
+                    stats["inserted"] += 1
+                elif current != tuple(row[c] for c in _VALUE_COLUMNS):
+                    stats["updated"] += 1
+                else:
+                    stats["unchanged"] += 1
+                    continue
+                changed.append(row)
+            _upsert(db_auth, changed, now)
+
+        stale = [i for (i,) in db_auth.query(EmployeeDirectory.employee_id) if i not in seen]
+        for ids in chunked(stale):
+            db_auth.execute(delete(EmployeeDirectory).where(EmployeeDirectory.employee_id.in_(ids)))
+        stats["deleted"] = len(stale)
+        db_auth.commit()
+        _ready = True
+    except Exception as e:
+        db_auth.rollback()
+        logger.error(f"Lỗi đối soát danh bạ nhân viên: {e}")
+        stats["error"] = str(e)
+    finally:
+        if own_hr:
+            db_hr.close()
+        if own_auth:
+            db_auth.close()
+
+    stats["duration_ms"] = round((time.perf_counter() - started) * 1000)
+    logger.info(f"Employee directory reconciled: {stats}")
+    return stats
+
+
+def attach_scheduler(scheduler):
+    """Đối soát ngay khi scheduler chạy (ở nền, không chặn khởi động) rồi lặp lại định kỳ."""
+    scheduler.add_job(
+        reconcile, 'interval', minutes=settings.EMPLOYEE_DIRECTORY_RECONCILE_MINUTES,
+        id=RECONCILE_JOB_ID, replace_existing=True, next_run_time=datetime.now()
+    )
+
+
+def is_ready(db_auth: Session) -> bool:
+    """True khi danh bạ đã được dựng (đọc được thay cho HR)."""
+    global _ready
+    if not settings.EMPLOYEE_DIRECTORY_ENABLED:
+        return False
+    if _ready is None:
+        try:
+            _ready = db_auth.query(EmployeeDirectory.employee_id).first() is not None
+        except Exception:
+            db_auth.rollback()
+            _ready = False
+    return _ready
+
+
+# --- ĐỌC ---
+def filtered_query(db_auth: Session, search=None, department_id=None, position_id=None, status=None):
+    """
+    Giống crud_employee._filtered_employee_query nhưng trên danh bạ. Trả về (query, rank):
+    rank là biểu thức độ liên quan (ORDER BY tăng dần) khi `search` đi qua chỉ mục FTS5,
+    ngược lại None. Chỉ mục được JOIN trong cùng Auth DB nên không giới hạn số kết quả.
+    """
+    query = db_auth.query(EmployeeDirectory)
+    if department_id: query = query.filter(EmployeeDirectory.department_id == department_id)
+    if position_id: query = query.filter(EmployeeDirectory.position_id == position_id)
+    if status: query = query.filter(EmployeeDirectory.status == status)
+
+    matches = employee_search.match_subquery(db_auth, search) if search else None
+    rank = None
+    if matches is not None:
+        query = query.outerjoin(matches, matches.c.employee_id == EmployeeDirectory.employee_id)
+        found = [matches.c.employee_id.isnot(None)]
+        # Tìm theo mã nhân viên vẫn được hỗ trợ (rank NULL -> đứng đầu khi sắp xếp tăng dần)
+        if search.strip().isdigit():
+            found.append(EmployeeDirectory.employee_id == int(search))
+        query = query.filter(or_(*found))
+        rank = matches.c.rank
+    elif search:
+        filters = [EmployeeDirectory.search_key.like(f"%{employee_search.normalize(search)}%")]
+        if search.strip().isdigit():
+            filters.append(EmployeeDirectory.employee_id == int(search))
+        query = query.filter(or_(*filters))
+    return query, rank
+
+
+def to_schema(row: EmployeeDirectory) -> schemas.Employee:
+    return schemas.Employee(
+        EmployeeID=row.employee_id,
+        FullName=row.full_name,
+        Email=row.email,
+        DateOfBirth=row.date_of_birth,
+        HireDate=row.hire_date,
+        DepartmentID=row.department_id,
+        PositionID=row.position_id,
+        Status=row.status,
+        Gender=row.gender,
+        PhoneNumber=row.phone_number,
+        department=schemas.Department(DepartmentID=row.department_id, DepartmentName=row.department_name)
+        if row.department_name is not None else None,
+        position=schemas.Position(PositionID=row.position_id, PositionName=row.position_name)
+        if row.position_name is not None else None,
+        role=row.role,
+        auth_user_id=row.auth_user_id,
+    )
+
+
+def lookup(db_auth: Session, employee_ids) -> dict:
+    """{employee_id: (full_name, department_name)} cho danh sách ID (theo lô)."""
+    found = {}
+    for ids in chunked(list(set(employee_ids))):
+        found.update({
+            r.employee_id: (r.full_name, r.department_name)
+            for r in db_auth.query(
+                EmployeeDirectory.employee_id, EmployeeDirectory.full_name, EmployeeDirectory.department_name
+            ).filter(EmployeeDirectory.employee_id.in_(ids))
+        })
+    return found
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Quản lý danh bạ nhân viên (Auth DB)")
+    parser.add_argument("--reconcile", action="store_true", help="Đối soát toàn bộ danh bạ với HUMAN_2025")
+    args = parser.parse_args()
+
+    if not args.reconcile:
+        parser.print_help()
+    else:
+        from database import engine_auth
+        EmployeeDirectory.__table__.create(bind=engine_auth, checkfirst=True)
+        stats = reconcile()
+        print(f"✅ Danh bạ: +{stats['inserted']} ~{stats['updated']} -{stats['deleted']} "
+              f"({stats['unchanged']} không đổi), {stats['duration_ms']} ms.")
@@ -0,0 +1,264 @@
+# backend/services/employee_import.py
+"""
+Nhập nhân viên hàng loạt (CSV / JSON) vào HR -> Payroll -> Auth.
+
+Khác với `create_employee_synced` (khoảng 6 commit / người qua 3 CSDL), file được
+xử lý theo lô `IMPORT_BATCH_SIZE` dòng:
+1. Kiểm tra dữ liệu từng dòng (schema EmployeeCreate), trùng email/SĐT trong file
+   và với dữ liệu đã có (truy vấn IN theo lô), phòng ban/chức vụ tồn tại.
+2. Chèn `Employees` (HR) bằng executemany, đọc lại EmployeeID theo email.
+3. Đồng bộ phòng ban/chức vụ còn thiếu sang Payroll MỘT lần cho cả lô, rồi
+   chèn `employees` (Payroll).
+4. Chèn `users` (Auth) với role tính từ logic HR.
+Nếu bước 3/4 lỗi, các dòng của lô đã ghi ở bước trước được xóa (bù trừ giống
+create_employee_synced) và cả lô được báo lỗi. Lỗi được báo theo số dòng.
+
+CLI:  python -m services.employee_import nhan_vien.csv [--dry-run] [--default-password ...]
+"""
+import argparse
+import csv
+import io
+import json
+import logging
+import time
+
+from pydantic import ValidationError
+from sqlalchemy import insert, delete
+from sqlalchemy.orm import Session
+
+import schemas
+from auth.auth import get_user_role as get_role_from_hr
+from core.batching import chunked
+from core.config import settings
+from core.security import get_password_hash
+from models import EmployeeHR, EmployeePayroll, DepartmentPayroll, PositionPayroll, User as AuthUser
+from services import reference_cache, employee_search, employee_directory, dashboard_snapshot
+
+logger = logging.getLogger(__name__)
+
+IMPORT_COLUMNS = [
+    "FullName", "Email", "DateOfBirth", "HireDate", "DepartmentID", "PositionID",
+    "Status", "Gender", "PhoneNumber", "password"
+]
+
+
+def parse_file(content: bytes, filename: str = "") -> list:
+    """Đọc CSV (UTF-8, có/không BOM) hoặc JSON (mảng object) thành list dict."""
+    text = content.decode("utf-8-sig")
+    if filename.lower().endswith(".json") or text.lstrip().startswith("["):
+        data = json.loads(text)
+        if not isinstance(data, list):
+            raise ValueError("File JSON phải là một mảng các nhân viên")
+        return data
+    return list(csv.DictReader(io.StringIO(text)))
+
+
+def _clean(raw: dict, default_password: str = None) -> dict:
+    row = {}
+    for key in IMPORT_COLUMNS:
+        value = raw.get(key)
+        if isinstance(value, str):
+            value = value.strip()
+        row[key] = None if value == "" else value
+    if not row["password"] and default_password:
+        row["password"] = default_password
+    return row
+
+
+def _validate_batch(db_hr: Session, db_auth: Session, batch, seen_emails: set, seen_phones: set, errors: list):
+    """Trả về các dòng hợp lệ [(số dòng, EmployeeCreate)] của lô; lỗi ghi vào `errors`."""
+    dept_names = reference_cache.department_names(db_hr)
+    pos_names = reference_cache.position_names(db_hr)
+
+    parsed = []
+    for line_no, raw, default_password in batch:
+        try:
+            emp = schemas.EmployeeCreate(**_clean(raw, default_password))
+        except ValidationError as e:
+            errors.append({
+                "row": line_no, "email": raw.get("Email"),
+                "errors": [f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in e.errors()]
+            })
+            continue
+
+        problems = []
+        email = emp.Email.lower()
+        if email in seen_emails:
+            problems.append("Email bị trùng trong file")
+        if emp.PhoneNumber and emp.PhoneNumber in seen_phones:
+            problems.append("Số điện thoại bị trùng trong file")
+        if emp.DepartmentID not in dept_names:
+            problems.append(f"Phòng ban {emp.DepartmentID} không tồn tại")
+        if emp.PositionID not in pos_names:
+            problems.append(f"Chức vụ {emp.PositionID} không tồn tại")
+        seen_emails.add(email)
+        if emp.PhoneNumber:
+            seen_phones.add(emp.PhoneNumber)
+
+        if problems:
+            errors.append({"row": line_no, "email": emp.Email, "errors": problems})
+        else:
+            parsed.append((line_no, emp))
+
+    # Trùng với dữ liệu đã có (1 truy vấn IN cho mỗi CSDL / lô)
+    emails = [emp.Email for _, emp in parsed]
+    phones = [emp.PhoneNumber for _, emp in parsed if emp.PhoneNumber]
+    taken_emails, taken_phones = set(), set()
+    for ids in chunked(emails):
+        taken_emails.update(e.lower() for (e,) in db_hr.query(EmployeeHR.Email).filter(EmployeeHR.Email.in_(ids)))
+        taken_emails.update(e.lower() for (e,) in db_auth.query(AuthUser.email).filter(AuthUser.email.in_(ids)))
+    for ids in chunked(phones):
+        taken_phones.update(p for (p,) in db_auth.query(AuthUser.phone_number).filter(AuthUser.phone_number.in_(ids)))
+
+    valid = []
+    for line_no, emp in parsed:
+        problems = []
+        if emp.Email.lower() in taken_emails:
+            problems.append("Email đã tồn tại trong hệ thống")
+        if emp.PhoneNumber and emp.PhoneNumber in taken_phones:
+            problems.append("Số điện thoại đã được dùng cho tài khoản khác")
+        if problems:
+            errors.append({"row": line_no, "email": emp.Email, "errors": problems})
+        else:
+            valid.append((line_no, emp))
+    return valid
+
+
+def _sync_reference_to_payroll(db_payroll: Session, db_hr: Session, employees):
+    """Thêm phòng ban/chức vụ còn thiếu bên Payroll (1 lần cho cả lô). Không commit."""
+    dept_ids = {emp.DepartmentID for emp in employees}
+    pos_ids = {emp.PositionID for emp in employees}
+    existing_depts = {d for (d,) in db_payroll.query(DepartmentPayroll.DepartmentID)
+                      .filter(DepartmentPayroll.DepartmentID.in_(list(dept_ids)))}
+    existing_pos = {p for (p,) in db_payroll.query(PositionPayroll.PositionID)
+                    .filter(PositionPayroll.PositionID.in_(list(pos_ids)))}
+
+    dept_names = reference_cache.department_names(db_hr)
+    pos_names = reference_cache.position_names(db_hr)
+    missing_depts = [{"DepartmentID": d, "DepartmentName": dept_names[d]} for d in dept_ids - existing_depts]
+    missing_pos = [{"PositionID": p, "PositionName": pos_names[p]} for p in pos_ids - existing_pos]
+    if missing_depts:
+        db_payroll.execute(insert(DepartmentPayroll), missing_depts)
+    if missing_pos:
+        db_payroll.execute(insert(PositionPayroll), missing_pos)
+
+
+def _insert_batch(db_hr: Session, db_payroll: Session, db_auth: Session, valid) -> list:
+    """Ghi 1 lô đã hợp lệ vào 3 CSDL. Trả về danh sách EmployeeID đã tạo."""
+    employees = [emp for _, emp in valid]
+    emails = [emp.Email for emp in employees]
+
+    # 1. HR
+    try:
+        db_hr.execute(insert(EmployeeHR), [emp.model_dump(exclude={"password"}) for emp in employees])
+        db_hr.commit()
+    except Exception:
+        db_hr.rollback()
+        raise
+    id_by_email = {}
+    for ids in chunked(emails):
+        id_by_email.update({
+            e.lower(): i for i, e in db_hr.query(EmployeeHR.EmployeeID, EmployeeHR.Email).filter(EmployeeHR.Email.in_(ids))
+        })
+    new_ids = list(id_by_email.values())
+
+    def undo_hr():
+        for ids in chunked(new_ids):
+            db_hr.execute(delete(EmployeeHR).where(EmployeeHR.EmployeeID.in_(ids)))
+        db_hr.commit()
+
+    # 2. Payroll
+    try:
+        _sync_reference_to_payroll(db_payroll, db_hr, employees)
+        db_payroll.execute(insert(EmployeePayroll), [{
+            "EmployeeID": id_by_email[emp.Email.lower()], "FullName": emp.FullName,
+            "DepartmentID": emp.DepartmentID, "PositionID": emp.PositionID, "Status": emp.Status
+        } for emp in employees])
+        db_payroll.commit()
+    except Exception:
+        db_payroll.rollback()
+        undo_hr()
+        raise
+
+    # 3. Auth
+    try:
+        db_auth.execute(insert(AuthUser), [{
+            "full_name": emp.FullName, "email": emp.Email,
+            "hashed_password": get_password_hash(emp.password),
+            "role": get_role_from_hr(emp), "phone_number": emp.PhoneNumber,
+            "employee_id_link": id_by_email[emp.Email.lower()]
+        } for emp in employees])
+        db_auth.commit()
+    except Exception:
+        db_auth.rollback()
+        for ids in chunked(new_ids):
+            db_payroll.execute(delete(EmployeePayroll).where(EmployeePayroll.EmployeeID.in_(ids)))
+        db_payroll.commit()
+        undo_hr()
+        raise
+
+    return new_ids
+
+
+def import_employees(db_hr: Session, db_payroll: Session, db_auth: Session, rows: list,
+                     dry_run: bool = False, default_password: str = None) -> dict:
+    """Nhập danh sách dòng (dict). Trả về báo cáo: số dòng tạo được và lỗi theo từng dòng."""
+    started = time.perf_counter()
+    errors, created_ids = [], []
+    seen_emails, seen_phones = set(), set()
+    valid_count = 0
+
+    # Số dòng tính như trong file CSV (dòng 1 là tiêu đề)
+    numbered = [(i, raw, default_password) for i, raw in enumerate(rows, start=2)]
+    for batch in chunked(numbered, settings.IMPORT_BATCH_SIZE):
+        valid = _validate_batch(db_hr, db_auth, batch, seen_emails, seen_phones, errors)
+        valid_count += len(valid)
+        if dry_run or not valid:
+            continue
+        try:
+            created_ids.extend(_insert_batch(db_hr, db_payroll, db_auth, valid))
+        except Exception as e:
+            logger.error(f"Employee import batch failed: {e}")
+            errors.extend({"row": line_no, "email": emp.Email, "errors": [f"Lỗi ghi dữ liệu cả lô: {e}"]}
+                          for line_no, emp in valid)
+
+    if created_ids:
+        for ids in chunked(created_ids):
+            employee_search.reindex(db_hr, EmployeeHR.EmployeeID.in_(ids), db_auth)
+            employee_directory.refresh(db_hr, EmployeeHR.EmployeeID.in_(ids), db_auth)
+        dashboard_snapshot.request_rebuild()
+
+    errors.sort(key=lambda e: e["row"])
+    return {
+        "total_rows": len(rows),
+        "valid_rows": valid_count,
+        "created": len(created_ids),
+        "failed": len(errors),
+        "dry_run": dry_run,
+        "errors": errors,
+        "duration_ms": round((time.perf_counter() - started) * 1000),
+    }
+
+
+if __name__ == "__main__":
+    from database import SessionLocalSQLServer, SessionLocalMySQL, SessionLocalAuth
+
+    parser = argparse.ArgumentParser(description="Nhập nhân viên hàng loạt từ CSV/JSON")
+    parser.add_argument("file", help="Đường dẫn file .csv hoặc .json")
+    parser.add_argument("--dry-run", action="store_true", help="Chỉ kiểm tra dữ liệu, không ghi")
+    parser.add_argument("--default-password", help="Mật khẩu cho các dòng không có cột password")
+    args = parser.parse_args()
+
+    with open(args.file, "rb") as f:
+        rows = parse_file(f.read(), args.file)
+
+    db_hr, db_payroll, db_auth = SessionLocalSQLServer(), SessionLocalMySQL(), SessionLocalAuth()
+    try:
+        report = import_employees(db_hr, db_payroll, db_auth, rows, args.dry_run, args.default_password)
+    finally:
+        db_hr.close(); db_payroll.close(); db_auth.close()
+
+    for err in report["errors"]:
+        print(f"   Dòng {err['row']} ({err['email']}): {'; '.join(err['errors'])}")
+    print(f"✅ {report['created']}/{report['total_rows']} nhân viên được tạo, "
+          f"{report['failed']} lỗi, {report['duration_ms']} ms{' (dry-run)' if args.dry_run else ''}.")
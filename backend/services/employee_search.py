@@ -0,0 +1,222 @@
+# backend/services/employee_search.py
+"""
+Chỉ mục tìm kiếm nhân viên (SQLite FTS5 trong Auth DB).
+
+Bảng ảo `employee_search` (rowid = EmployeeID) chứa họ tên, email, tên phòng ban
+và chức vụ ĐÃ CHUẨN HÓA: chữ thường, bỏ dấu tiếng Việt (kể cả đ -> d), nên
+"nguyen van" khớp "Nguyễn Văn". Mỗi từ khóa được tìm theo tiền tố ("ngu" khớp
+"Nguyễn") và kết quả xếp hạng bằng bm25 (ưu tiên khớp họ tên).
+
+- `match_subquery`: subquery (employee_id, rank) để JOIN trực tiếp trong Auth DB
+  (danh bạ nhân viên): lọc phòng ban / chức vụ / trạng thái và phân trang trong
+  cùng 1 truy vấn, không giới hạn số kết quả.
+- `search_ids`: danh sách EmployeeID theo độ liên quan cho truy vấn bên HR (IN).
+  Trả về None nếu nhiều hơn EMPLOYEE_SEARCH_MAX_RESULTS (người gọi dùng ilike, để
+  lọc / phân trang sau đó không bị thiếu kết quả) hoặc SQLite không hỗ trợ FTS5.
+
+Chỉ mục được cập nhật ở các luồng tạo/sửa/xóa nhân viên và đổi tên phòng ban /
+chức vụ; dựng lại toàn bộ: python -m services.employee_search --rebuild
+"""
+import argparse
+import logging
+import re
+import unicodedata
+
+from sqlalchemy import select, text, true, table, literal_column
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from database import SessionLocalAuth
+from models import EmployeeHR, DepartmentHR, PositionHR
+
+logger = logging.getLogger(__name__)
+
+TABLE = "employee_search"
+REINDEX_CHUNK_SIZE = 2000
+
+_available = None  # None = chưa kiểm tra
+_populated = None  # False = đang dựng chỉ mục -> đọc trả None (người gọi dùng ilike) tới khi xong
+_TOKEN_RE = re.compile(r"[^\W_]+", re.UNICODE)
+
+
+def normalize(value) -> str:
+    """Chữ thường + bỏ dấu tiếng Việt (đ -> d)."""
+    if not value:
+        return ""
+    value = str(value).lower().replace("đ", "d")
+    value = unicodedata.normalize("NFD", value)
+    return "".join(ch for ch in value if unicodedata.category(ch) != "Mn")
+
+
+def match_expression(term: str) -> str:
+    """'Nguyễn Vă' -> '"nguyen"* "va"*' (mọi từ đều phải khớp, theo tiền tố)."""
+    return " ".join(f'"{token}"*' for token in _TOKEN_RE.findall(normalize(term)))
+
+
+def _is_available(db_auth: Session) -> bool:
+    global _available
+    if _available is None:
+        _available = db_auth.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": TABLE}
+        ).first() is not None
+    return _available
+
+
+def _is_searchable(db_auth: Session) -> bool:
+    """Ghi chỉ cần bảng tồn tại; đọc còn cần chỉ mục đã dựng xong (không trả rỗng lúc khởi động)."""
+    return _populated is not False and _is_available(db_auth)
+
+
+def ensure_index(db_auth: Session, db_hr: Session) -> bool:
+    """Tạo bảng FTS5 nếu chưa có; dựng dữ liệu lần đầu nếu bảng trống."""
+    global _available
+    try:
+        db_auth.execute(text(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} "
+            "USING fts5(full_name, email, department, position, tokenize = 'unicode61')"
+        ))
+        db_auth.commit()
+    except Exception as e:
+        db_auth.rollback()
+        _available = False
+        logger.warning(f"SQLite không hỗ trợ FTS5, tìm kiếm nhân viên dùng ilike: {e}")
+        return False
+
+    _available = True
+    if db_auth.execute(text(f"SELECT 1 FROM {TABLE} LIMIT 1")).first() is None:
+        rebuild(db_hr, db_auth)
+    return True
+
+
+def _write(db_auth: Session, rows):
+    ids = [row.EmployeeID for row in rows]
+    db_auth.execute(text(f"DELETE FROM {TABLE} WHERE rowid IN ({', '.join(str(int(i)) for i in ids)})"))
+    db_auth.execute(
+        text(f"INSERT INTO {TABLE} (rowid, full_name, email, department, position) "
+             "VALUES (:id, :full_name, :email, :department, :position)"),
+        [{
+            "id": row.EmployeeID,
+            "full_name": normalize(row.FullName),
+            "email": normalize(row.Email),
+            "department": normalize(row.DepartmentName),
+            "position": normalize(row.PositionName),
+        } for row in rows]
+    )
+
+
+def reindex(db_hr: Session, where, db_auth: Session = None) -> int:
+    """Ghi lại chỉ mục cho các nhân viên thỏa điều kiện `where` (biểu thức trên EmployeeHR)."""
+    own_session = db_auth is None
+    db_auth = db_auth or SessionLocalAuth.session_factory()
+    count = 0
+    try:
+        if not _is_available(db_auth):
+            return 0
+        stmt = select(
+            EmployeeHR.EmployeeID, EmployeeHR.FullName, EmployeeHR.Email,
+            DepartmentHR.DepartmentName, PositionHR.PositionName
+        ).outerjoin(DepartmentHR, EmployeeHR.DepartmentID == DepartmentHR.DepartmentID)\
+         .outerjoin(PositionHR, EmployeeHR.PositionID == PositionHR.PositionID)\
+         .where(where)
+        result = db_hr.execute(stmt.execution_options(yield_per=REINDEX_CHUNK_SIZE))
+        for partition in result.partitions():
+            _write(db_auth, partition)
+            count += len(partition)
+        db_auth.commit()
+    except Exception as e:
+        db_auth.rollback()
+        logger.error(f"Lỗi cập nhật chỉ mục tìm kiếm nhân viên: {e}")
+    finally:
+        if own_session:
+            db_auth.close()
+    return count
+
+
+def index_employee(db_hr: Session, employee_id: int, db_auth: Session = None):
+    return reindex(db_hr, EmployeeHR.EmployeeID == employee_id, db_auth)
+
+
+def remove(employee_id: int, db_auth: Session):
+    remove_many([employee_id], db_auth)
+
+
+def remove_many(employee_ids, db_auth: Session):
+    try:
+        if _is_available(db_auth):
+            db_auth.execute(text(f"DELETE FROM {TABLE} WHERE rowid = :id"), [{"id": i} for i in employee_ids])
+            db_auth.commit()
+    except Exception as e:
+        db_auth.rollback()
+        logger.error(f"Lỗi xóa nhân viên {list(employee_ids)[:10]} khỏi chỉ mục tìm kiếm: {e}")
+
+
+def rebuild(db_hr: Session, db_auth: Session) -> int:
+    """Xóa và dựng lại toàn bộ chỉ mục từ HUMAN_2025 (trong lúc dựng, tìm kiếm dùng ilike)."""
+    global _populated
+    _populated = False
+    try:
+        db_auth.execute(text(f"DELETE FROM {TABLE}"))
+        db_auth.commit()
+        return reindex(db_hr, true(), db_auth)
+    finally:
+        _populated = True
+
+
+# Trọng số bm25 theo cột: họ tên > email > phòng ban, chức vụ (giá trị nhỏ = liên quan hơn)
+_RANK = f"bm25({TABLE}, 10.0, 4.0, 1.0, 1.0)"
+
+
+def match_subquery(db_auth: Session, term: str):
+    """
+    Subquery (employee_id, rank) các nhân viên khớp `term`, để JOIN trong Auth DB.
+    None = không dùng được chỉ mục (không có FTS5 hoặc từ khóa không có chữ/số).
+    """
+    expression = match_expression(term or "")
+    if not expression or not _is_searchable(db_auth):
+        return None
+    return select(
+        literal_column("rowid").label("employee_id"), literal_column(_RANK).label("rank")
+    ).select_from(table(TABLE)).where(
+        text(f"{TABLE} MATCH :search_match").bindparams(search_match=expression)
+    ).subquery("search_match")
+
+
+def search_ids(db_auth: Session, term: str, limit: int = None):
+    """
+    EmployeeID khớp `term`, xếp theo độ liên quan (bm25).
+    None = không dùng được chỉ mục, hoặc có nhiều hơn `limit` kết quả: danh sách bị cắt
+    sẽ làm bộ lọc / phân trang phía sau thiếu kết quả, nên người gọi quay về ilike.
+    """
+    expression = match_expression(term or "")
+    if not expression or not _is_searchable(db_auth):
+        return None
+    limit = limit or settings.EMPLOYEE_SEARCH_MAX_RESULTS
+    rows = db_auth.execute(
+        text(f"SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH :q ORDER BY {_RANK} LIMIT :n"),
+        {"q": expression, "n": limit + 1}
+    ).all()
+    if len(rows) > limit:
+        return None
+    return [row[0] for row in rows]
+
+
+if __name__ == "__main__":
+    from database import SessionLocalSQLServer
+
+    parser = argparse.ArgumentParser(description="Quản lý chỉ mục tìm kiếm nhân viên (FTS5)")
+    parser.add_argument("--rebuild", action="store_true", help="Dựng lại toàn bộ chỉ mục từ HUMAN_2025")
+    args = parser.parse_args()
+
+    if not args.rebuild:
+        parser.print_help()
+    else:
+        db_auth = SessionLocalAuth()
+        db_hr = SessionLocalSQLServer()
+        try:
+            if ensure_index(db_auth, db_hr):
+                print(f"✅ Đã dựng lại chỉ mục tìm kiếm: {rebuild(db_hr, db_auth)} nhân viên.")
+            else:
+                print("❌ SQLite hiện tại không hỗ trợ FTS5.")
+        finally:
+            db_auth.close()
+            db_hr.close()
@@ -0,0 +1,154 @@
+# backend/services/fanout.py
+"""
+Chạy song song các nhóm truy vấn theo từng CSDL nguồn (HR / Payroll / Auth).
+
+Mỗi nhóm là 1 hàm nhận Session của đúng nguồn và trả về 1 phần payload.
+- Chế độ "concurrent": mỗi nhóm chạy trên 1 thread của pool, tự mở session
+  riêng (scoped_session theo thread) và đóng lại khi xong.
+- Chế độ "sequential": chạy lần lượt như trước (dùng session của request nếu có).
+
+Mỗi nguồn có timeout riêng. Nhóm lỗi/quá hạn không làm hỏng cả response:
+kết quả của nhóm đó được thay bằng giá trị dự phòng và tên nguồn được đưa vào
+danh sách `failed` (partial result).
+
+Một nguồn treo không được chiếm thread của nguồn khác:
+- Mỗi nguồn 1 pool riêng (REPORT_FANOUT_WORKERS thread, mặc định theo threadpool request).
+- Nhóm quá hạn bị hủy nếu chưa chạy; nhóm đang chạy bị CSDL cắt theo timeout còn lại
+  (MySQL MAX_EXECUTION_TIME, SQL Server query timeout của pyodbc, SQLite progress handler)
+  nên thread được trả về pool thay vì treo tới khi truy vấn xong.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextlib import contextmanager
+
+from sqlalchemy import text
+
+from core.config import settings
+from database import SessionLocalSQLServer, SessionLocalMySQL, SessionLocalAuth
+
+logger = logging.getLogger(__name__)
+
+SOURCES = {
+    "hr": SessionLocalSQLServer,
+    "payroll": SessionLocalMySQL,
+    "auth": SessionLocalAuth,
+}
+
+_executors = {}
+_executors_lock = threading.Lock()
+
+
+def workers_per_source() -> int:
+    """Số thread mỗi nguồn: cấu hình, hoặc 1/4 threadpool request (40 -> 10 = pool_size của engine)."""
+    return settings.REPORT_FANOUT_WORKERS or max(2, settings.REQUEST_THREADPOOL_SIZE // 4)
+
+
+def _get_executor(source: str) -> ThreadPoolExecutor:
+    executor = _executors.get(source)
+    if executor is None:
+        with _executors_lock:
+            executor = _executors.get(source)
+            if executor is None:
+                executor = _executors[source] = ThreadPoolExecutor(
+                    max_workers=workers_per_source(), thread_name_prefix=f"report-fanout-{source}"
+                )
+    return executor
+
+
+def source_timeout(source: str) -> float:
+    return settings.REPORT_SOURCE_TIMEOUTS.get(source, settings.REPORT_SOURCE_TIMEOUT_SECONDS)
+
+
+@contextmanager
+def statement_timeout(db, seconds: float):
+    """Giới hạn thời gian truy vấn của `db` ở phía CSDL, khôi phục khi xong (kết nối quay lại pool)."""
+    dialect = db.get_bind().dialect.name
+    if dialect == "mysql":
+        db.execute(text("SET SESSION MAX_EXECUTION_TIME = :ms"), {"ms": max(int(seconds * 1000), 1)})
+        try:
+            yield
+        finally:
+            db.rollback()
+            db.execute(text("SET SESSION MAX_EXECUTION_TIME = 0"))
+    elif dialect == "mssql":
+        raw = db.connection().connection.driver_connection  # pyodbc: timeout (giây) cho truy vấn tiếp theo
+        previous, raw.timeout = raw.timeout, max(int(seconds + 0.999), 1)
+        try:
+            yield
+        finally:
+            raw.timeout = previous
+    elif dialect == "sqlite":
+        raw = db.connection().connection.driver_connection
+        deadline = time.monotonic() + seconds
+        raw.set_progress_handler(lambda: time.monotonic() > deadline, 10000)  # != 0 -> "interrupted"
+        try:
+            yield
+        finally:
+            raw.set_progress_handler(None, 0)
+    else:
+        yield
+
+
+def _run_in_worker(source: str, fn, deadline: float = None):
+    if deadline is not None and time.monotonic() >= deadline:
+        raise TimeoutError(f"hết thời gian chờ trong hàng đợi nguồn '{source}'")
+    registry = SOURCES[source]
+    db = registry()
+    try:
+        if deadline is None:
+            return fn(db)
+        with statement_timeout(db, deadline - time.monotonic()):
+            return fn(db)
+    finally:
+        registry.remove()
+
+
+def run_groups(groups: dict, sessions: dict = None, mode: str = None):
+    """
+    groups:   {tên_nhóm: (nguồn, hàm(db) -> kết quả, giá_trị_dự_phòng)}
+    sessions: {nguồn: Session} dùng cho chế độ sequential (tùy chọn).
+    Trả về (results, failed) với results = {tên_nhóm: kết quả}.
+    """
+    mode = mode or settings.REPORT_FANOUT_MODE
+    results, failed = {}, []
+
+    if mode != "concurrent":
+        for name, (source, fn, fallback) in groups.items():
+            try:
+                if sessions and source in sessions:
+                    results[name] = fn(sessions[source])
+                else:
+                    results[name] = _run_in_worker(source, fn)
+            except Exception as e:
+                logger.error(f"Report group '{name}' ({source}) failed: {e}")
+                if sessions and source in sessions:
+                    sessions[source].rollback()
+                results[name] = fallback
+                failed.append(name)
+        return results, failed
+
+    started = time.monotonic()
+    futures = {
+        name: _get_executor(source).submit(_run_in_worker, source, fn, started + source_timeout(source))
+        for name, (source, fn, _) in groups.items()
+    }
+    # Chờ theo hạn chót của từng nguồn (tính từ lúc submit)
+    for name, future in futures.items():
+        source, _, fallback = groups[name]
+        remaining = source_timeout(source) - (time.monotonic() - started)
+        done, _ = wait([future], timeout=max(remaining, 0))
+        if not done:
+            future.cancel()  # Chưa chạy -> bỏ khỏi hàng đợi; đang chạy -> CSDL tự cắt theo statement_timeout
+            logger.warning(f"Report group '{name}' ({source}) timed out after {source_timeout(source)}s")
+            results[name] = fallback
+            failed.append(name)
+            continue
+        try:
+            results[name] = future.result()
+        except Exception as e:
+            logger.error(f"Report group '{name}' ({source}) failed: {e}")
+            results[name] = fallback
+            failed.append(name)
+    return results, failed
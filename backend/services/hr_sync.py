@@ -0,0 +1,289 @@
+# backend/services/hr_sync.py
+"""
+Đồng bộ tài khoản nhân viên HUMAN_2025 -> Auth DB (users) theo tập hợp.
+
+Thay cho vòng lặp cũ trong main.initial_sync_and_setup (mỗi nhân viên 1 lần
+get_user_by_email + 1 lần create_user có commit riêng = 2N round trip, N lần fsync):
+1. Đọc email / SĐT / employee_id_link đã có bên Auth: 1 truy vấn.
+2. Quét nhân viên HR (chỉ các cột cần) theo từng phần, tính phần chênh lệch trong bộ nhớ.
+3. Chèn các tài khoản thiếu bằng executemany theo lô, tất cả trong 1 transaction.
+Trả về số lượng và thời gian từng bước.
+
+Đồng bộ tăng dần (sync_incremental, chạy lúc khởi động và định kỳ trên scheduler):
+chỉ quét nhân viên có EmployeeID lớn hơn mốc (watermark) đã lưu trong
+SystemConfig, và nếu cấu hình HR_SYNC_CHANGE_COLUMN (cột rowversion của bảng
+Employees) thì cả các dòng đã sửa sau mốc phiên bản. Không có thay đổi -> chỉ tốn
+1 truy vấn MAX/COUNT.
+- IDENTITY cấp khi INSERT nhưng commit không theo thứ tự: dòng có ID nhỏ hơn mốc có
+  thể xuất hiện sau. Mỗi lần quét lại HR_SYNC_ID_LOOKBACK ID ngay dưới mốc, và lưu số
+  dòng trong cửa sổ đó để phát hiện dòng đến muộn ngay cả khi MAX không đổi.
+- Mốc rowversion trên = MIN_ACTIVE_ROWVERSION() - 1 (SQL Server): không vượt qua
+  phiên bản của transaction chưa commit.
+- Sửa dòng cũ (vd. đổi Status) khi không có cột rowversion: quét toàn bộ định kỳ
+  (HR_SYNC_FULL_RESCAN_MINUTES) hoặc theo yêu cầu: request_full_rescan().
+"""
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+
+from sqlalchemy import BigInteger, and_, case, cast, column, func, insert, or_, select
+from sqlalchemy.orm import Session
+
+from auth.auth import get_user_role as get_role_from_hr
+from core.batching import chunked
+from core.config import settings
+from core.security import get_password_hash
+from crud import crud_shareholder, crud_system
+from database import SessionLocalSQLServer, SessionLocalAuth
+from models import EmployeeHR, User as AuthUser
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PASSWORD = "password123"
+SCAN_CHUNK_SIZE = 5000
+INSERT_CHUNK_SIZE = 500
+
+WATERMARK_ID_KEY = "hr_sync_last_employee_id"
+WATERMARK_VERSION_KEY = "hr_sync_last_row_version"
+WATERMARK_WINDOW_KEY = "hr_sync_lookback_count"
+INCREMENTAL_JOB_ID = "hr_incremental_sync"
+FULL_RESCAN_JOB_ID = "hr_full_rescan"
+PERIODIC_FULL_RESCAN_JOB_ID = "hr_periodic_full_rescan"
+
+_scheduler = None
+_run_lock = threading.Lock()  # Không chạy chồng tăng dần / quét toàn bộ
+_last_run = None
+
+
+def sync_accounts(db_hr: Session, db_auth: Session, where=None) -> dict:
+    """
+    Tạo tài khoản cho nhân viên HR chưa có bên Auth (so theo email).
+    Bỏ qua nhân viên không có email, hoặc có SĐT / EmployeeID đã gắn với tài khoản khác
+    (trước đây các dòng này lỗi ràng buộc UNIQUE khi create_user).
+    `where`: điều kiện thêm trên EmployeeHR (đồng bộ tăng dần), None = toàn bộ.
+    """
+    timings = {}
+    started = time.perf_counter()
+
+    # 1. Auth: 1 truy vấn
+    emails, phones, links = set(), set(), set()
+    for email, phone, link in db_auth.query(AuthUser.email, AuthUser.phone_number, AuthUser.employee_id_link):
+        emails.add(email)
+        if phone:
+            phones.add(phone)
+        if link is not None:
+            links.add(link)
+    timings["auth_ms"] = round((time.perf_counter() - started) * 1000)
+
+    # 2. HR: chỉ các cột cần cho tài khoản + tính role
+    step = time.perf_counter()
+    stmt = select(
+        EmployeeHR.EmployeeID, EmployeeHR.FullName, EmployeeHR.Email, EmployeeHR.PhoneNumber,
+        EmployeeHR.DepartmentID, EmployeeHR.PositionID
+    )
+    if where is not None:
+        stmt = stmt.where(where)
+    hashed_password = get_password_hash(DEFAULT_PASSWORD)  # Cùng mật khẩu mặc định -> băm 1 lần
+    scanned, skipped, missing = 0, 0, []
+    result = db_hr.execute(stmt.execution_options(yield_per=SCAN_CHUNK_SIZE))
+    for partition in result.partitions():
+        for emp in partition:
+            scanned += 1
+            if not emp.Email or emp.Email in emails:
+                continue
+            if (emp.PhoneNumber and emp.PhoneNumber in phones) or emp.EmployeeID in links:
+                skipped += 1
+                continue
+            emails.add(emp.Email)
+            if emp.PhoneNumber:
+                phones.add(emp.PhoneNumber)
+            links.add(emp.EmployeeID)
+            missing.append({
+                "full_name": emp.FullName,
+                "email": emp.Email,
+                "hashed_password": hashed_password,
+                "role": get_role_from_hr(emp),
+                "phone_number": emp.PhoneNumber,
+                "employee_id_link": emp.EmployeeID,
+            })
+    timings["hr_ms"] = round((time.perf_counter() - step) * 1000)
+
+    # 3. Chèn theo lô trong 1 transaction
+    step = time.perf_counter()
+    try:
+        for rows in chunked(missing, INSERT_CHUNK_SIZE):
+            db_auth.execute(insert(AuthUser), rows)
+        db_auth.commit()
+    except Exception:
+        db_auth.rollback()
+        raise
+    timings["insert_ms"] = round((time.perf_counter() - step) * 1000)
+    timings["total_ms"] = round((time.perf_counter() - started) * 1000)
+
+    stats = {"scanned": scanned, "created": len(missing), "skipped_conflicts": skipped, **timings}
+    logger.info(f"Account sync: {stats}")
+    return stats
+
+
+# --- ĐỒNG BỘ TĂNG DẦN THEO WATERMARK ---
+
+def _version_column():
+    """Cột rowversion (ép sang BIGINT để so sánh / lưu) nếu có cấu hình, ngược lại None."""
+    name = settings.HR_SYNC_CHANGE_COLUMN
+    return cast(column(name), BigInteger) if name else None
+
+
+def _min_active_version(db_hr: Session):
+    """MIN_ACTIVE_ROWVERSION() - 1 trên SQL Server (mọi phiên bản <= giá trị này đã commit), nơi khác None."""
+    if db_hr.get_bind().dialect.name != "mssql":
+        return None
+    return db_hr.execute(select(cast(func.MIN_ACTIVE_ROWVERSION(), BigInteger))).scalar() - 1
+
+
+def _lookback_window(low_id: int, high_id: int):
+    return and_(EmployeeHR.EmployeeID > max(low_id - settings.HR_SYNC_ID_LOOKBACK, 0), EmployeeHR.EmployeeID <= high_id)
+
+
+def _count_in(condition):
+    return func.coalesce(func.sum(case((condition, 1), else_=0)), 0)
+
+
+def _read_watermark(db_auth: Session, key: str, default: int = 0) -> int:
+    config = crud_system.get_config(db_auth, key)
+    try:
+        return int(config.value) if config and config.value else default
+    except ValueError:
+        return default
+
+
+def watermarks(db_auth: Session) -> dict:
+    return {
+        "employee_id": _read_watermark(db_auth, WATERMARK_ID_KEY),
+        "row_version": _read_watermark(db_auth, WATERMARK_VERSION_KEY) if settings.HR_SYNC_CHANGE_COLUMN else None,
+        "lookback_count": _read_watermark(db_auth, WATERMARK_WINDOW_KEY, default=-1),
+    }
+
+
+def sync_incremental(db_hr: Session, db_auth: Session, full: bool = False) -> dict:
+    """
+    Đồng bộ tài khoản + cổ đông cho các nhân viên mới / đã sửa kể từ watermark.
+    Mốc trên lấy trước khi quét: dòng thêm trong lúc quét sẽ vào lần sau.
+    Watermark chỉ tiến khi cả 2 bước thành công. `full=True`: quét toàn bộ rồi đặt lại mốc.
+    """
+    global _last_run
+    started = time.perf_counter()
+    version_col = _version_column()
+    marks = watermarks(db_auth)
+
+    columns = [func.max(EmployeeHR.EmployeeID), _count_in(_lookback_window(marks["employee_id"], marks["employee_id"]))]
+    if version_col is not None:
+        columns.append(func.max(version_col))
+    high = db_hr.execute(select(*columns).select_from(EmployeeHR)).first()
+    high_id, window_count = high[0] or 0, high[1]
+    high_version = None
+    if version_col is not None:
+        high_version = high[2] or 0
+        active = _min_active_version(db_hr)
+        if active is not None:
+            high_version = min(high_version, active)
+
+    stats = {"mode": "full" if full else "incremental", "from": marks,
+             "to": {"employee_id": high_id, "row_version": high_version}}
+    if (not full and high_id <= marks["employee_id"] and window_count == marks["lookback_count"]
+            and (version_col is None or high_version <= marks["row_version"])):
+        stats.update(accounts=None, shareholders=None, total_ms=round((time.perf_counter() - started) * 1000))
+        _last_run = {**stats, "finished_at": datetime.now(timezone.utc)}
+        return stats
+
+    # Số dòng trong cửa sổ của mốc mới, đếm TRƯỚC khi quét (dòng đến sau -> số khác -> lần sau quét lại)
+    new_window_count = db_hr.execute(
+        select(_count_in(_lookback_window(high_id, high_id))).select_from(EmployeeHR)
+    ).scalar()
+
+    where = None
+    if not full:
+        conditions = [_lookback_window(marks["employee_id"], high_id)]
+        if version_col is not None:
+            conditions.append(and_(version_col > marks["row_version"], version_col <= high_version))
+        where = or_(*conditions)
+
+    stats["accounts"] = sync_accounts(db_hr, db_auth, where)
+    stats["shareholders"] = crud_shareholder.sync_all_employees_to_shareholders(db_auth, db_hr, where)
+    if "error" in stats["shareholders"]:
+        raise RuntimeError(f"Đồng bộ cổ đông lỗi, giữ nguyên watermark: {stats['shareholders']['error']}")
+
+    crud_system.set_config(db_auth, WATERMARK_ID_KEY, str(high_id), "Đồng bộ HR: EmployeeID lớn nhất đã xử lý")
+    crud_system.set_config(db_auth, WATERMARK_WINDOW_KEY, str(new_window_count),
+                           "Đồng bộ HR: số nhân viên trong cửa sổ quét lại dưới watermark")
+    if version_col is not None:
+        crud_system.set_config(db_auth, WATERMARK_VERSION_KEY, str(high_version), "Đồng bộ HR: rowversion lớn nhất đã xử lý")
+    stats["total_ms"] = round((time.perf_counter() - started) * 1000)
+    _last_run = {**stats, "finished_at": datetime.now(timezone.utc)}
+    logger.info(f"HR sync ({stats['mode']}): {stats}")
+    return stats
+
+
+def sync_now(db_hr: Session, db_auth: Session, full: bool = False) -> dict:
+    """Chạy ngay trên session của người gọi (vd. lúc khởi động), chờ nếu job định kỳ đang chạy."""
+    with _run_lock:
+        return sync_incremental(db_hr, db_auth, full=full)
+
+
+def _run_job(full: bool):
+    if not _run_lock.acquire(blocking=False):
+        logger.info("HR sync already running, skipped")
+        return
+    db_hr = SessionLocalSQLServer.session_factory()
+    db_auth = SessionLocalAuth.session_factory()
+    try:
+        sync_incremental(db_hr, db_auth, full=full)
+    except Exception as e:
+        db_auth.rollback()
+        logger.error(f"HR sync error: {e}")
+    finally:
+        db_hr.close()
+        db_auth.close()
+        _run_lock.release()
+
+
+def run_incremental():
+    _run_job(full=False)
+
+
+def run_full_rescan():
+    _run_job(full=True)
+
+
+def request_full_rescan() -> bool:
+    """Lên lịch quét toàn bộ ngay trên scheduler. False nếu scheduler chưa chạy."""
+    if _scheduler is None or not _scheduler.running:
+        return False
+    _scheduler.add_job(run_full_rescan, 'date', run_date=datetime.now(), id=FULL_RESCAN_JOB_ID, replace_existing=True)
+    return True
+
+
+def attach_scheduler(scheduler):
+    global _scheduler
+    _scheduler = scheduler
+    scheduler.add_job(
+        run_incremental, 'interval', minutes=settings.HR_SYNC_INTERVAL_MINUTES,
+        id=INCREMENTAL_JOB_ID, replace_existing=True, max_instances=1, coalesce=True
+    )
+    if settings.HR_SYNC_FULL_RESCAN_MINUTES > 0:
+        scheduler.add_job(
+            run_full_rescan, 'interval', minutes=settings.HR_SYNC_FULL_RESCAN_MINUTES,
+            id=PERIODIC_FULL_RESCAN_JOB_ID, replace_existing=True, max_instances=1, coalesce=True
+        )
+
+
+def status(db_auth: Session) -> dict:
+    return {
+        "watermarks": watermarks(db_auth),
+        "change_column": settings.HR_SYNC_CHANGE_COLUMN or None,
+        "interval_minutes": settings.HR_SYNC_INTERVAL_MINUTES,
+        "id_lookback": settings.HR_SYNC_ID_LOOKBACK,
+        "full_rescan_minutes": settings.HR_SYNC_FULL_RESCAN_MINUTES,
+        "running": _run_lock.locked(),
+        "last_run": _last_run,
+    }
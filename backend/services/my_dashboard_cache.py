@@ -0,0 +1,54 @@
+# backend/services/my_dashboard_cache.py
+"""
+Cache payload /reports/my-dashboard-summary theo từng nhân viên (employee_id_link).
+
+Dữ liệu cá nhân chỉ đổi vài lần mỗi tháng nên payload được giữ trong bộ nhớ
+kèm ETag; các hàm ghi lương / chấm công / hồ sơ gọi `invalidate(employee_id)`.
+Khóa cache gồm cả ngày hiện tại (payload phụ thuộc tháng hiện tại, sinh nhật).
+TTL giới hạn độ trễ khi chạy nhiều worker (mỗi worker có cache riêng).
+"""
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+
+from core.config import settings
+from core.http_cache import make_etag
+
+_lock = threading.Lock()
+_entries = OrderedDict()  # employee_id -> (day, payload, etag, stored_at)
+
+
+def get(employee_id: int):
+    """Trả về (payload, etag) nếu còn hợp lệ, ngược lại None."""
+    with _lock:
+        entry = _entries.get(employee_id)
+        if entry is None:
+            return None
+        day, payload, etag, stored_at = entry
+        if day != date.today() or time.monotonic() - stored_at > settings.MY_DASHBOARD_CACHE_TTL_SECONDS:
+            del _entries[employee_id]
+            return None
+        _entries.move_to_end(employee_id)
+        return payload, etag
+
+
+def put(employee_id: int, payload: dict):
+    """Lưu payload và trả về (payload, etag)."""
+    etag = make_etag(payload)
+    with _lock:
+        _entries[employee_id] = (date.today(), payload, etag, time.monotonic())
+        _entries.move_to_end(employee_id)
+        while len(_entries) > settings.MY_DASHBOARD_CACHE_MAX_ENTRIES:
+            _entries.popitem(last=False)
+    return payload, etag
+
+
+def invalidate(employee_id: int):
+    with _lock:
+        _entries.pop(employee_id, None)
+
+
+def invalidate_all():
+    with _lock:
+        _entries.clear()
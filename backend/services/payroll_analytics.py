@@ -0,0 +1,161 @@
+# backend/services/payroll_analytics.py
+"""
+Phân tích phân phối lương (PAYROLL) bằng NumPy.
+
+Một truy vấn chiếu (projected) duy nhất lấy các cột cần thiết trong khoảng
+tháng, nạp thành mảng NumPy rồi tính theo nhóm (phòng ban / chức vụ / toàn
+công ty) x tháng hoàn toàn bằng phép toán vector:
+trung vị, p10/p90, IQR, trung bình, độ lệch chuẩn, hệ số Gini và chênh lệch
+so với tháng trước - không lặp Python theo từng dòng, không truy vấn SQL theo nhóm.
+"""
+from datetime import date
+
+import numpy as np
+from sqlalchemy import select, cast, Float, extract
+
+from core import date_keys
+from models import Salary, EmployeePayroll, DepartmentPayroll, PositionPayroll
+
+DIMENSIONS = ("department", "position", "company")
+
+
+def load_salary_arrays(db_payroll, from_month: date = None, to_month: date = None) -> dict:
+    """Nạp (month_key, DepartmentID, PositionID, NetSalary) thành các mảng NumPy."""
+    start, end = date_keys.months_range(from_month, to_month)
+    month_key = extract("year", Salary.SalaryMonth) * 100 + extract("month", Salary.SalaryMonth)
+    stmt = select(
+        month_key,
+        EmployeePayroll.DepartmentID,
+        EmployeePayroll.PositionID,
+        cast(Salary.NetSalary, Float)
+    ).join(EmployeePayroll, Salary.EmployeeID == EmployeePayroll.EmployeeID)\
+     .where(date_keys.in_range(Salary.SalaryMonth, start, end))
+
+    # Tuple thô từ cursor DBAPI: np.array đọc thẳng; với danh sách Row, NumPy phải dò
+    # giao thức sequence của từng Row (~30 lần chậm hơn ở 12k dòng)
+    result = db_payroll.connection().execute(stmt)
+    try:
+        rows = result.cursor.fetchall()
+    finally:
+        result.close()
+    if not rows:
+        empty_i, empty_f = np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+        return {"month": empty_i, "department": empty_i, "position": empty_i, "net": empty_f}
+
+    data = np.array(rows, dtype=np.float64)  # None -> nan
+    ids = np.nan_to_num(data[:, :3], nan=0).astype(np.int64)
+    return {
+        "month": ids[:, 0],
+        "department": ids[:, 1],
+        "position": ids[:, 2],
+        "net": np.nan_to_num(data[:, 3], nan=0.0),
+    }
+
+
+def grouped_stats(group_ids: np.ndarray, month_keys: np.ndarray, values: np.ndarray) -> dict:
+    """
+    Thống kê theo cặp (nhóm, tháng). Trả về dict các mảng cùng độ dài (1 phần tử / cặp),
+    sắp xếp theo nhóm rồi tháng.
+    """
+    if values.size == 0:
+        return {"group": group_ids[:0], "month": month_keys[:0], "count": group_ids[:0]}
+
+    order = np.lexsort((values, month_keys, group_ids))
+    g, m, v = group_ids[order], month_keys[order], values[order]
+
+    new_segment = np.empty(v.size, dtype=bool)
+    new_segment[0] = True
+    new_segment[1:] = (g[1:] != g[:-1]) | (m[1:] != m[:-1])
+    starts = np.flatnonzero(new_segment)
+    counts = np.diff(np.append(starts, v.size))
+
+    def percentile(p):
+        # Nội suy tuyến tính trong từng đoạn đã sắp xếp (giống numpy.percentile 'linear')
+        pos = starts + p * (counts - 1)
+        lo = np.floor(pos).astype(np.int64)
+        hi = np.ceil(pos).astype(np.int64)
+        return v[lo] + (v[hi] - v[lo]) * (pos - lo)
+
+    sums = np.add.reduceat(v, starts)
+    mean = sums / counts
+    deviation = v - np.repeat(mean, counts)
+    std = np.sqrt(np.add.reduceat(deviation * deviation, starts) / counts)
+
+    # Gini = 2*sum(i*x_i) / (n*sum(x)) - (n+1)/n, với x tăng dần và i = 1..n trong nhóm
+    ranks = np.arange(v.size) - np.repeat(starts, counts) + 1
+    weighted = np.add.reduceat(ranks * v, starts)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        gini = np.where(sums > 0, 2 * weighted / (counts * sums) - (counts + 1) / counts, 0.0)
+
+    p25, median, p75 = percentile(0.25), percentile(0.5), percentile(0.75)
+    seg_group, seg_month = g[starts], m[starts]
+
+    # Chênh lệch so với tháng liền trước có dữ liệu của cùng nhóm
+    has_prev = np.zeros(starts.size, dtype=bool)
+    has_prev[1:] = seg_group[1:] == seg_group[:-1]
+    prev_median = np.where(has_prev, np.roll(median, 1), np.nan)
+    prev_total = np.where(has_prev, np.roll(sums, 1), np.nan)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        median_delta_pct = np.where(prev_median > 0, (median - prev_median) / prev_median * 100, np.nan)
+
+    return {
+        "group": seg_group,
+        "month": seg_month,
+        "count": counts,
+        "total": sums,
+        "mean": mean,
+        "std": std,
+        "median": median,
+        "p10": percentile(0.10),
+        "p90": percentile(0.90),
+        "iqr": p75 - p25,
+        "gini": gini,
+        "median_delta": median - prev_median,
+        "median_delta_pct": median_delta_pct,
+        "total_delta": sums - prev_total,
+    }
+
+
+def _to_number(value, digits: int = 2):
+    value = float(value)
+    return None if np.isnan(value) else round(value, digits)
+
+
+def _format(stats: dict, names: dict) -> list:
+    """Chuyển các mảng thống kê sang JSON: nhóm -> danh sách theo tháng (vòng lặp theo nhóm-tháng)."""
+    metrics = [k for k in stats if k not in ("group", "month", "count")]
+    columns = {k: stats[k].tolist() for k in stats}
+    groups = {}
+    for i, group_id in enumerate(columns["group"]):
+        month = columns["month"][i]
+        entry = groups.setdefault(group_id, {
+            "id": group_id or None,
+            "name": names.get(group_id, "Chưa phân loại" if not group_id else f"#{group_id}"),
+            "months": []
+        })
+        item = {"month": f"{month // 100:04d}-{month % 100:02d}", "count": columns["count"][i]}
+        item.update({k: _to_number(columns[k][i], 4 if k == "gini" else 2) for k in metrics})
+        entry["months"].append(item)
+    return list(groups.values())
+
+
+def payroll_analytics(db_payroll, from_month: date = None, to_month: date = None, dimensions=DIMENSIONS) -> dict:
+    arrays = load_salary_arrays(db_payroll, from_month, to_month)
+    result = {
+        "from_month": from_month.strftime("%Y-%m") if from_month else None,
+        "to_month": to_month.strftime("%Y-%m") if to_month else None,
+        "row_count": int(arrays["net"].size),
+    }
+
+    if "department" in dimensions:
+        names = dict(db_payroll.query(DepartmentPayroll.DepartmentID, DepartmentPayroll.DepartmentName).all())
+        result["by_department"] = _format(grouped_stats(arrays["department"], arrays["month"], arrays["net"]), names)
+    if "position" in dimensions:
+        names = dict(db_payroll.query(PositionPayroll.PositionID, PositionPayroll.PositionName).all())
+        result["by_position"] = _format(grouped_stats(arrays["position"], arrays["month"], arrays["net"]), names)
+    if "company" in dimensions:
+        company = np.zeros(arrays["net"].size, dtype=np.int64)
+        stats = grouped_stats(company, arrays["month"], arrays["net"])
+        formatted = _format(stats, {0: "Toàn công ty"})
+        result["company"] = formatted[0]["months"] if formatted else []
+    return result
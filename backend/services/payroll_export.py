@@ -0,0 +1,128 @@
+# backend/services/payroll_export.py
+"""
+Xuất dữ liệu lương / chấm công hàng loạt dạng stream (CSV hoặc NDJSON).
+
+- Đọc PAYROLL bằng server-side cursor (execution option `yield_per`), xử lý
+  từng lô `EXPORT_CHUNK_SIZE` dòng nên bộ nhớ không tăng theo số dòng.
+- Tên nhân viên lấy từ HUMAN_2025 theo từng lô ID (IN tối đa 1000 phần tử),
+  có cache theo EmployeeID trong phạm vi 1 lần xuất.
+- Các generator tự đóng session khi kết thúc (kể cả khi client ngắt kết nối).
+"""
+import csv
+import io
+import json
+from datetime import date
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from core import date_keys
+from core.batching import chunked
+from models import Salary, Attendance, EmployeePayroll, DepartmentPayroll, EmployeeHR
+
+EXPORT_CHUNK_SIZE = 2000
+
+SALARY_COLUMNS = [
+    "SalaryID", "EmployeeID", "FullName", "DepartmentID", "DepartmentName",
+    "SalaryMonth", "BaseSalary", "Bonus", "Deductions", "NetSalary"
+]
+ATTENDANCE_COLUMNS = [
+    "AttendanceID", "EmployeeID", "FullName", "DepartmentID", "DepartmentName",
+    "AttendanceMonth", "WorkDays", "AbsentDays", "LeaveDays"
+]
+
+
+def _salary_statement(start: date, end: date, department_id: int = None):
+    stmt = select(
+        Salary.SalaryID, Salary.EmployeeID, EmployeePayroll.DepartmentID,
+        Salary.SalaryMonth, Salary.BaseSalary, Salary.Bonus, Salary.Deductions, Salary.NetSalary
+    ).join(EmployeePayroll, Salary.EmployeeID == EmployeePayroll.EmployeeID)\
+     .where(date_keys.in_range(Salary.SalaryMonth, start, end))
+    if department_id:
+        stmt = stmt.where(EmployeePayroll.DepartmentID == department_id)
+    return stmt.order_by(Salary.SalaryMonth, Salary.EmployeeID)
+
+
+def _attendance_statement(start: date, end: date, department_id: int = None):
+    stmt = select(
+        Attendance.AttendanceID, Attendance.EmployeeID, EmployeePayroll.DepartmentID,
+        Attendance.AttendanceMonth, Attendance.WorkDays, Attendance.AbsentDays, Attendance.LeaveDays
+    ).join(EmployeePayroll, Attendance.EmployeeID == EmployeePayroll.EmployeeID)\
+     .where(date_keys.in_range(Attendance.AttendanceMonth, start, end))
+    if department_id:
+        stmt = stmt.where(EmployeePayroll.DepartmentID == department_id)
+    return stmt.order_by(Attendance.AttendanceMonth, Attendance.EmployeeID)
+
+
+def _iter_enriched(db_payroll: Session, db_hr: Session, stmt):
+    """Duyệt kết quả theo lô và gắn FullName (HR) + DepartmentName (Payroll)."""
+    dept_names = dict(db_payroll.query(DepartmentPayroll.DepartmentID, DepartmentPayroll.DepartmentName).all())
+    names = {}
+
+    result = db_payroll.execute(stmt.execution_options(yield_per=EXPORT_CHUNK_SIZE))
+    for partition in result.partitions():
+        missing = {row.EmployeeID for row in partition if row.EmployeeID not in names}
+        for ids in chunked(missing):
+            for emp_id, full_name in db_hr.query(EmployeeHR.EmployeeID, EmployeeHR.FullName)\
+                    .filter(EmployeeHR.EmployeeID.in_(ids)).all():
+                names[emp_id] = full_name
+            names.update({i: None for i in ids if i not in names})
+
+        for row in partition:
+            data = row._asdict()
+            data["FullName"] = names.get(row.EmployeeID)
+            data["DepartmentName"] = dept_names.get(row.DepartmentID)
+            yield data
+
+
+def iter_rows(kind: str, db_payroll: Session, db_hr: Session,
+              from_month: date = None, to_month: date = None, department_id: int = None):
+    """kind = 'salaries' | 'attendance'. Sinh từng dòng (dict) theo thứ tự tháng, nhân viên."""
+    start, end = date_keys.months_range(from_month, to_month)
+    if kind == "salaries":
+        stmt = _salary_statement(start, end, department_id)
+    else:
+        stmt = _attendance_statement(start, end, department_id)
+    return _iter_enriched(db_payroll, db_hr, stmt)
+
+
+def columns_for(kind: str):
+    return SALARY_COLUMNS if kind == "salaries" else ATTENDANCE_COLUMNS
+
+
+def _json_default(value):
+    if isinstance(value, date):
+        return value.isoformat()
+    return str(value)  # Decimal -> chuỗi để không mất độ chính xác
+
+
+def stream(kind: str, fmt: str, db_payroll: Session, db_hr: Session, **filters):
+    """
+    Generator trả về các khối văn bản (CSV/NDJSON) để đưa vào StreamingResponse.
+    Đóng cả 2 session khi kết thúc.
+    """
+    columns = columns_for(kind)
+    try:
+        rows = iter_rows(kind, db_payroll, db_hr, **filters)
+        buffer = io.StringIO()
+        if fmt == "ndjson":
+            for i, row in enumerate(rows, 1):
+                buffer.write(json.dumps({c: row[c] for c in columns}, default=_json_default, ensure_ascii=False))
+                buffer.write("\n")
+                if i % EXPORT_CHUNK_SIZE == 0:
+                    yield buffer.getvalue()
+                    buffer.seek(0); buffer.truncate()
+        else:
+            buffer.write("\ufeff")  # BOM để Excel đọc đúng tiếng Việt
+            writer = csv.writer(buffer)
+            writer.writerow(columns)
+            for i, row in enumerate(rows, 1):
+                writer.writerow([row[c] for c in columns])
+                if i % EXPORT_CHUNK_SIZE == 0:
+                    yield buffer.getvalue()
+                    buffer.seek(0); buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue()
+    finally:
+        db_payroll.close()
+        db_hr.close()
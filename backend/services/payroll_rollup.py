@@ -0,0 +1,299 @@
+# backend/services/payroll_rollup.py
+"""
+Bảng tổng hợp lương theo tháng `payroll_month_rollup` (PAYROLL - MySQL).
+
+Mỗi dòng = (SalaryMonth, DepartmentID): số bản ghi lương, tổng Base/Bonus/
+Deductions/Net và lương thực nhận trung bình. Bảng được cập nhật tăng dần
+(delta) trong CÙNG transaction với lệnh ghi lương, nên Dashboard và cảnh báo
+chỉ đọc vài chục dòng thay vì quét toàn bộ bảng `salaries`.
+
+Lương chủ yếu do hệ thống payroll cũ ghi thẳng vào MySQL (không qua API), nên
+`reconcile()` chạy lúc khởi động và định kỳ trên scheduler: so MAX(SalaryMonth) /
+số bản ghi với rollup, và so số bản ghi + tổng Net của PAYROLL_ROLLUP_RECENT_MONTHS
+tháng gần nhất; tháng nào lệch thì dựng lại tháng đó.
+
+Dựng lại toàn bộ (hoặc 1 tháng):
+    python -m services.payroll_rollup --rebuild [--month 2024-05]
+"""
+import argparse
+import logging
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal
+
+from sqlalchemy import func, select, insert, delete
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from models import PayrollMonthRollup, Salary, EmployeePayroll, DepartmentPayroll
+
+logger = logging.getLogger(__name__)
+
+RECONCILE_JOB_ID = "payroll_rollup_reconcile"
+UNASSIGNED_DEPT = 0  # DepartmentID dùng cho nhân viên chưa gán phòng ban
+
+_ZERO = Decimal(0)
+
+
+def _dept_key(department_id) -> int:
+    return department_id if department_id else UNASSIGNED_DEPT
+
+
+def _apply(db_payroll: Session, month: date, department_id: int, count: int,
+           base: Decimal, bonus: Decimal, deductions: Decimal, net: Decimal):
+    """Cộng (hoặc trừ, nếu giá trị âm) 1 phần đóng góp vào dòng tổng hợp."""
+    row = db_payroll.query(PayrollMonthRollup).filter(
+        PayrollMonthRollup.SalaryMonth == month,
+        PayrollMonthRollup.DepartmentID == department_id
+    ).with_for_update().populate_existing().first()
+
+    if row is None:
+        if count <= 0:
+            return
+        row = PayrollMonthRollup(
+            SalaryMonth=month, DepartmentID=department_id, EmployeeCount=0,
+            TotalBase=_ZERO, TotalBonus=_ZERO, TotalDeductions=_ZERO, TotalNet=_ZERO, AvgNet=_ZERO
+        )
+        db_payroll.add(row)
+
+    row.EmployeeCount = (row.EmployeeCount or 0) + count
+    if row.EmployeeCount <= 0:
+        db_payroll.delete(row)
+        return
+    row.TotalBase = (row.TotalBase or _ZERO) + base
+    row.TotalBonus = (row.TotalBonus or _ZERO) + bonus
+    row.TotalDeductions = (row.TotalDeductions or _ZERO) + deductions
+    row.TotalNet = (row.TotalNet or _ZERO) + net
+    row.AvgNet = (row.TotalNet / row.EmployeeCount).quantize(Decimal("0.01"))
+
+
+def salary_contribution(salary: Salary, department_id) -> tuple:
+    """Ảnh chụp phần đóng góp của 1 bản ghi lương (dùng trước/sau khi sửa)."""
+    return (
+        salary.SalaryMonth, _dept_key(department_id),
+        salary.BaseSalary or _ZERO, salary.Bonus or _ZERO,
+        salary.Deductions or _ZERO, salary.NetSalary or _ZERO
+    )
+
+
+def apply_salary_change(db_payroll: Session, old: tuple = None, new: tuple = None):
+    """
+    Cập nhật rollup cho 1 bản ghi lương: trừ phần cũ (nếu có), cộng phần mới (nếu có).
+    Không commit - người gọi commit cùng với lệnh ghi lương.
+    """
+    if old == new:
+        return
+    if old:
+        month, dept, base, bonus, deductions, net = old
+        _apply(db_payroll, month, dept, -1, -base, -bonus, -deductions, -net)
+    if new:
+        month, dept, base, bonus, deductions, net = new
+        _apply(db_payroll, month, dept, 1, base, bonus, deductions, net)
+
+
+def record_salaries(db_payroll: Session, contributions):
+    """
+    Dành cho các tác vụ ghi lương hàng loạt: gộp các phần đóng góp
+    (từ `salary_contribution`) theo (tháng, phòng ban) rồi cập nhật mỗi dòng 1 lần.
+    """
+    grouped = defaultdict(lambda: [0, _ZERO, _ZERO, _ZERO, _ZERO])
+    for month, dept, base, bonus, deductions, net in contributions:
+        g = grouped[(month, dept)]
+        g[0] += 1; g[1] += base; g[2] += bonus; g[3] += deductions; g[4] += net
+    for (month, dept), (count, base, bonus, deductions, net) in grouped.items():
+        _apply(db_payroll, month, dept, count, base, bonus, deductions, net)
+
+
+def reassign_employee_department(db_payroll: Session, employee_id: int, old_dept, new_dept):
+    """Chuyển phần lương của 1 nhân viên sang phòng ban mới (khi điều chuyển)."""
+    old_dept, new_dept = _dept_key(old_dept), _dept_key(new_dept)
+    if old_dept == new_dept:
+        return
+    per_month = db_payroll.query(
+        Salary.SalaryMonth, func.count(Salary.SalaryID),
+        func.sum(Salary.BaseSalary), func.sum(Salary.Bonus),
+        func.sum(Salary.Deductions), func.sum(Salary.NetSalary)
+    ).filter(Salary.EmployeeID == employee_id).group_by(Salary.SalaryMonth).all()
+
+    for month, count, base, bonus, deductions, net in per_month:
+        base, bonus, deductions, net = (base or _ZERO), (bonus or _ZERO), (deductions or _ZERO), (net or _ZERO)
+        _apply(db_payroll, month, old_dept, -count, -base, -bonus, -deductions, -net)
+        _apply(db_payroll, month, new_dept, count, base, bonus, deductions, net)
+
+
+def rebuild(db_payroll: Session, months=None) -> int:
+    """Dựng lại rollup từ bảng `salaries` (toàn bộ, hoặc chỉ các tháng chỉ định)."""
+    dept_expr = func.coalesce(EmployeePayroll.DepartmentID, UNASSIGNED_DEPT)
+    source = select(
+        Salary.SalaryMonth,
+        dept_expr,
+        func.count(Salary.SalaryID),
+        func.coalesce(func.sum(Salary.BaseSalary), 0),
+        func.coalesce(func.sum(Salary.Bonus), 0),
+        func.coalesce(func.sum(Salary.Deductions), 0),
+        func.coalesce(func.sum(Salary.NetSalary), 0),
+        func.coalesce(func.avg(Salary.NetSalary), 0),
+    ).select_from(Salary).outerjoin(
+        EmployeePayroll, Salary.EmployeeID == EmployeePayroll.EmployeeID
+    ).group_by(Salary.SalaryMonth, dept_expr)
+
+    wipe = delete(PayrollMonthRollup)
+    if months:
+        source = source.where(Salary.SalaryMonth.in_(list(months)))
+        wipe = wipe.where(PayrollMonthRollup.SalaryMonth.in_(list(months)))
+
+    try:
+        db_payroll.execute(wipe)
+        result = db_payroll.execute(insert(PayrollMonthRollup).from_select([
+            "SalaryMonth", "DepartmentID", "EmployeeCount", "TotalBase",
+            "TotalBonus", "TotalDeductions", "TotalNet", "AvgNet"
+        ], source))
+        db_payroll.commit()
+    except Exception:
+        db_payroll.rollback()
+        raise
+    return result.rowcount
+
+
+def _money(value) -> Decimal:
+    return Decimal(str(value or 0)).quantize(Decimal("0.01"))
+
+
+def _per_month(db_payroll: Session, month_col, count_expr, net_expr, since=None) -> dict:
+    query = db_payroll.query(month_col, count_expr, net_expr).group_by(month_col)
+    if since is not None:
+        query = query.filter(month_col >= since)
+    return {month: (int(count or 0), _money(net)) for month, count, net in query}
+
+
+def stale_months(db_payroll: Session, recent_months: int = None) -> list:
+    """
+    Các tháng mà rollup lệch với `salaries`. Mặc định chỉ so `recent_months` tháng gần nhất;
+    nếu MAX(SalaryMonth) hoặc tổng số bản ghi khác nhau thì so toàn bộ các tháng.
+    """
+    recent_months = recent_months or settings.PAYROLL_ROLLUP_RECENT_MONTHS
+    source_total = db_payroll.query(func.max(Salary.SalaryMonth), func.count(Salary.SalaryID)).one()
+    rollup_total = db_payroll.query(
+        func.max(PayrollMonthRollup.SalaryMonth), func.coalesce(func.sum(PayrollMonthRollup.EmployeeCount), 0)
+    ).one()
+
+    since = None
+    if (source_total[0], int(source_total[1] or 0)) == (rollup_total[0], int(rollup_total[1] or 0)):
+        recent = [r[0] for r in db_payroll.query(Salary.SalaryMonth).distinct()
+                  .order_by(Salary.SalaryMonth.desc()).limit(recent_months)]
+        if not recent:
+            return []
+        since = min(recent)
+
+    source = _per_month(db_payroll, Salary.SalaryMonth, func.count(Salary.SalaryID),
+                        func.sum(Salary.NetSalary), since)
+    rolled = _per_month(db_payroll, PayrollMonthRollup.SalaryMonth, func.sum(PayrollMonthRollup.EmployeeCount),
+                        func.sum(PayrollMonthRollup.TotalNet), since)
+    return sorted(m for m in set(source) | set(rolled) if source.get(m) != rolled.get(m))
+
+
+def reconcile(db_payroll: Session = None) -> list:
+    """Dựng lại các tháng lệch (lương ghi từ hệ thống khác). Trả về danh sách tháng đã dựng lại."""
+    own_session = db_payroll is None
+    if own_session:
+        from database import SessionLocalMySQL
+        db_payroll = SessionLocalMySQL.session_factory()
+    try:
+        months = stale_months(db_payroll)
+        if months:
+            rebuild(db_payroll, months)
+            logger.info(f"Payroll rollup rebuilt for {len(months)} month(s): {months[:12]}")
+            from services import dashboard_snapshot  # tránh import vòng (snapshot đọc rollup)
+            dashboard_snapshot.request_rebuild()
+        return months
+    except Exception as e:
+        db_payroll.rollback()
+        logger.error(f"Payroll rollup reconcile error: {e}")
+        if not own_session:
+            raise
+        return []
+    finally:
+        if own_session:
+            db_payroll.close()
+
+
+def attach_scheduler(scheduler):
+    scheduler.add_job(
+        reconcile, 'interval', minutes=settings.PAYROLL_ROLLUP_RECONCILE_MINUTES,
+        id=RECONCILE_JOB_ID, replace_existing=True, max_instances=1, coalesce=True
+    )
+
+
+def ensure_table(engine, db_payroll: Session):
+    """Tạo bảng rollup nếu chưa có; dựng lần đầu nếu trống, ngược lại dựng lại các tháng lệch."""
+    PayrollMonthRollup.__table__.create(bind=engine, checkfirst=True)
+    if db_payroll.query(PayrollMonthRollup.SalaryMonth).first() is None:
+        rebuild(db_payroll)
+    else:
+        reconcile(db_payroll)
+
+
+# --- Các hàm đọc cho Báo cáo & Cảnh báo ---
+
+def latest_months(db_payroll: Session, limit: int):
+    """Các tháng gần nhất có dữ liệu lương (mới nhất trước)."""
+    rows = db_payroll.query(PayrollMonthRollup.SalaryMonth).distinct()\
+        .order_by(PayrollMonthRollup.SalaryMonth.desc()).limit(limit).all()
+    return [r[0] for r in rows]
+
+
+def month_totals(db_payroll: Session, month: date):
+    """(TotalNet, TotalBase, TotalBonus) của 1 tháng trên toàn công ty."""
+    return db_payroll.query(
+        func.sum(PayrollMonthRollup.TotalNet),
+        func.sum(PayrollMonthRollup.TotalBase),
+        func.sum(PayrollMonthRollup.TotalBonus)
+    ).filter(PayrollMonthRollup.SalaryMonth == month).first()
+
+
+def department_averages(db_payroll: Session, month: date):
+    """[(DepartmentName, AvgNet)] của 1 tháng (bỏ qua nhân viên chưa có phòng ban)."""
+    return db_payroll.query(
+        DepartmentPayroll.DepartmentName, PayrollMonthRollup.AvgNet
+    ).join(
+        DepartmentPayroll, PayrollMonthRollup.DepartmentID == DepartmentPayroll.DepartmentID
+    ).filter(PayrollMonthRollup.SalaryMonth == month).all()
+
+
+def monthly_net_trend(db_payroll: Session, limit: int):
+    """[(SalaryMonth, TotalNet)] của `limit` tháng gần nhất (mới nhất trước)."""
+    return db_payroll.query(
+        PayrollMonthRollup.SalaryMonth, func.sum(PayrollMonthRollup.TotalNet)
+    ).group_by(PayrollMonthRollup.SalaryMonth)\
+     .order_by(PayrollMonthRollup.SalaryMonth.desc())\
+     .limit(limit).all()
+
+
+if __name__ == "__main__":
+    from database import SessionLocalMySQL, engine_mysql
+
+    parser = argparse.ArgumentParser(description="Quản lý bảng payroll_month_rollup")
+    parser.add_argument("--rebuild", action="store_true", help="Dựng lại bảng tổng hợp từ bảng salaries")
+    parser.add_argument("--month", help="Chỉ dựng lại 1 tháng (YYYY-MM)")
+    args = parser.parse_args()
+
+    if not args.rebuild:
+        parser.print_help()
+    else:
+        db = SessionLocalMySQL()
+        try:
+            PayrollMonthRollup.__table__.create(bind=engine_mysql, checkfirst=True)
+            months = None
+            if args.month:
+                year, month = (int(x) for x in args.month.split("-"))
+                start = date(year, month, 1)
+                end = date(year + (month == 12), month % 12 + 1, 1)
+                months = [r[0] for r in db.query(Salary.SalaryMonth).filter(
+                    Salary.SalaryMonth >= start, Salary.SalaryMonth < end
+                ).distinct().all()]
+                if not months:
+                    months = [start]
+            count = rebuild(db, months)
+            print(f"✅ Đã dựng lại payroll_month_rollup: {count} dòng.")
+        finally:
+            db.close()
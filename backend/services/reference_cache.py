@@ -0,0 +1,126 @@
+# backend/services/reference_cache.py
+"""
+Cache trong bộ nhớ cho dữ liệu tham chiếu nhỏ: Phòng ban & Chức vụ (HUMAN_2025).
+
+- Nạp cả 2 bảng một lần (khi khởi động hoặc lần đọc đầu tiên), gắn `version`
+  tăng dần và ETag theo nội dung -> endpoint trả 304 khi client đã có bản mới nhất.
+- `invalidate()` được gọi từ các hàm create/update/delete phòng ban, chức vụ
+  (crud_hr); lần đọc kế tiếp sẽ nạp lại. Ngoài ra tự nạp lại sau
+  `REFERENCE_CACHE_TTL_SECONDS` phòng khi dữ liệu bị sửa trực tiếp trong CSDL.
+- `department_name()` / `position_name()` giúp code khác tra tên theo ID mà
+  không cần JOIN.
+"""
+import logging
+import threading
+import time
+
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from core.http_cache import make_etag
+from database import SessionLocalSQLServer
+from models import DepartmentHR, PositionHR
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_state = {
+    "version": 0,
+    "loaded_at": None,  # time.monotonic() của lần nạp gần nhất, None = cần nạp lại
+    "departments": [],
+    "positions": [],
+    "department_names": {},
+    "position_names": {},
+    "etags": {},
+}
+
+
+def _load(db_hr: Session):
+    global _state
+    departments = [
+        {"DepartmentID": d.DepartmentID, "DepartmentName": d.DepartmentName}
+        for d in db_hr.query(DepartmentHR.DepartmentID, DepartmentHR.DepartmentName)
+        .order_by(DepartmentHR.DepartmentID).all()
+    ]
+    positions = [
+        {"PositionID": p.PositionID, "PositionName": p.PositionName}
+        for p in db_hr.query(PositionHR.PositionID, PositionHR.PositionName)
+        .order_by(PositionHR.PositionID).all()
+    ]
+    # Thay cả dict (không sửa tại chỗ) để luồng đọc luôn thấy một bản nhất quán
+    _state = {
+        "version": _state["version"] + 1,
+        "loaded_at": time.monotonic(),
+        "departments": departments,
+        "positions": positions,
+        "department_names": {d["DepartmentID"]: d["DepartmentName"] for d in departments},
+        "position_names": {p["PositionID"]: p["PositionName"] for p in positions},
+        "etags": {"departments": make_etag(departments), "positions": make_etag(positions)},
+    }
+
+
+def _is_stale(state: dict) -> bool:
+    loaded_at = state["loaded_at"]
+    return loaded_at is None or time.monotonic() - loaded_at > settings.REFERENCE_CACHE_TTL_SECONDS
+
+
+def _ensure(db_hr: Session = None) -> dict:
+    state = _state
+    if not _is_stale(state):
+        return state
+    with _lock:
+        if _is_stale(_state):
+            own_session = db_hr is None
+            db_hr = db_hr or SessionLocalSQLServer.session_factory()
+            try:
+                _load(db_hr)
+            finally:
+                if own_session:
+                    db_hr.close()
+    return _state
+
+
+def warm(db_hr: Session):
+    """Nạp sẵn khi khởi động."""
+    with _lock:
+        _load(db_hr)
+    logger.info(f"Reference cache warmed (version {_state['version']})")
+
+
+def invalidate():
+    """Đánh dấu cần nạp lại (gọi sau khi thêm/sửa/xóa phòng ban, chức vụ)."""
+    global _state
+    with _lock:
+        _state = {**_state, "loaded_at": None}
+
+
+def version(db_hr: Session = None) -> int:
+    return _ensure(db_hr)["version"]
+
+
+def get_departments(db_hr: Session = None):
+    """(danh sách phòng ban dạng dict, ETag)."""
+    state = _ensure(db_hr)
+    return state["departments"], state["etags"]["departments"]
+
+
+def get_positions(db_hr: Session = None):
+    """(danh sách chức vụ dạng dict, ETag)."""
+    state = _ensure(db_hr)
+    return state["positions"], state["etags"]["positions"]
+
+
+def department_names(db_hr: Session = None) -> dict:
+    return _ensure(db_hr)["department_names"]
+
+
+def position_names(db_hr: Session = None) -> dict:
+    return _ensure(db_hr)["position_names"]
+
+
+def department_name(department_id, db_hr: Session = None, default=None):
+    return department_names(db_hr).get(department_id, default)
+
+
+def position_name(position_id, db_hr: Session = None, default=None):
+    return position_names(db_hr).get(position_id, default)
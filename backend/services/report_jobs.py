@@ -0,0 +1,315 @@
+# backend/services/report_jobs.py
+"""
+Hàng đợi job báo cáo chạy nền.
+
+Các báo cáo nặng (xuất lương/chấm công, phân tích nhiều năm, preview chia cổ
+tức cho toàn bộ cổ đông) không chạy trong thread của request nữa:
+- POST tạo job (bảng `report_jobs` - Auth DB) và trả về id ngay.
+- Pool worker giới hạn `REPORT_JOB_WORKERS` thread thực thi job, mỗi job tự mở
+  session riêng, nên pool kết nối của API vẫn dành cho truy vấn tương tác.
+- Kết quả ghi ra file trong `REPORT_JOB_DIR`, hết hạn sau `REPORT_JOB_TTL_HOURS`
+  (job `purge_expired` trên APScheduler dọn file + bản ghi).
+- Mỗi job ghi `worker_id` của tiến trình nhận nó, và tiến trình đó gia hạn
+  `heartbeat_at` định kỳ. Chỉ job của tiến trình khác đã quá hạn lease mới bị
+  đánh dấu lỗi, nên khi chạy nhiều worker uvicorn, worker khởi động lại không
+  làm hỏng job đang chạy của worker khác.
+"""
+import json
+import logging
+import os
+import socket
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from sqlalchemy import or_
+
+from core.config import settings
+from core import date_keys
+from database import SessionLocalAuth, SessionLocalSQLServer, SessionLocalMySQL
+from models import ReportJob
+from services import payroll_export
+
+logger = logging.getLogger(__name__)
+
+PURGE_JOB_ID = "report_jobs_purge"
+HEARTBEAT_JOB_ID = "report_jobs_heartbeat"
+ACTIVE_STATUSES = ("queued", "running")
+EXPORT_FORMATS = ("csv", "ndjson")
+
+# Định danh tiến trình (mỗi worker uvicorn / mỗi lần khởi động 1 giá trị)
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+_executor = None
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=settings.REPORT_JOB_WORKERS, thread_name_prefix="report-job")
+    return _executor
+
+
+def _json_default(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    if hasattr(value, "model_dump"):
+        return value.model_dump()
+    return str(value)
+
+
+def _month_param(params: dict, key: str):
+    return date_keys.parse_month(params[key]) if params.get(key) else None
+
+
+# --- Các loại job: hàm(params, đường_dẫn_file) -> (media_type, phần mở rộng) ---
+
+def _run_export(kind: str, params: dict, path: str):
+    fmt = params.get("format", "csv")
+    chunks = payroll_export.stream(
+        kind, fmt,
+        SessionLocalMySQL.session_factory(), SessionLocalSQLServer.session_factory(),
+        from_month=_month_param(params, "from_month"),
+        to_month=_month_param(params, "to_month"),
+        department_id=params.get("department_id")
+    )
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        for chunk in chunks:
+            f.write(chunk)
+    return ("text/csv; charset=utf-8" if fmt == "csv" else "application/x-ndjson"), fmt
+
+
+def _run_payroll_analytics(params: dict, path: str):
+    from services import payroll_analytics  # numpy: chỉ nạp khi chạy job phân tích đầu tiên
+    dimensions = params.get("group_by") or list(payroll_analytics.DIMENSIONS)
+    if isinstance(dimensions, str):
+        dimensions = [d.strip() for d in dimensions.split(",")]
+    db_payroll = SessionLocalMySQL.session_factory()
+    try:
+        result = payroll_analytics.payroll_analytics(
+            db_payroll, _month_param(params, "from_month"), _month_param(params, "to_month"), dimensions
+        )
+    finally:
+        db_payroll.close()
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False, default=_json_default)
+    return "application/json", "json"
+
+
+def _run_dividend_preview(params: dict, path: str):
+    from crud import crud_shareholder  # tránh import vòng (crud -> services)
+
+    db_auth = SessionLocalAuth.session_factory()
+    db_hr = SessionLocalSQLServer.session_factory()
+    try:
+        result = crud_shareholder.preview_dividend_payout(db_auth, db_hr, Decimal(str(params["total_profit"])))
+    finally:
+        db_auth.close()
+        db_hr.close()
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False, default=_json_default)
+    return "application/json", "json"
+
+
+JOB_KINDS = {
+    "export_salaries": lambda params, path: _run_export("salaries", params, path),
+    "export_attendance": lambda params, path: _run_export("attendance", params, path),
+    "payroll_analytics": _run_payroll_analytics,
+    "dividend_preview": _run_dividend_preview,
+}
+
+
+# --- Kiểm tra tham số theo loại job (trước khi lưu): params -> params đã chuẩn hóa, ValueError nếu sai ---
+
+def _validate_months(params: dict) -> dict:
+    cleaned = {}
+    for key in ("from_month", "to_month"):
+        if params.get(key):
+            try:
+                cleaned[key] = date_keys.parse_month(str(params[key])).strftime("%Y-%m")
+            except (TypeError, ValueError):
+                raise ValueError(f"{key} phải có dạng YYYY-MM")
+    if "from_month" in cleaned and "to_month" in cleaned and cleaned["from_month"] > cleaned["to_month"]:
+        raise ValueError("from_month phải nhỏ hơn hoặc bằng to_month")
+    return cleaned
+
+
+def _validate_export(params: dict) -> dict:
+    cleaned = _validate_months(params)
+    cleaned["format"] = params.get("format") or "csv"
+    if cleaned["format"] not in EXPORT_FORMATS:
+        raise ValueError(f"format hợp lệ: {', '.join(EXPORT_FORMATS)}")
+    if params.get("department_id") is not None:
+        try:
+            cleaned["department_id"] = int(params["department_id"])
+        except (TypeError, ValueError):
+            raise ValueError("department_id phải là số nguyên")
+    return cleaned
+
+
+def _validate_payroll_analytics(params: dict) -> dict:
+    from services import payroll_analytics
+
+    cleaned = _validate_months(params)
+    dimensions = params.get("group_by")
+    if dimensions:
+        if isinstance(dimensions, str):
+            dimensions = [d.strip() for d in dimensions.split(",")]
+        if not isinstance(dimensions, list) or any(d not in payroll_analytics.DIMENSIONS for d in dimensions):
+            raise ValueError(f"group_by hợp lệ: {', '.join(payroll_analytics.DIMENSIONS)}")
+        cleaned["group_by"] = dimensions
+    return cleaned
+
+
+def _validate_dividend_preview(params: dict) -> dict:
+    try:
+        total_profit = Decimal(str(params["total_profit"]))
+    except (KeyError, ArithmeticError):
+        raise ValueError("total_profit (số) là bắt buộc")
+    if not total_profit.is_finite() or total_profit <= 0:
+        raise ValueError("total_profit phải lớn hơn 0")
+    return {"total_profit": total_profit}
+
+
+JOB_VALIDATORS = {
+    "export_salaries": _validate_export,
+    "export_attendance": _validate_export,
+    "payroll_analytics": _validate_payroll_analytics,
+    "dividend_preview": _validate_dividend_preview,
+}
+
+
+def _set_status(job_id: str, **fields):
+    db_auth = SessionLocalAuth.session_factory()
+    try:
+        job = db_auth.get(ReportJob, job_id)
+        if job:
+            for k, v in fields.items():
+                setattr(job, k, v)
+            db_auth.commit()
+    finally:
+        db_auth.close()
+
+
+def _execute(job_id: str, kind: str, params: dict):
+    os.makedirs(settings.REPORT_JOB_DIR, exist_ok=True)
+    tmp_path = os.path.join(settings.REPORT_JOB_DIR, f"{job_id}.part")
+    _set_status(job_id, status="running", started_at=datetime.now())
+    try:
+        media_type, ext = JOB_KINDS[kind](params, tmp_path)
+        final_path = os.path.join(settings.REPORT_JOB_DIR, f"{job_id}.{ext}")
+        os.replace(tmp_path, final_path)
+        finished = datetime.now()
+        _set_status(
+            job_id, status="succeeded", finished_at=finished,
+            expires_at=finished + timedelta(hours=settings.REPORT_JOB_TTL_HOURS),
+            result_path=final_path, result_media_type=media_type,
+            result_filename=f"{kind}_{finished:%Y%m%d_%H%M%S}.{ext}"
+        )
+        logger.info(f"Report job {job_id} ({kind}) succeeded")
+    except Exception as e:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        message = str(getattr(e, "detail", e))[:500]
+        logger.error(f"Report job {job_id} ({kind}) failed: {message}")
+        finished = datetime.now()
+        _set_status(
+            job_id, status="failed", finished_at=finished, error=message,
+            expires_at=finished + timedelta(hours=settings.REPORT_JOB_TTL_HOURS)
+        )
+
+
+def submit(db_auth, kind: str, params: dict, user_email: str) -> ReportJob:
+    """Tạo job (trạng thái 'queued') và đưa vào pool worker."""
+    if kind not in JOB_KINDS:
+        raise ValueError(f"Loại báo cáo không hỗ trợ. Hợp lệ: {', '.join(JOB_KINDS)}")
+    params = JOB_VALIDATORS[kind](params or {})
+    job = ReportJob(
+        id=uuid.uuid4().hex, kind=kind, status="queued", created_by=user_email,
+        params=json.dumps(params, ensure_ascii=False, default=_json_default),
+        worker_id=WORKER_ID, heartbeat_at=datetime.now()
+    )
+    db_auth.add(job)
+    db_auth.commit()
+    db_auth.refresh(job)
+    _get_executor().submit(_execute, job.id, kind, dict(params))
+    return job
+
+
+def get_job(db_auth, job_id: str):
+    return db_auth.get(ReportJob, job_id)
+
+
+def get_jobs_for_user(db_auth, user_email: str, limit: int = 50):
+    return db_auth.query(ReportJob).filter(ReportJob.created_by == user_email)\
+        .order_by(ReportJob.created_at.desc()).limit(limit).all()
+
+
+def purge_expired():
+    """Xóa file kết quả và bản ghi của các job đã hết hạn (chạy định kỳ)."""
+    db_auth = SessionLocalAuth.session_factory()
+    try:
+        expired = db_auth.query(ReportJob).filter(ReportJob.expires_at < datetime.now()).all()
+        for job in expired:
+            if job.result_path and os.path.exists(job.result_path):
+                os.remove(job.result_path)
+            db_auth.delete(job)
+        db_auth.commit()
+        if expired:
+            logger.info(f"Purged {len(expired)} expired report jobs")
+    except Exception as e:
+        db_auth.rollback()
+        logger.error(f"Error purging report jobs: {e}")
+    finally:
+        db_auth.close()
+
+
+def heartbeat(db_auth=None) -> int:
+    """Gia hạn lease cho job của tiến trình này, rồi đánh dấu lỗi job mồ côi của tiến trình đã chết."""
+    own_session = db_auth is None
+    db_auth = db_auth or SessionLocalAuth.session_factory()
+    try:
+        db_auth.query(ReportJob).filter(
+            ReportJob.worker_id == WORKER_ID, ReportJob.status.in_(ACTIVE_STATUSES)
+        ).update({ReportJob.heartbeat_at: datetime.now()}, synchronize_session=False)
+        db_auth.commit()
+        return fail_interrupted_jobs(db_auth)
+    except Exception as e:
+        db_auth.rollback()
+        logger.error(f"Report job heartbeat error: {e}")
+        return 0
+    finally:
+        if own_session:
+            db_auth.close()
+
+
+def fail_interrupted_jobs(db_auth):
+    """
+    Job 'queued'/'running' của tiến trình KHÁC đã ngừng gia hạn quá REPORT_JOB_LEASE_SECONDS
+    (tiến trình đã dừng / khởi động lại) sẽ không bao giờ xong -> đánh dấu lỗi.
+    """
+    finished = datetime.now()
+    stale_before = finished - timedelta(seconds=settings.REPORT_JOB_LEASE_SECONDS)
+    count = db_auth.query(ReportJob).filter(
+        ReportJob.status.in_(ACTIVE_STATUSES),
+        or_(ReportJob.worker_id.is_(None), ReportJob.worker_id != WORKER_ID),
+        or_(ReportJob.heartbeat_at.is_(None), ReportJob.heartbeat_at < stale_before),
+    ).update({
+        ReportJob.status: "failed",
+        ReportJob.error: "Tiến trình xử lý job đã dừng (server khởi động lại) khi job đang chạy",
+        ReportJob.finished_at: finished,
+        ReportJob.expires_at: finished + timedelta(hours=settings.REPORT_JOB_TTL_HOURS),
+    }, synchronize_session=False)
+    db_auth.commit()
+    return count
+
+
+def attach_scheduler(scheduler):
+    scheduler.add_job(purge_expired, 'interval', hours=1, id=PURGE_JOB_ID, replace_existing=True)
+    scheduler.add_job(
+        heartbeat, 'interval', seconds=settings.REPORT_JOB_HEARTBEAT_SECONDS,
+        id=HEARTBEAT_JOB_ID, replace_existing=True, max_instances=1, coalesce=True
+    )
@@ -0,0 +1,149 @@
+# backend/services/startup.py
+"""
+Theo dõi tiến trình khởi động (tạo bảng, đồng bộ HR -> Auth, làm nóng cache).
+
+Trước đây lifespan gọi initial_sync_and_setup() trực tiếp nên server chỉ nhận
+request sau khi đồng bộ xong (vài phút với HR lớn, hoặc treo khi SQL Server
+không kết nối được). Nay các bước chạy trong 1 thread nền, mỗi bước ghi lại
+trạng thái để /readyz báo tiến độ:
+- Bước "critical" (bảng Auth, tài khoản Admin, các bảng mà request đọc/ghi trực tiếp:
+  payroll_month_rollup, DividendLedger, SyncOutbox): phải xong thì mới "ready".
+- Các bước còn lại lỗi chỉ làm trạng thái "degraded", không chặn request; chỗ đọc
+  phụ thuộc bước đó phải tự quay về đường cũ tới khi xong (vd. tìm kiếm dùng ilike).
+Chế độ (STARTUP_SYNC_MODE): "background" (mặc định), "blocking" (như cũ),
+"skip" (vẫn tạo bảng / làm nóng ở nền nhưng bỏ qua bước đồng bộ tài khoản, cổ đông).
+"""
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+PENDING, RUNNING, DONE, FAILED, SKIPPED = "pending", "running", "done", "failed", "skipped"
+MODES = ("background", "blocking", "skip")
+
+_lock = threading.Lock()
+_stages = {}  # name -> trạng thái (giữ thứ tự đăng ký)
+_started_at = None
+_finished_at = None
+_thread = None
+
+
+def mode() -> str:
+    value = (settings.STARTUP_SYNC_MODE or "background").lower()
+    return value if value in MODES else "background"
+
+
+def sync_enabled() -> bool:
+    """False khi STARTUP_SYNC_MODE=skip: bỏ qua đồng bộ HR -> Auth lúc khởi động."""
+    return mode() != "skip"
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+def register(name: str, label: str, critical: bool = False):
+    """Khai báo trước các bước để /readyz hiện cả bước chưa chạy."""
+    with _lock:
+        _stages[name] = {
+            "name": name, "label": label, "critical": critical, "status": PENDING,
+            "started_at": None, "finished_at": None, "duration_ms": None, "error": None, "detail": None,
+        }
+
+
+def _update(name: str, **fields):
+    with _lock:
+        _stages.setdefault(name, {"name": name, "label": name, "critical": False})
+        _stages[name].update(fields)
+
+
+@contextmanager
+def stage(name: str, on_error=None):
+    """
+    Chạy 1 bước khởi động: ghi thời gian / trạng thái, lỗi thì in ra và bỏ qua
+    (gọi `on_error`, vd. rollback session) để các bước sau vẫn chạy.
+    """
+    started = time.perf_counter()
+    _update(name, status=RUNNING, started_at=_now(), error=None)
+    try:
+        yield
+    except Exception as e:
+        if on_error is not None:
+            on_error()
+        _update(name, status=FAILED, error=str(e), finished_at=_now(),
+                duration_ms=round((time.perf_counter() - started) * 1000))
+        label = _stages.get(name, {}).get("label", name)
+        print(f"!!! LỖI ở bước '{label}': {e}")
+    else:
+        _update(name, status=DONE, finished_at=_now(),
+                duration_ms=round((time.perf_counter() - started) * 1000))
+
+
+def set_detail(name: str, detail):
+    """Ghi thêm kết quả của bước (vd. số tài khoản đã tạo) để hiện ở /readyz."""
+    _update(name, detail=detail)
+
+
+def skip(name: str, reason: str):
+    _update(name, status=SKIPPED, detail=reason, finished_at=_now())
+
+
+def run(setup):
+    """
+    Chạy `setup` theo STARTUP_SYNC_MODE: "blocking" chạy luôn trong lifespan,
+    các chế độ khác chạy trong thread nền (daemon) để server nhận request ngay.
+    """
+    global _thread, _started_at, _finished_at
+
+    def _target():
+        global _finished_at
+        try:
+            setup()
+        except Exception as e:
+            logger.error(f"Startup setup crashed: {e}")
+            print(f"!!! LỖI TRONG QUÁ TRÌNH KHỞI ĐỘNG NỀN: {e}")
+        finally:
+            _finished_at = _now()
+
+    _started_at, _finished_at = _now(), None
+    if mode() == "blocking":
+        _target()
+        return
+    _thread = threading.Thread(target=_target, name="startup-warmup", daemon=True)
+    _thread.start()
+
+
+def is_ready() -> bool:
+    """Sẵn sàng khi mọi bước critical đã xong."""
+    with _lock:
+        critical = [s for s in _stages.values() if s["critical"]]
+    return bool(critical) and all(s["status"] == DONE for s in critical)
+
+
+def status() -> dict:
+    with _lock:
+        stages = [dict(s) for s in _stages.values()]
+    finished = _finished_at is not None
+    if not is_ready():
+        state = "starting" if not finished else "failed"
+    elif any(s["status"] == FAILED for s in stages):
+        state = "degraded"
+    elif not finished:
+        state = "warming"
+    else:
+        state = "ready"
+    completed = sum(1 for s in stages if s["status"] in (DONE, FAILED, SKIPPED))
+    return {
+        "ready": is_ready(),
+        "state": state,
+        "mode": mode(),
+        "started_at": _started_at,
+        "finished_at": _finished_at,
+        "progress": f"{completed}/{len(stages)}",
+        "stages": stages,
+    }
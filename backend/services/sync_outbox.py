@@ -0,0 +1,332 @@
+# backend/services/sync_outbox.py
+"""
+Transactional outbox cho đồng bộ HR -> Payroll -> Auth (SYNC_MODE = "outbox").
+
+Các hàm *_synced chỉ ghi thay đổi bên HUMAN_2025 kèm 1 dòng `SyncOutbox` trong
+CÙNG transaction -> request chỉ chờ 1 commit, và không thể xảy ra tình trạng HR
+đã ghi mà "quên" đồng bộ khi server dừng giữa chừng.
+
+Relay chạy nền trên scheduler (mỗi SYNC_RELAY_INTERVAL_SECONDS, và ngay sau mỗi
+lần ghi qua `request_relay()`):
+- Đọc tối đa SYNC_RELAY_BATCH_SIZE sự kiện đang chờ theo thứ tự OutboxID, gộp
+  các sự kiện của cùng 1 đối tượng thành 1 lần áp dụng.
+- Áp dụng bằng cách đưa Payroll / Auth về đúng trạng thái HR hiện tại (upsert)
+  -> chạy lại nhiều lần vẫn cho cùng kết quả (idempotent), nên sau khi server
+  dừng đột ngột chỉ cần chạy lại.
+- Tài khoản Auth của nhân viên mới tạo ngay trong request: outbox không chứa
+  mật khẩu; Payload được xóa khi sự kiện xử lý xong.
+- Lỗi -> thử lại với thời gian chờ tăng dần (2^n giây, tối đa 5 phút), mặc định
+  không giới hạn số lần (Payroll / Auth ngừng lâu vẫn tự đồng bộ lại khi có lại);
+  sau SYNC_ALERT_AFTER_ATTEMPTS lần gửi thông báo cho Admin. SYNC_MAX_ATTEMPTS > 0
+  -> quá số lần thì "failed" (xem / thử lại qua /system/sync-outbox).
+- Chỉ đọc sự kiện đã đến hạn (NextAttemptAt <= now): sự kiện đang chờ thử lại
+  không chiếm chỗ của sự kiện mới trong lô.
+"""
+import json
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, or_, update, delete
+from sqlalchemy.orm import Session, joinedload
+
+from auth.auth import get_user_role as get_role_from_hr
+from core.batching import chunked
+from core.config import settings
+from crud import crud_notification
+from database import SessionLocalSQLServer, SessionLocalMySQL, SessionLocalAuth
+from models import (
+    SyncOutbox, EmployeeHR, DepartmentHR, PositionHR,
+    EmployeePayroll, DepartmentPayroll, PositionPayroll, User as AuthUser
+)
+from services import payroll_rollup, employee_directory, my_dashboard_cache
+import schemas
+
+logger = logging.getLogger(__name__)
+
+EMPLOYEE_CREATED = "employee.created"
+EMPLOYEE_UPDATED = "employee.updated"
+DEPARTMENT_UPSERTED = "department.upserted"
+POSITION_UPSERTED = "position.upserted"
+
+PENDING, DONE, FAILED = "pending", "done", "failed"
+
+RELAY_JOB_ID = "sync_outbox_relay"
+RELAY_NOW_JOB_ID = "sync_outbox_relay_now"
+PURGE_JOB_ID = "sync_outbox_purge"
+MAX_BACKOFF_SECONDS = 300
+
+# Cột nhân viên được chép sang Payroll
+PAYROLL_FIELDS = ("FullName", "DepartmentID", "PositionID", "Status")
+
+_scheduler = None
+_relay_lock = threading.Lock()
+
+
+def enabled() -> bool:
+    return settings.SYNC_MODE == "outbox"
+
+
+def ensure_table(engine):
+    SyncOutbox.__table__.create(bind=engine, checkfirst=True)
+
+
+def enqueue(db_hr: Session, event_type: str, aggregate_id: int, payload: dict = None):
+    """Thêm sự kiện vào session HR hiện tại (KHÔNG commit - commit cùng thay đổi chính)."""
+    db_hr.add(SyncOutbox(
+        EventType=event_type,
+        AggregateID=aggregate_id,
+        Payload=json.dumps(payload) if payload else None,
+        Status=PENDING,
+        Attempts=0,
+    ))
+
+
+# --- ÁP DỤNG (idempotent: đưa Payroll / Auth về trạng thái HR hiện tại) ---
+
+def _ensure_payroll_reference(db_payroll: Session, db_hr: Session, dept_id, pos_id):
+    if dept_id is not None and not db_payroll.get(DepartmentPayroll, dept_id):
+        dept = db_hr.get(DepartmentHR, dept_id)
+        if dept:
+            db_payroll.add(DepartmentPayroll(DepartmentID=dept.DepartmentID, DepartmentName=dept.DepartmentName))
+    if pos_id is not None and not db_payroll.get(PositionPayroll, pos_id):
+        pos = db_hr.get(PositionHR, pos_id)
+        if pos:
+            db_payroll.add(PositionPayroll(PositionID=pos.PositionID, PositionName=pos.PositionName))
+
+
+def _apply_employee(db_hr: Session, db_payroll: Session, db_auth: Session, employee_id: int, change: dict):
+    emp = db_hr.query(EmployeeHR).options(joinedload(EmployeeHR.department))\
+        .filter(EmployeeHR.EmployeeID == employee_id).first()
+    if emp is None:
+        return  # Đã bị xóa bên HR -> không còn gì để đồng bộ
+
+    # 1. Payroll
+    _ensure_payroll_reference(db_payroll, db_hr, emp.DepartmentID, emp.PositionID)
+    p_emp = db_payroll.get(EmployeePayroll, employee_id)
+    if p_emp is None:
+        db_payroll.add(EmployeePayroll(EmployeeID=employee_id, **{k: getattr(emp, k) for k in PAYROLL_FIELDS}))
+    else:
+        if p_emp.DepartmentID != emp.DepartmentID:
+            # Chuyển số liệu lương của nhân viên sang phòng ban mới trong rollup
+            payroll_rollup.reassign_employee_department(db_payroll, employee_id, p_emp.DepartmentID, emp.DepartmentID)
+        for k in PAYROLL_FIELDS:
+            setattr(p_emp, k, getattr(emp, k))
+    db_payroll.commit()
+
+    # 2. Auth (tài khoản cũ có thể chưa gắn employee_id_link -> tìm thêm theo email)
+    user = db_auth.query(AuthUser).filter(
+        or_(AuthUser.employee_id_link == employee_id, AuthUser.email == emp.Email)
+    ).first()
+    # Tài khoản mới được tạo ngay trong request (mật khẩu không đi qua outbox);
+    # nhân viên chưa có tài khoản sẽ được hr_sync.sync_accounts tạo với mật khẩu mặc định.
+    if user is not None:
+        user.full_name = emp.FullName
+        user.phone_number = emp.PhoneNumber
+        user.employee_id_link = employee_id
+        # Giữ role được chỉnh tay, chỉ tính lại khi tạo mới hoặc đổi phòng ban / chức vụ
+        if change["created"] or change["fields"] & {"DepartmentID", "PositionID"}:
+            user.role = get_role_from_hr(emp)
+    db_auth.commit()
+
+    employee_directory.refresh_employee(db_hr, employee_id, db_auth)
+    my_dashboard_cache.invalidate(employee_id)
+
+
+def _apply_department(db_hr: Session, db_payroll: Session, department_id: int):
+    dept = db_hr.get(DepartmentHR, department_id)
+    if dept is None:
+        return
+    p_dept = db_payroll.get(DepartmentPayroll, department_id)
+    if p_dept is None:
+        db_payroll.add(DepartmentPayroll(DepartmentID=dept.DepartmentID, DepartmentName=dept.DepartmentName))
+    else:
+        p_dept.DepartmentName = dept.DepartmentName
+    db_payroll.commit()
+
+
+def _apply_position(db_hr: Session, db_payroll: Session, position_id: int):
+    pos = db_hr.get(PositionHR, position_id)
+    if pos is None:
+        return
+    p_pos = db_payroll.get(PositionPayroll, position_id)
+    if p_pos is None:
+        db_payroll.add(PositionPayroll(PositionID=pos.PositionID, PositionName=pos.PositionName))
+    else:
+        p_pos.PositionName = pos.PositionName
+    db_payroll.commit()
+
+
+def _aggregate_key(event: SyncOutbox):
+    return event.EventType.split(".")[0], event.AggregateID
+
+
+def _merge(events) -> dict:
+    """Gộp các sự kiện của cùng 1 đối tượng thành 1 lần áp dụng."""
+    change = {"created": False, "fields": set()}
+    for event in events:
+        payload = json.loads(event.Payload) if event.Payload else {}
+        if event.EventType == EMPLOYEE_CREATED:
+            change["created"] = True
+        change["fields"].update(payload.get("fields", []))
+    return change
+
+
+def _apply(db_hr, db_payroll, db_auth, kind: str, aggregate_id: int, events):
+    if kind == "employee":
+        _apply_employee(db_hr, db_payroll, db_auth, aggregate_id, _merge(events))
+    elif kind == "department":
+        _apply_department(db_hr, db_payroll, aggregate_id)
+    elif kind == "position":
+        _apply_position(db_hr, db_payroll, aggregate_id)
+    else:
+        raise ValueError(f"Loại sự kiện không hỗ trợ: {events[0].EventType}")
+
+
+def _backoff_seconds(attempts: int) -> int:
+    return min(2 ** min(attempts, 16), MAX_BACKOFF_SECONDS)
+
+
+def _alert_admin(db_auth: Session, kind: str, aggregate_id: int, error: str):
+    """Báo Admin 1 lần khi 1 đối tượng đồng bộ lỗi liên tục (relay vẫn tiếp tục thử lại)."""
+    try:
+        crud_notification.create_notification(db_auth, schemas.NotificationCreate(
+            message=f"Đồng bộ HR -> Payroll/Auth cho {kind} #{aggregate_id} lỗi "
+                    f"{settings.SYNC_ALERT_AFTER_ATTEMPTS} lần liên tiếp: {error}"[:500],
+            type="sync_error", role_target="Admin"
+        ))
+    except Exception as e:
+        db_auth.rollback()
+        logger.error(f"Cannot create sync outbox alert: {e}")
+
+
+def relay(batch_size: int = None) -> dict:
+    """Áp dụng 1 lô sự kiện đang chờ. Trả về số sự kiện đã xong / lỗi / còn chờ thử lại."""
+    if not _relay_lock.acquire(blocking=False):
+        return {"skipped": True}
+    db_hr = SessionLocalSQLServer.session_factory()
+    db_payroll = SessionLocalMySQL.session_factory()
+    db_auth = SessionLocalAuth.session_factory()
+    stats = {"done": 0, "retry": 0, "failed": 0}
+    try:
+        now = datetime.now()
+        events = db_hr.query(SyncOutbox).filter(
+            SyncOutbox.Status == PENDING,
+            or_(SyncOutbox.NextAttemptAt.is_(None), SyncOutbox.NextAttemptAt <= now)
+        ).order_by(SyncOutbox.OutboxID).limit(batch_size or settings.SYNC_RELAY_BATCH_SIZE).all()
+
+        # Nhóm theo đối tượng, giữ thứ tự. Sự kiện cũ hơn của cùng đối tượng còn đang chờ
+        # thử lại không chặn nhóm: áp dụng = đưa về trạng thái HR hiện tại nên thứ tự không ảnh hưởng.
+        groups = OrderedDict()
+        for event in events:
+            groups.setdefault(_aggregate_key(event), []).append(event)
+
+        done_ids = []
+        for (kind, aggregate_id), group in groups.items():
+            try:
+                _apply(db_hr, db_payroll, db_auth, kind, aggregate_id, group)
+                done_ids.extend(e.OutboxID for e in group)
+            except Exception as e:
+                db_payroll.rollback()
+                db_auth.rollback()
+                db_hr.rollback()
+                logger.warning(f"Sync outbox {kind} {aggregate_id} failed: {e}")
+                alert = False
+                for event in group:
+                    event.Attempts = (event.Attempts or 0) + 1
+                    event.LastError = str(e)[:500]
+                    alert = alert or event.Attempts == settings.SYNC_ALERT_AFTER_ATTEMPTS
+                    if 0 < settings.SYNC_MAX_ATTEMPTS <= event.Attempts:
+                        event.Status = FAILED
+                        stats["failed"] += 1
+                    else:
+                        event.NextAttemptAt = now + timedelta(seconds=_backoff_seconds(event.Attempts))
+                        stats["retry"] += 1
+                db_hr.commit()
+                if alert:
+                    _alert_admin(db_auth, kind, aggregate_id, str(e))
+
+        for ids in chunked(done_ids):
+            db_hr.execute(
+                update(SyncOutbox).where(SyncOutbox.OutboxID.in_(ids))
+                .values(Status=DONE, ProcessedAt=now, LastError=None, Payload=None)
+            )
+        db_hr.commit()
+        stats["done"] = len(done_ids)
+    except Exception as e:
+        db_hr.rollback()
+        logger.error(f"Sync outbox relay error: {e}")
+    finally:
+        db_hr.close()
+        db_payroll.close()
+        db_auth.close()
+        _relay_lock.release()
+
+    if stats["done"] or stats["retry"] or stats["failed"]:
+        logger.info(f"Sync outbox relay: {stats}")
+    return stats
+
+
+def request_relay():
+    """Chạy relay ngay trên scheduler (gộp nhiều lần ghi liên tiếp, cùng job id)."""
+    if _scheduler is None or not _scheduler.running:
+        return
+    try:
+        _scheduler.add_job(relay, 'date', run_date=datetime.now(), id=RELAY_NOW_JOB_ID, replace_existing=True)
+    except Exception as e:
+        logger.error(f"Cannot schedule sync outbox relay: {e}")
+
+
+def purge_processed():
+    db_hr = SessionLocalSQLServer.session_factory()
+    try:
+        cutoff = datetime.now() - timedelta(days=settings.SYNC_OUTBOX_RETENTION_DAYS)
+        db_hr.execute(delete(SyncOutbox).where(SyncOutbox.Status == DONE, SyncOutbox.ProcessedAt < cutoff))
+        db_hr.commit()
+    except Exception as e:
+        db_hr.rollback()
+        logger.error(f"Sync outbox purge error: {e}")
+    finally:
+        db_hr.close()
+
+
+def attach_scheduler(scheduler):
+    global _scheduler
+    _scheduler = scheduler
+    scheduler.add_job(
+        relay, 'interval', seconds=settings.SYNC_RELAY_INTERVAL_SECONDS,
+        id=RELAY_JOB_ID, replace_existing=True, max_instances=1, coalesce=True
+    )
+    scheduler.add_job(purge_processed, 'interval', hours=6, id=PURGE_JOB_ID, replace_existing=True)
+
+
+# --- Giám sát ---
+
+def status(db_hr: Session) -> dict:
+    counts = dict(db_hr.query(SyncOutbox.Status, func.count(SyncOutbox.OutboxID)).group_by(SyncOutbox.Status).all())
+    oldest = db_hr.query(func.min(SyncOutbox.CreatedAt)).filter(SyncOutbox.Status == PENDING).scalar()
+    retrying = db_hr.query(func.count(SyncOutbox.OutboxID))\
+        .filter(SyncOutbox.Status == PENDING, SyncOutbox.Attempts > 0).scalar()
+    last_error = db_hr.query(SyncOutbox.LastError).filter(SyncOutbox.LastError.isnot(None))\
+        .order_by(SyncOutbox.OutboxID.desc()).first()
+    return {
+        "mode": settings.SYNC_MODE,
+        "pending": counts.get(PENDING, 0),
+        "retrying": retrying or 0,
+        "failed": counts.get(FAILED, 0),
+        "done": counts.get(DONE, 0),
+        "oldest_pending_at": oldest,
+        "last_error": last_error[0] if last_error else None,
+    }
+
+
+def retry_failed(db_hr: Session) -> int:
+    """Đưa các sự kiện "failed" về hàng đợi để relay thử lại từ đầu."""
+    result = db_hr.execute(
+        update(SyncOutbox).where(SyncOutbox.Status == FAILED)
+        .values(Status=PENDING, Attempts=0, NextAttemptAt=None)
+    )
+    db_hr.commit()
+    request_relay()
+    return result.rowcount
@@ -0,0 +1,44 @@
+# backend/tests/conftest.py
+"""
+Fixture dùng chung: 3 CSDL SQLite tạm thay cho HUMAN_2025 / PAYROLL / Auth
+(cùng schema trong models.py, như benchmarks/datagen.py). Chạy từ thư mục backend:
+    python -m pytest -q tests
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine  # noqa: E402
+
+import database  # noqa: E402
+import models  # noqa: E402,F401  (đăng ký các bảng vào 3 Base)
+
+
+@pytest.fixture
+def databases(tmp_path):
+    """Gắn 3 session factory (tạo engine lười) vào 3 file SQLite mới, trả về {tên: session}."""
+    engines = {}
+    for name, base, factory in (("hr", database.BaseSQLServer, database.SessionLocalSQLServer),
+                                ("payroll", database.BaseMySQL, database.SessionLocalMySQL),
+                                ("auth", database.BaseAuth, database.SessionLocalAuth)):
+        engine = create_engine(f"sqlite:///{tmp_path / name}.db", connect_args={"check_same_thread": False})
+        base.metadata.create_all(bind=engine)
+        factory.session_factory.configure(bind=engine)
+        engines[name] = engine
+
+    sessions = {
+        "hr": database.SessionLocalSQLServer.session_factory(),
+        "payroll": database.SessionLocalMySQL.session_factory(),
+        "auth": database.SessionLocalAuth.session_factory(),
+    }
+    yield sessions
+    for name, session in sessions.items():
+        session.close()
+    for factory in (database.SessionLocalSQLServer, database.SessionLocalMySQL, database.SessionLocalAuth):
+        factory.remove()
+        factory.session_factory.configure(bind=None)
+    for engine in engines.values():
+        engine.dispose()
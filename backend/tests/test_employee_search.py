@@ -0,0 +1,93 @@
+# backend/tests/test_employee_search.py
+"""Tìm kiếm FTS5 + bộ lọc: không được mất kết quả khi từ khóa khớp nhiều hơn giới hạn."""
+from datetime import date
+
+import pytest
+
+from core.config import settings
+from crud import crud_employee
+from models import EmployeeHR, DepartmentHR, PositionHR
+from services import employee_search, employee_directory
+
+EMPLOYEES = 30
+CAP = 10
+
+
+@pytest.fixture
+def seeded(databases, monkeypatch):
+    db_hr, db_auth = databases["hr"], databases["auth"]
+    db_hr.add_all([DepartmentHR(DepartmentID=1, DepartmentName="Kế toán"),
+                   DepartmentHR(DepartmentID=2, DepartmentName="Kỹ thuật"),
+                   PositionHR(PositionID=1, PositionName="Nhân viên")])
+    for i in range(1, EMPLOYEES + 1):
+        db_hr.add(EmployeeHR(
+            EmployeeID=i, FullName=f"Nguyễn Văn {i}", DateOfBirth=date(1990, 1, 1), HireDate=date(2020, 1, i % 28 + 1),
+            Email=f"nv{i}@company.vn", DepartmentID=2 if i > 5 else 1, PositionID=1, Status="Đang làm việc"
+        ))
+    db_hr.commit()
+    monkeypatch.setattr(settings, "EMPLOYEE_SEARCH_MAX_RESULTS", CAP)
+    monkeypatch.setattr(employee_search, "_available", None)
+    monkeypatch.setattr(employee_search, "_populated", None)
+    monkeypatch.setattr(employee_directory, "_ready", None)
+    assert employee_search.ensure_index(db_auth, db_hr)
+    return db_hr, db_auth
+
+
+def test_search_ids_declines_truncated_results(seeded):
+    db_hr, db_auth = seeded
+    assert employee_search.search_ids(db_auth, "nguyen") is None
+    assert employee_search.search_ids(db_auth, "nv7") == [7]
+
+
+@pytest.mark.parametrize("use_directory", [True, False])
+def test_filtered_search_returns_every_match(seeded, monkeypatch, use_directory):
+    db_hr, db_auth = seeded
+    if use_directory:
+        employee_directory.reconcile(db_hr, db_auth)
+    else:
+        monkeypatch.setattr(settings, "EMPLOYEE_DIRECTORY_ENABLED", False)
+    assert employee_directory.is_ready(db_auth) is use_directory
+
+    # Bên HR, quá giới hạn -> ilike (có phân biệt dấu như trước), nên dùng từ khóa có dấu
+    rows = crud_employee.get_employees(db_hr, db_auth, limit=100, search="Nguyễn", department_id=2)
+    assert sorted(r["EmployeeID"] for r in rows) == list(range(6, EMPLOYEES + 1))
+
+    # Phân trang offset qua hết tập khớp
+    page = crud_employee.get_employees(db_hr, db_auth, skip=20, limit=100, search="Nguyễn")
+    assert len(page) == EMPLOYEES - 20
+
+
+def test_search_falls_back_while_index_is_building(seeded, monkeypatch):
+    db_hr, db_auth = seeded
+    seen = {}
+
+    def _reindex_in_progress(db_hr, where, db_auth=None):
+        # Giữa lúc dựng lại: chỉ mục đang trống, đọc phải trả None (ilike) thay vì []
+        seen["ids"] = employee_search.search_ids(db_auth, "nv7")
+        seen["subquery"] = employee_search.match_subquery(db_auth, "nv7")
+        seen["rows"] = [r["EmployeeID"] for r in crud_employee.get_employees(db_hr, db_auth, limit=100, search="nv7")]
+        return 0
+    monkeypatch.setattr(employee_search, "reindex", _reindex_in_progress)
+    employee_search.rebuild(db_hr, db_auth)
+
+    assert seen == {"ids": None, "subquery": None, "rows": [7]}
+
+
+def test_keyset_page_walks_past_the_cap(seeded):
+    db_hr, db_auth = seeded
+    employee_directory.reconcile(db_hr, db_auth)
+    seen, after = [], None
+    while True:
+        page = crud_employee.get_employees_page(db_hr, db_auth, limit=7, after=after, search="nguyen")
+        seen.extend(item.EmployeeID for item in page["items"])
+        if not page["has_more"]:
+            break
+        after = page["next_cursor"]
+    assert sorted(seen) == list(range(1, EMPLOYEES + 1))
+
+
+def test_directory_search_orders_by_relevance_and_matches_id(seeded):
+    db_hr, db_auth = seeded
+    employee_directory.reconcile(db_hr, db_auth)
+    rows = crud_employee.get_employees(db_hr, db_auth, search="12")
+    assert rows[0]["EmployeeID"] == 12
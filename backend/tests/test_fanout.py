@@ -0,0 +1,56 @@
+# backend/tests/test_fanout.py
+"""Fanout báo cáo: nguồn treo không chiếm thread của nguồn khác, truy vấn quá hạn bị CSDL cắt."""
+import threading
+import time
+
+import pytest
+from sqlalchemy import text
+
+from core.config import settings
+from services import fanout
+
+SLOW_QUERY = text("WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n) SELECT count(*) FROM n")
+
+
+@pytest.fixture
+def one_worker(monkeypatch):
+    monkeypatch.setattr(settings, "REPORT_FANOUT_WORKERS", 1)
+    monkeypatch.setattr(fanout, "_executors", {})
+    yield
+    for executor in fanout._executors.values():
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def test_slow_source_does_not_block_other_sources(databases, one_worker, monkeypatch):
+    monkeypatch.setitem(settings.REPORT_SOURCE_TIMEOUTS, "hr", 0.3)
+    release = threading.Event()
+
+    def _stuck(db):
+        release.wait(5)
+        return "hr"
+    try:
+        results, failed = fanout.run_groups({
+            "hr_1": ("hr", _stuck, None),
+            "hr_2": ("hr", _stuck, None),  # Xếp hàng sau hr_1 -> bị hủy khi quá hạn
+            "payroll": ("payroll", lambda db: db.execute(text("SELECT 1")).scalar(), None),
+        }, mode="concurrent")
+    finally:
+        release.set()
+    assert results["payroll"] == 1
+    assert sorted(failed) == ["hr_1", "hr_2"]
+
+
+def test_runaway_query_is_interrupted_by_the_database(databases, one_worker, monkeypatch):
+    monkeypatch.setitem(settings.REPORT_SOURCE_TIMEOUTS, "auth", 0.2)
+    started = time.monotonic()
+    results, failed = fanout.run_groups({
+        "slow": ("auth", lambda db: db.execute(SLOW_QUERY).scalar(), None),
+    }, mode="concurrent")
+    assert failed == ["slow"]
+
+    # Thread của nguồn đã được trả lại: nhóm tiếp theo chạy được ngay
+    results, failed = fanout.run_groups({
+        "next": ("auth", lambda db: db.execute(text("SELECT 1")).scalar(), None),
+    }, mode="concurrent")
+    assert (results, failed) == ({"next": 1}, [])
+    assert time.monotonic() - started < 5
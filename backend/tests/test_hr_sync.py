@@ -0,0 +1,52 @@
+# backend/tests/test_hr_sync.py
+"""Đồng bộ HR -> Auth tăng dần: không bỏ sót dòng có EmployeeID nhỏ hơn watermark commit muộn."""
+from datetime import date
+
+from models import EmployeeHR, DepartmentHR, PositionHR, User as AuthUser
+from services import hr_sync
+
+
+def _add_employee(db_hr, employee_id):
+    db_hr.add(EmployeeHR(
+        EmployeeID=employee_id, FullName=f"Nhân viên {employee_id}", DateOfBirth=date(1990, 1, 1),
+        HireDate=date(2020, 1, 1), Email=f"nv{employee_id}@company.vn", PhoneNumber=f"0900{employee_id:06d}",
+        DepartmentID=1, PositionID=1, Status="Đang làm việc"
+    ))
+    db_hr.commit()
+
+
+def _linked_ids(db_auth):
+    db_auth.expire_all()
+    return sorted(link for (link,) in db_auth.query(AuthUser.employee_id_link))
+
+
+def test_incremental_sync_picks_up_ids_committed_out_of_order(databases):
+    db_hr, db_auth = databases["hr"], databases["auth"]
+    db_hr.add_all([DepartmentHR(DepartmentID=1, DepartmentName="Kế toán"), PositionHR(PositionID=1, PositionName="Nhân viên")])
+    for employee_id in (1, 2, 4):
+        _add_employee(db_hr, employee_id)
+
+    stats = hr_sync.sync_incremental(db_hr, db_auth)
+    assert (stats["accounts"]["created"], stats["shareholders"]["added"]) == (3, 3)
+    assert hr_sync.sync_incremental(db_hr, db_auth)["accounts"] is None  # Không có gì mới
+
+    # ID 3 được cấp trước 4 nhưng commit sau lần đồng bộ: MAX(EmployeeID) không đổi
+    _add_employee(db_hr, 3)
+    stats = hr_sync.sync_incremental(db_hr, db_auth)
+    assert stats["accounts"]["created"] == 1
+    assert _linked_ids(db_auth) == [1, 2, 3, 4]
+    assert hr_sync.sync_incremental(db_hr, db_auth)["accounts"] is None
+
+
+def test_periodic_full_rescan_is_scheduled():
+    class _Scheduler:
+        def __init__(self):
+            self.jobs = {}
+
+        def add_job(self, func, trigger, id, **kwargs):
+            self.jobs[id] = func
+
+    scheduler = _Scheduler()
+    hr_sync.attach_scheduler(scheduler)
+    assert scheduler.jobs[hr_sync.INCREMENTAL_JOB_ID] is hr_sync.run_incremental
+    assert scheduler.jobs[hr_sync.PERIODIC_FULL_RESCAN_JOB_ID] is hr_sync.run_full_rescan
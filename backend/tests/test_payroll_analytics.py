@@ -0,0 +1,34 @@
+# backend/tests/test_payroll_analytics.py
+"""Nạp lương thành mảng NumPy từ tuple thô của cursor (không qua từng Row)."""
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from models import EmployeePayroll, Salary  # noqa: E402
+from services import payroll_analytics  # noqa: E402
+
+
+def test_load_salary_arrays(databases):
+    db_payroll = databases["payroll"]
+    db_payroll.add_all([
+        EmployeePayroll(EmployeeID=1, FullName="Nguyễn Văn An", DepartmentID=2, PositionID=3, Status="Đang làm việc"),
+        EmployeePayroll(EmployeeID=2, FullName="Trần Thị Bình", DepartmentID=None, PositionID=1, Status="Đang làm việc"),
+    ])
+    for employee_id, month, net in ((1, date(2025, 1, 1), "10000000.50"), (2, date(2025, 2, 1), "8000000")):
+        db_payroll.add(Salary(EmployeeID=employee_id, SalaryMonth=month, BaseSalary=Decimal(net),
+                              Bonus=Decimal("0"), Deductions=Decimal("0"), NetSalary=Decimal(net)))
+    db_payroll.commit()
+
+    arrays = payroll_analytics.load_salary_arrays(db_payroll)
+    order = np.argsort(arrays["month"])
+    assert arrays["month"][order].tolist() == [202501, 202502]
+    assert arrays["department"][order].tolist() == [2, 0]  # NULL -> 0
+    assert arrays["position"][order].tolist() == [3, 1]
+    assert arrays["net"][order].tolist() == [10000000.5, 8000000.0]
+    assert arrays["month"].dtype == np.int64 and arrays["net"].dtype == np.float64
+
+    empty = payroll_analytics.load_salary_arrays(db_payroll, date(2030, 1, 1), date(2030, 2, 1))
+    assert empty["net"].size == 0
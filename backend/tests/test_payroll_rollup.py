@@ -0,0 +1,47 @@
+# backend/tests/test_payroll_rollup.py
+"""Đối soát payroll_month_rollup với bảng salaries do hệ thống khác ghi."""
+from datetime import date
+from decimal import Decimal
+
+from models import DepartmentPayroll, EmployeePayroll, Salary
+from services import payroll_rollup
+
+
+def _seed(db_payroll):
+    db_payroll.add(DepartmentPayroll(DepartmentID=1, DepartmentName="Kế toán"))
+    db_payroll.add(EmployeePayroll(EmployeeID=1, FullName="Nguyễn Văn An", DepartmentID=1, Status="Đang làm việc"))
+    for month in (date(2025, 1, 1), date(2025, 2, 1)):
+        db_payroll.add(Salary(EmployeeID=1, SalaryMonth=month, BaseSalary=Decimal("10000000"),
+                              Bonus=Decimal("0"), Deductions=Decimal("0"), NetSalary=Decimal("10000000")))
+    db_payroll.commit()
+    payroll_rollup.rebuild(db_payroll)
+
+
+def test_reconcile_is_noop_when_in_sync(databases):
+    db_payroll = databases["payroll"]
+    _seed(db_payroll)
+    assert payroll_rollup.stale_months(db_payroll) == []
+    assert payroll_rollup.reconcile(db_payroll) == []
+
+
+def test_reconcile_picks_up_month_written_outside_the_api(databases):
+    db_payroll = databases["payroll"]
+    _seed(db_payroll)
+    db_payroll.add(Salary(EmployeeID=1, SalaryMonth=date(2025, 3, 1), BaseSalary=Decimal("12000000"),
+                          Bonus=Decimal("0"), Deductions=Decimal("0"), NetSalary=Decimal("12000000")))
+    db_payroll.commit()
+
+    assert payroll_rollup.reconcile(db_payroll) == [date(2025, 3, 1)]
+    assert payroll_rollup.latest_months(db_payroll, 1) == [date(2025, 3, 1)]
+    assert payroll_rollup.month_totals(db_payroll, date(2025, 3, 1))[0] == Decimal("12000000")
+
+
+def test_reconcile_detects_changed_amounts_in_recent_months(databases):
+    db_payroll = databases["payroll"]
+    _seed(db_payroll)
+    salary = db_payroll.query(Salary).filter(Salary.SalaryMonth == date(2025, 2, 1)).one()
+    salary.NetSalary = Decimal("9500000")
+    db_payroll.commit()
+
+    assert payroll_rollup.reconcile(db_payroll) == [date(2025, 2, 1)]
+    assert payroll_rollup.month_totals(db_payroll, date(2025, 2, 1))[0] == Decimal("9500000")
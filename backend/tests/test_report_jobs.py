@@ -0,0 +1,52 @@
+# backend/tests/test_report_jobs.py
+"""Job báo cáo: kiểm tra tham số trước khi lưu, chỉ đánh dấu lỗi job của tiến trình đã dừng."""
+from datetime import datetime, timedelta
+
+import pytest
+
+from models import ReportJob
+from services import report_jobs
+
+
+@pytest.mark.parametrize("kind, params", [
+    ("dividend_preview", {}),
+    ("dividend_preview", {"total_profit": "abc"}),
+    ("dividend_preview", {"total_profit": -5}),
+    ("export_salaries", {"format": "xlsx"}),
+    ("export_salaries", {"department_id": "ke-toan"}),
+    ("export_attendance", {"from_month": "2024-13"}),
+    ("export_attendance", {"from_month": "2024-06", "to_month": "2024-01"}),
+])
+def test_submit_rejects_invalid_params_before_persisting(databases, kind, params):
+    db_auth = databases["auth"]
+    with pytest.raises(ValueError):
+        report_jobs.submit(db_auth, kind, params, "admin@company.vn")
+    assert db_auth.query(ReportJob).count() == 0
+
+
+def test_validators_normalize_params():
+    assert report_jobs.JOB_VALIDATORS["export_salaries"]({"department_id": "3", "from_month": "2024-1"}) == \
+        {"from_month": "2024-01", "format": "csv", "department_id": 3}
+    assert str(report_jobs.JOB_VALIDATORS["dividend_preview"]({"total_profit": "1000000"})["total_profit"]) == "1000000"
+
+
+def test_only_jobs_of_dead_workers_are_failed(databases):
+    db_auth = databases["auth"]
+    now = datetime.now()
+    db_auth.add_all([
+        ReportJob(id="mine", kind="dividend_preview", status="running", created_by="a",
+                  worker_id=report_jobs.WORKER_ID, heartbeat_at=now - timedelta(hours=1)),
+        ReportJob(id="other-alive", kind="dividend_preview", status="running", created_by="a",
+                  worker_id="other:1", heartbeat_at=now),
+        ReportJob(id="other-dead", kind="dividend_preview", status="queued", created_by="a",
+                  worker_id="other:2", heartbeat_at=now - timedelta(hours=1)),
+        ReportJob(id="legacy", kind="dividend_preview", status="running", created_by="a"),
+    ])
+    db_auth.commit()
+
+    assert report_jobs.heartbeat(db_auth) == 2
+    db_auth.expire_all()
+    statuses = {job.id: job.status for job in db_auth.query(ReportJob)}
+    assert statuses == {"mine": "running", "other-alive": "running", "other-dead": "failed", "legacy": "failed"}
+    assert db_auth.get(ReportJob, "mine").heartbeat_at > now
+
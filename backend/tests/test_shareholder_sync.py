@@ -0,0 +1,65 @@
+# backend/tests/test_shareholder_sync.py
+"""Đồng bộ cổ đông từ HR: chỉ ghi đè trạng thái khi trạng thái HR thật sự đổi."""
+from datetime import date
+
+from sqlalchemy import create_engine, inspect
+
+import schemas
+from crud import crud_shareholder
+from models import EmployeeHR, DepartmentHR, PositionHR, Shareholder
+from services import hr_sync
+
+
+def _seed(db_hr):
+    db_hr.add_all([DepartmentHR(DepartmentID=1, DepartmentName="Kế toán"), PositionHR(PositionID=1, PositionName="Nhân viên")])
+    for employee_id in (1, 2):
+        db_hr.add(EmployeeHR(
+            EmployeeID=employee_id, FullName=f"Nhân viên {employee_id}", DateOfBirth=date(1990, 1, 1),
+            HireDate=date(2020, 1, 1), Email=f"nv{employee_id}@company.vn", DepartmentID=1, PositionID=1,
+            Status="Đang làm việc"
+        ))
+    db_hr.commit()
+
+
+def _statuses(db_auth):
+    db_auth.expire_all()
+    return {sh.employee_id: sh.status for sh in db_auth.query(Shareholder)}
+
+
+def test_manual_status_survives_full_rescan(databases):
+    db_hr, db_auth = databases["hr"], databases["auth"]
+    _seed(db_hr)
+    hr_sync.sync_now(db_hr, db_auth)
+
+    crud_shareholder.create_shareholder(db_auth, db_hr, schemas.ShareholderCreate(EmployeeID=1, Shares=100, Status="Inactive"))
+    stats = hr_sync.sync_now(db_hr, db_auth, full=True)
+    assert stats["shareholders"]["status_updated"] == 0
+    assert _statuses(db_auth) == {1: "Inactive", 2: "Active"}
+
+    # HR đổi thật -> ghi đè (kể cả cổ đông đã đặt tay)
+    db_hr.get(EmployeeHR, 2).Status = "Đã nghỉ việc"
+    db_hr.commit()
+    stats = hr_sync.sync_now(db_hr, db_auth, full=True)
+    assert stats["shareholders"]["status_updated"] == 1
+    assert _statuses(db_auth) == {1: "Inactive", 2: "Inactive"}
+
+
+def test_existing_shareholders_without_hr_status_are_not_reset(databases):
+    db_hr, db_auth = databases["hr"], databases["auth"]
+    _seed(db_hr)
+    db_auth.add(Shareholder(employee_id=1, shares=100, status="Inactive"))  # Có từ trước khi có cột hr_status
+    db_auth.commit()
+
+    crud_shareholder.sync_all_employees_to_shareholders(db_auth, db_hr)
+    assert _statuses(db_auth) == {1: "Inactive", 2: "Active"}
+    assert db_auth.get(Shareholder, 1).hr_status == "Active"
+
+
+def test_ensure_hr_status_column_upgrades_existing_table(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'auth.db'}")
+    with engine.begin() as conn:
+        conn.exec_driver_sql("CREATE TABLE shareholders (id INTEGER PRIMARY KEY, employee_id INTEGER, shares INTEGER, status VARCHAR(50))")
+    crud_shareholder.ensure_hr_status_column(engine)
+    crud_shareholder.ensure_hr_status_column(engine)  # Chạy lại không lỗi
+    assert "hr_status" in {c["name"] for c in inspect(engine).get_columns("shareholders")}
+    engine.dispose()
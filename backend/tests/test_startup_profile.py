@@ -0,0 +1,28 @@
+# backend/tests/test_startup_profile.py
+"""--profile-startup chỉ đo, không ghi vào dashboard_auth.db đang dùng."""
+import subprocess
+import sys
+
+from sqlalchemy import create_engine, inspect
+
+import database
+from core import startup_profile
+
+
+def test_init_breakdown_does_not_create_auth_tables(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'live_auth.db'}")
+    monkeypatch.setattr(database, "_engines", {"engine_auth": engine})
+    rows = {label: error for label, _, error in startup_profile.init_breakdown()}
+
+    assert inspect(engine).get_table_names() == []
+    assert "thiếu bảng" in rows["Auth: kiểm tra bảng (chỉ đọc)"]
+    engine.dispose()
+
+
+def test_reports_router_does_not_import_numpy():
+    # Tiến trình con: module đã nạp bởi test khác không làm sai kết quả
+    proc = subprocess.run(
+        [sys.executable, "-c", "import sys, api.v1.endpoints.reports; print('numpy' in sys.modules)"],
+        cwd=startup_profile.BACKEND_DIR, capture_output=True, text=True
+    )
+    assert proc.stdout.strip() == "False", proc.stderr
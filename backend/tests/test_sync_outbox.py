@@ -0,0 +1,122 @@
+# backend/tests/test_sync_outbox.py
+"""Relay SyncOutbox: gộp sự kiện, idempotent, thử lại có backoff và lọc theo NextAttemptAt."""
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from models import SyncOutbox, EmployeeHR, DepartmentHR, PositionHR, EmployeePayroll, User as AuthUser
+from services import sync_outbox
+
+
+def _seed_employee(db_hr, employee_id, full_name="Nguyễn Văn An"):
+    if not db_hr.get(DepartmentHR, 1):
+        db_hr.add(DepartmentHR(DepartmentID=1, DepartmentName="Kế toán"))
+        db_hr.add(PositionHR(PositionID=1, PositionName="Nhân viên"))
+    db_hr.add(EmployeeHR(
+        EmployeeID=employee_id, FullName=full_name, DateOfBirth=date(1990, 1, 1), HireDate=date(2020, 1, 1),
+        Email=f"nv{employee_id}@company.vn", PhoneNumber=f"09000000{employee_id:02d}",
+        DepartmentID=1, PositionID=1, Status="Đang làm việc"
+    ))
+    db_hr.commit()
+
+
+def _events(db_hr):
+    db_hr.expire_all()
+    return db_hr.query(SyncOutbox).order_by(SyncOutbox.OutboxID).all()
+
+
+def test_relay_coalesces_events_of_one_employee(databases):
+    db_hr, db_payroll = databases["hr"], databases["payroll"]
+    _seed_employee(db_hr, 1)
+    sync_outbox.enqueue(db_hr, sync_outbox.EMPLOYEE_CREATED, 1)
+    sync_outbox.enqueue(db_hr, sync_outbox.EMPLOYEE_UPDATED, 1, {"fields": ["FullName"]})
+    sync_outbox.enqueue(db_hr, sync_outbox.EMPLOYEE_UPDATED, 1, {"fields": ["Status"]})
+    db_hr.commit()
+
+    stats = sync_outbox.relay()
+
+    assert stats == {"done": 3, "retry": 0, "failed": 0}
+    assert all(e.Status == sync_outbox.DONE and e.Payload is None for e in _events(db_hr))
+    assert db_payroll.query(EmployeePayroll).count() == 1
+    assert db_payroll.get(EmployeePayroll, 1).FullName == "Nguyễn Văn An"
+
+
+def test_relay_is_idempotent(databases):
+    db_hr, db_payroll, db_auth = databases["hr"], databases["payroll"], databases["auth"]
+    _seed_employee(db_hr, 1)
+    db_auth.add(AuthUser(full_name="Cũ", email="nv1@company.vn", hashed_password="x", role="Employee"))
+    db_auth.commit()
+    sync_outbox.enqueue(db_hr, sync_outbox.EMPLOYEE_CREATED, 1)
+    db_hr.commit()
+    sync_outbox.relay()
+
+    # Chạy lại cùng sự kiện (vd. server dừng trước khi kịp đánh dấu "done")
+    for event in _events(db_hr):
+        event.Status = sync_outbox.PENDING
+    db_hr.commit()
+    assert sync_outbox.relay()["done"] == 1
+
+    assert db_payroll.query(EmployeePayroll).count() == 1
+    db_auth.expire_all()
+    users = db_auth.query(AuthUser).all()
+    assert len(users) == 1
+    assert (users[0].full_name, users[0].employee_id_link) == ("Nguyễn Văn An", 1)
+
+
+def test_relay_retries_with_backoff_without_blocking_newer_events(databases, monkeypatch):
+    db_hr, db_payroll = databases["hr"], databases["payroll"]
+    _seed_employee(db_hr, 1)
+    _seed_employee(db_hr, 2, "Trần Thị Bình")
+    sync_outbox.enqueue(db_hr, sync_outbox.EMPLOYEE_CREATED, 1)
+    db_hr.commit()
+
+    original = sync_outbox._apply_employee
+
+    def _payroll_down(db_hr, db_payroll, db_auth, employee_id, change):
+        raise RuntimeError("Payroll không kết nối được")
+    monkeypatch.setattr(sync_outbox, "_apply_employee", _payroll_down)
+
+    assert sync_outbox.relay() == {"done": 0, "retry": 1, "failed": 0}
+    event = _events(db_hr)[0]
+    assert (event.Status, event.Attempts) == (sync_outbox.PENDING, 1)
+    assert event.NextAttemptAt > datetime.now()
+
+    # Sự kiện đang chờ thử lại không được đọc lại, và không chặn sự kiện mới (lô 1 sự kiện)
+    monkeypatch.setattr(sync_outbox, "_apply_employee", original)
+    sync_outbox.enqueue(db_hr, sync_outbox.EMPLOYEE_CREATED, 2)
+    db_hr.commit()
+    assert sync_outbox.relay(batch_size=1)["done"] == 1
+    assert db_payroll.get(EmployeePayroll, 2) is not None
+    assert _events(db_hr)[0].Attempts == 1
+
+    # Đến hạn -> áp dụng thành công
+    event = _events(db_hr)[0]
+    event.NextAttemptAt = datetime.now() - timedelta(seconds=1)
+    db_hr.commit()
+    assert sync_outbox.relay()["done"] == 1
+    db_payroll.expire_all()
+    assert db_payroll.get(EmployeePayroll, 1) is not None
+
+
+def test_relay_keeps_retrying_past_old_attempt_limit(databases, monkeypatch):
+    db_hr = databases["hr"]
+    _seed_employee(db_hr, 1)
+    sync_outbox.enqueue(db_hr, sync_outbox.EMPLOYEE_CREATED, 1)
+    db_hr.commit()
+    event = _events(db_hr)[0]
+    event.Attempts = 50
+    db_hr.commit()
+
+    def _auth_down(*args):
+        raise RuntimeError("Auth DB bị khóa")
+    monkeypatch.setattr(sync_outbox, "_apply_employee", _auth_down)
+
+    assert sync_outbox.relay()["retry"] == 1
+    event = _events(db_hr)[0]
+    assert event.Status == sync_outbox.PENDING
+    assert event.NextAttemptAt <= datetime.now() + timedelta(seconds=sync_outbox.MAX_BACKOFF_SECONDS + 1)
+
+
+@pytest.mark.parametrize("attempts, seconds", [(1, 2), (5, 32), (9, 300), (1000, 300)])
+def test_backoff_is_capped(attempts, seconds):
+    assert sync_outbox._backoff_seconds(attempts) == seconds